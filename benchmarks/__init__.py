@@ -0,0 +1,12 @@
+"""Нагрузочные замеры проекта YaNote.
+
+Каждый модуль запускается отдельно, например::
+
+    python -m benchmarks.indexes --users 100 --notes 10000
+
+или через команду ``python manage.py run_benchmarks indexes ...``.
+Замер всех маршрутов с JSON-отчётом и сравнением с базовым отчётом —
+benchmarks/routes.py.
+
+Замеры выполняются на временной тестовой базе и не трогают рабочую.
+"""
@@ -0,0 +1,357 @@
+"""Нагрузочный тест: асинхронные представления под ASGI против WSGI.
+
+Оба режима обслуживает один и тот же минимальный HTTP/1.1-сервер
+на asyncio (заменитель uvicorn и gunicorn, которых нет в зависимостях):
+
+* ``asgi`` — приложение yanote.asgi вызывается прямо в цикле событий,
+  страницы заметок обслуживают notes/async_views.py;
+* ``wsgi`` — приложение yanote.wsgi вызывается в пуле потоков, как
+  в воркере gthread у gunicorn.
+
+Сервер запускается отдельным процессом, клиент держит ``--connections``
+постоянных соединений и в каждом последовательно запрашивает список
+и страницы заметок. Пример запуска::
+
+    python -m benchmarks.asgi_load --connections 1000 --duration 20
+"""
+import argparse
+import asyncio
+import io
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import unquote
+
+from .utils import (
+    base_parser, benchmark_database, report, setup_django, summarize
+)
+
+HOST = '127.0.0.1'
+MODES = ('wsgi', 'asgi')
+READY_TIMEOUT = 30
+
+
+def parse_request_head(head):
+    request_line, *header_lines = head.decode('latin-1').split('\r\n')
+    method, target, _ = request_line.split(' ', 2)
+    headers = []
+    for line in header_lines:
+        name, _, value = line.partition(':')
+        headers.append((name.strip().lower(), value.strip()))
+    return method, target, headers
+
+
+async def read_request(reader):
+    """Метод, путь, заголовки и тело очередного запроса или None."""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    method, target, headers = parse_request_head(head[:-4])
+    length = int(dict(headers).get('content-length', 0))
+    body = await reader.readexactly(length) if length else b''
+    return method, target, headers, body
+
+
+def write_response(writer, status, headers, body):
+    lines = [f'HTTP/1.1 {status} {HTTPStatus(status).phrase}']
+    lines += [
+        f'{name}: {value}' for name, value in headers
+        if name.lower() != 'content-length'
+    ]
+    lines.append(f'Content-Length: {len(body)}')
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+
+
+class AsgiAdapter:
+    """Вызывает ASGI-приложение прямо в цикле событий."""
+
+    def __init__(self, port):
+        from yanote.asgi import application
+
+        self.application = application
+        self.port = port
+
+    async def __call__(self, method, target, headers, body):
+        path, _, query = target.partition('?')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'},
+            'http_version': '1.1', 'method': method, 'scheme': 'http',
+            'path': unquote(path), 'raw_path': path.encode(),
+            'query_string': query.encode(), 'root_path': '',
+            'headers': [
+                (name.encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ],
+            'client': (HOST, 0), 'server': (HOST, self.port),
+        }
+        messages = [
+            {'type': 'http.request', 'body': body, 'more_body': False}
+        ]
+        start, chunks = {}, []
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # Клиент не отключается, пока ждёт ответ.
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                start.update(message)
+            else:
+                chunks.append(message.get('body', b''))
+
+        await self.application(scope, receive, send)
+        headers = [
+            (name.decode('latin-1'), value.decode('latin-1'))
+            for name, value in start['headers']
+        ]
+        return start['status'], headers, b''.join(chunks)
+
+
+class WsgiAdapter:
+    """Вызывает WSGI-приложение в пуле потоков."""
+
+    def __init__(self, port, threads):
+        from yanote.wsgi import application
+
+        self.application = application
+        self.port = port
+        self.executor = ThreadPoolExecutor(threads)
+
+    def call(self, method, target, headers, body):
+        path, _, query = target.partition('?')
+        environ = {
+            'REQUEST_METHOD': method, 'PATH_INFO': unquote(path),
+            'QUERY_STRING': query, 'SCRIPT_NAME': '',
+            'SERVER_NAME': HOST, 'SERVER_PORT': str(self.port),
+            'SERVER_PROTOCOL': 'HTTP/1.1', 'REMOTE_ADDR': HOST,
+            'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(body), 'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True, 'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in headers:
+            key = name.upper().replace('-', '_')
+            if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                key = f'HTTP_{key}'
+            environ[key] = value
+        result = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            result['status'] = int(status.split(' ', 1)[0])
+            result['headers'] = response_headers
+
+        iterable = self.application(environ, start_response)
+        try:
+            body = b''.join(iterable)
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+        return result['status'], result['headers'], body
+
+    async def __call__(self, *request):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.call, *request
+        )
+
+
+async def serve(adapter, port):
+    async def handle(reader, writer):
+        try:
+            while (request := await read_request(reader)) is not None:
+                write_response(writer, *await adapter(*request))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, HOST, port, backlog=4096)
+    async with server:
+        await server.serve_forever()
+
+
+def run_server(args):
+    """Точка входа процесса-сервера."""
+    os.environ['YANOTE_DB_THREADS'] = str(args.db_threads)
+    if args.serve == 'asgi':
+        os.environ['YANOTE_ASYNC_VIEWS'] = '1'
+    setup_django()
+    from django.conf import settings
+
+    settings.DATABASES['default']['NAME'] = args.db_file
+    if args.serve == 'asgi':
+        adapter = AsgiAdapter(args.port)
+    else:
+        adapter = WsgiAdapter(args.port, args.wsgi_threads)
+    asyncio.run(serve(adapter, args.port))
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = 0
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(port, paths, cookie, deadline, latencies, errors):
+    try:
+        reader, writer = await asyncio.open_connection(HOST, port)
+    except OSError:
+        errors.append('connect')
+        return
+    requests = [
+        (
+            f'GET {path} HTTP/1.1\r\nHost: {HOST}\r\n'
+            f'Cookie: sessionid={cookie}\r\n\r\n'
+        ).encode()
+        for path in paths
+    ]
+    index = 0
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            writer.write(requests[index % len(requests)])
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors.append(status)
+            index += 1
+    except (asyncio.IncompleteReadError, ConnectionError):
+        errors.append('disconnect')
+    finally:
+        writer.close()
+
+
+async def load(port, paths, cookie, connections, duration):
+    latencies, errors = [], []
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        client(port, paths[i:] + paths[:i], cookie, deadline, latencies,
+               errors)
+        for i in range(connections)
+    ))
+    elapsed = time.perf_counter() - started
+    result = summarize(latencies) if latencies else {'runs': 0}
+    result['requests_per_second'] = round(len(latencies) / elapsed, 1)
+    result['errors'] = len(errors)
+    return result
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process):
+    deadline = time.monotonic() + READY_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('Сервер завершился при запуске.')
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('Сервер не начал принимать соединения.')
+
+
+def run_mode(mode, args, paths, cookie):
+    port = free_port()
+    command = [
+        sys.executable, '-m', 'benchmarks.asgi_load', '--serve', mode,
+        '--port', str(port), '--db-file', args.db_file,
+        '--db-threads', str(args.db_threads),
+        '--wsgi-threads', str(args.wsgi_threads),
+    ]
+    process = subprocess.Popen(command)
+    try:
+        wait_for_port(port, process)
+        # Прогрев: шаблоны, соединения, кеши.
+        asyncio.run(load(port, paths, cookie, 10, 1))
+        return asyncio.run(
+            load(port, paths, cookie, args.connections, args.duration)
+        )
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def prepare_data(notes_count):
+    """Пользователь, его заметки и cookie сессии для клиента."""
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+
+    from notes.models import Note
+
+    from .datasets import create_notes
+
+    user = get_user_model().objects.create(username='load')
+    create_notes([user.pk], notes_count, words=40)
+    client = Client()
+    client.force_login(user)
+    slugs = Note.objects.filter(author=user).values_list('slug', flat=True)
+    paths = ['/notes/'] + [f'/note/{slug}/' for slug in slugs[:9]]
+    return paths, client.cookies['sessionid'].value
+
+
+def main(argv=None):
+    parser = base_parser(__doc__.splitlines()[0])
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--notes', type=int, default=1000)
+    parser.add_argument('--db-threads', type=int, default=8)
+    parser.add_argument('--wsgi-threads', type=int, default=32)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--serve', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.serve:
+        run_server(args)
+        return
+
+    tmpdir = None
+    if not args.db_file:
+        # Серверу нужна база на диске: база в памяти видна только
+        # процессу, который её создал.
+        tmpdir = tempfile.TemporaryDirectory()
+        args.db_file = os.path.join(tmpdir.name, 'load.sqlite3')
+    setup_django()
+    try:
+        with benchmark_database(args.db_file):
+            paths, cookie = prepare_data(args.notes)
+            from django.db import connection
+            connection.close()
+            results = {
+                mode: run_mode(mode, args, paths, cookie)
+                for mode in args.modes
+            }
+    finally:
+        if tmpdir:
+            tmpdir.cleanup()
+    report({
+        'connections': args.connections,
+        'duration_s': args.duration,
+        'cpus': os.cpu_count(),
+        'db_threads': args.db_threads,
+        'wsgi_threads': args.wsgi_threads,
+        **results,
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
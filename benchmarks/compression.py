@@ -0,0 +1,167 @@
+"""Байты по сети и время до первого байта списка заметок со сжатием.
+
+Список заметок автора (NotesList) с ``--notes`` заметками запрашивается
+через настоящий HTTP-сервер (wsgiref в отдельном потоке) с разными
+заголовками Accept-Encoding:
+
+* ``identity`` — без сжатия, как до CompressionMiddleware;
+* ``gzip``;
+* ``br`` — только если установлен модуль brotli.
+
+По умолчанию все заметки выводятся одной страницей (``--per-page``).
+Для каждого режима — размер ответа на проводе (заголовки и тело),
+время до первого байта ответа и до его конца и оценка времени передачи
+по каналу ``--mbit``. Пример::
+
+    python -m benchmarks.compression --notes 1000 --runs 200
+"""
+import socket
+import threading
+import time
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+from .utils import (
+    base_parser, benchmark_database, report, setup_django, summarize
+)
+
+HOST = '127.0.0.1'
+ENCODINGS = ('identity', 'gzip', 'br')
+WORDS_PER_NOTE = 40
+
+
+class QuietHandler(WSGIRequestHandler):
+    """Обработчик wsgiref без журнала каждого запроса в stderr."""
+
+    def log_message(self, *args):
+        pass
+
+
+def fetch(port, path, cookie, encoding):
+    """Время до первого байта, время до конца и сырой ответ."""
+    request = (
+        f'GET {path} HTTP/1.1\r\nHost: {HOST}\r\n'
+        f'Cookie: sessionid={cookie}\r\n'
+        f'Accept-Encoding: {encoding}\r\nConnection: close\r\n\r\n'
+    ).encode('latin-1')
+    started = time.perf_counter()
+    with socket.create_connection((HOST, port)) as sock:
+        sock.sendall(request)
+        chunks = [sock.recv(65536)]
+        first_byte = time.perf_counter()
+        while chunk := sock.recv(65536):
+            chunks.append(chunk)
+    return first_byte - started, time.perf_counter() - started, b''.join(
+        chunks
+    )
+
+
+def parse_response(raw):
+    head, _, body = raw.partition(b'\r\n\r\n')
+    status_line, *lines = head.decode('latin-1').split('\r\n')
+    if status_line.split(' ', 2)[1] != '200':
+        raise RuntimeError(status_line)
+    headers = {}
+    for line in lines:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return headers, body
+
+
+def measure(port, path, cookie, encodings, runs, mbit):
+    """
+    Сводка по каждой кодировке.
+
+    Кодировки чередуются внутри каждого прогона, чтобы дрейф времени
+    сервера одинаково влиял на все режимы. На локальном соединении
+    передача почти бесплатна, поэтому transfer_ms — оценка времени
+    передачи ответа по каналу в mbit Мбит/с.
+    """
+    samples = {encoding: ([], []) for encoding in encodings}
+    responses = {}
+    for _ in range(runs):
+        for encoding in encodings:
+            first_byte, elapsed, raw = fetch(port, path, cookie, encoding)
+            samples[encoding][0].append(first_byte)
+            samples[encoding][1].append(elapsed)
+            responses[encoding] = raw
+    result = {}
+    for encoding, (ttfb, total) in samples.items():
+        raw = responses[encoding]
+        headers, body = parse_response(raw)
+        result[encoding] = {
+            'content_encoding': headers.get('content-encoding', 'identity'),
+            'wire_bytes': len(raw),
+            'body_bytes': len(body),
+            'transfer_ms': round(len(raw) * 8 / (mbit * 1000), 4),
+            'ttfb': summarize(ttfb),
+            'total': summarize(total),
+        }
+    return result
+
+
+def main(argv=None):
+    parser = base_parser(__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=1000)
+    parser.add_argument(
+        '--per-page', type=int,
+        help='Заметок на странице; по умолчанию все на одной.',
+    )
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument(
+        '--mbit', type=float, default=10,
+        help='Скорость канала для оценки времени передачи, Мбит/с.',
+    )
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.core.wsgi import get_wsgi_application
+    from django.test import Client
+    from django.urls import reverse
+
+    from notes import middleware
+
+    from .datasets import create_notes, create_users
+
+    settings.NOTES_PER_PAGE = args.per_page or args.notes
+    encodings = [
+        encoding for encoding in ENCODINGS
+        if encoding != 'br' or middleware.brotli is not None
+    ]
+    with benchmark_database(args.db_file):
+        (author_id,) = create_users(1)
+        create_notes([author_id], args.notes, words=WORDS_PER_NOTE)
+        client = Client()
+        client.force_login(get_user_model().objects.get(pk=author_id))
+        cookie = client.cookies['sessionid'].value
+        path = reverse('notes:list')
+        server = make_server(
+            HOST, 0, get_wsgi_application(), handler_class=QuietHandler
+        )
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            # Прогрев: кеш шаблонов и первые запросы к базе.
+            fetch(server.server_port, path, cookie, 'identity')
+            result = {
+                'notes': args.notes,
+                'per_page': settings.NOTES_PER_PAGE,
+                'min_size': settings.NOTES_COMPRESS_MIN_SIZE,
+                'runs': args.runs,
+                'mbit': args.mbit,
+                **measure(
+                    server.server_port, path, cookie, encodings, args.runs,
+                    args.mbit,
+                ),
+            }
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+        report(result, args.output)
+    return result
+
+
+if __name__ == '__main__':
+    main()
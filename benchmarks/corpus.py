@@ -0,0 +1,19 @@
+"""Словарь для синтетических заголовков и текстов заметок."""
+import itertools
+
+WORDS = (
+    'заметка', 'список', 'покупок', 'встреча', 'проект', 'идеи', 'отпуск',
+    'задачи', 'неделя', 'книги', 'фильмы', 'рецепт', 'борщ', 'тренировка',
+    'отчёт', 'квартал', 'план', 'день', 'рождения', 'подарки', 'ремонт',
+    'кухня', 'щётка', 'чек-лист', 'объявление', 'съезд', 'журнал', 'юбилей',
+    'ёлка', 'цитаты', 'шпаргалка', 'экзамен', 'хозяйство', 'дача', 'урожай',
+)
+# Накопленные веса закона Ципфа: первые слова словаря самые частые.
+CUM_WEIGHTS = list(itertools.accumulate(
+    1 / rank for rank in range(1, len(WORDS) + 1)
+))
+
+
+def make_text(rng, count):
+    """Текст из count слов словаря с частотами по Ципфу."""
+    return ' '.join(rng.choices(WORDS, cum_weights=CUM_WEIGHTS, k=count))
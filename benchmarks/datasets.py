@@ -0,0 +1,166 @@
+"""Генераторы синтетических данных для замеров."""
+import random
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from notes.catalog import recount_tags
+from notes.models import Folder, Note, NoteTag, Tag
+
+from .corpus import make_text
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+
+
+def create_users(count, prefix='bench'):
+    """Создаёт пользователей пачками и возвращает их id."""
+    User.objects.bulk_create(
+        (User(username=f'{prefix}-{index}') for index in range(count)),
+        batch_size=BATCH_SIZE,
+    )
+    return list(
+        User.objects.filter(username__startswith=f'{prefix}-')
+        .order_by('id')
+        .values_list('id', flat=True)
+    )
+
+
+def create_notes(author_ids, total, text_size=200, seed=0, words=0):
+    """
+    Равномерно распределяет total заметок между авторами.
+
+    Заметки вставляются в случайном порядке авторов, как это происходит
+    в живой базе, чтобы записи одного автора не лежали подряд.
+    Если задано words, текст состоит из стольких слов словаря WORDS
+    с частотами по Ципфу, иначе это text_size одинаковых символов.
+    """
+    rng = random.Random(seed)
+    text = 'х' * text_size
+    with transaction.atomic():
+        batch = []
+        for index in range(total):
+            batch.append(Note(
+                title=f'Заметка {index}',
+                text=make_text(rng, words) if words else text,
+                slug=f'n-{index}',
+                author_id=rng.choice(author_ids),
+            ))
+            if len(batch) == BATCH_SIZE:
+                Note.objects.bulk_create(batch)
+                batch = []
+        Note.objects.bulk_create(batch)
+
+
+def zipf_counts(users, total, exponent=1.1):
+    """
+    Число заметок каждого из users авторов по закону Ципфа.
+
+    Автор с рангом r получает долю, пропорциональную 1 / r ** exponent;
+    сумма ровно total, остаток от округления достаётся первым авторам.
+    """
+    weights = [1 / rank ** exponent for rank in range(1, users + 1)]
+    scale = total / sum(weights)
+    counts = [int(weight * scale) for weight in weights]
+    for index in range(total - sum(counts)):
+        counts[index % users] += 1
+    return counts
+
+
+def create_zipf_notes(author_ids, total, exponent=1.1, max_words=400,
+                      seed=0):
+    """
+    Заметки с распределением по авторам по закону Ципфа.
+
+    Первый автор в author_ids самый активный. Заголовки из 2–6 слов,
+    длина текста от 3 до max_words слов с логарифмически равномерным
+    распределением: коротких заметок много, длинных мало. Возвращает
+    число заметок каждого автора.
+    """
+    rng = random.Random(seed)
+    counts = zipf_counts(len(author_ids), total, exponent)
+    owners = [
+        author_id
+        for author_id, count in zip(author_ids, counts)
+        for _ in range(count)
+    ]
+    rng.shuffle(owners)
+    with transaction.atomic():
+        batch = []
+        for index, author_id in enumerate(owners):
+            words = round(3 * (max_words / 3) ** rng.random())
+            batch.append(Note(
+                title=make_text(rng, rng.randint(2, 6)).capitalize(),
+                text=make_text(rng, words),
+                slug=f'z-{index}',
+                author_id=author_id,
+            ))
+            if len(batch) == BATCH_SIZE:
+                Note.objects.bulk_create(batch)
+                batch = []
+        Note.objects.bulk_create(batch)
+    return dict(zip(author_ids, counts))
+
+
+def create_tags(author_id, note_ids, count, max_per_note=3, exponent=1.1,
+                seed=0):
+    """
+    Метки автора с частотами по закону Ципфа.
+
+    Каждая заметка получает от 1 до max_per_note разных меток; первая
+    метка самая частая. Счётчики меток пересчитываются после загрузки.
+    Возвращает id меток по убыванию частоты.
+    """
+    rng = random.Random(seed)
+    Tag.objects.bulk_create(
+        Tag(author_id=author_id, name=f'Метка {rank}', slug=f'tag-{rank}')
+        for rank in range(count)
+    )
+    tags = Tag.objects.filter(author_id=author_id)
+    by_slug = dict(tags.values_list('slug', 'id'))
+    tag_ids = [by_slug[f'tag-{rank}'] for rank in range(count)]
+    weights = [1 / rank ** exponent for rank in range(1, count + 1)]
+    with transaction.atomic():
+        batch = []
+        for note_id in note_ids:
+            chosen = set(rng.choices(
+                tag_ids, weights=weights, k=rng.randint(1, max_per_note)
+            ))
+            batch.extend(
+                NoteTag(note_id=note_id, tag_id=tag_id) for tag_id in chosen
+            )
+            if len(batch) >= BATCH_SIZE:
+                NoteTag.objects.bulk_create(batch)
+                batch = []
+        NoteTag.objects.bulk_create(batch)
+        recount_tags(tags)
+    return tag_ids
+
+
+def create_folders(author_id, note_ids, fanout=5, depth=3, seed=0):
+    """
+    Дерево папок автора: fanout папок на каждом из depth уровней.
+
+    Заметки раскладываются по папкам случайно и равномерно. Возвращает
+    папки по уровням: список корневых, список второго уровня и т. д.
+    """
+    rng = random.Random(seed)
+    levels = [[None]]
+    for level in range(depth):
+        levels.append([
+            Folder.objects.create(
+                author_id=author_id, parent=parent,
+                name=f'Папка {level}.{index}',
+            )
+            for parent in levels[-1]
+            for index in range(fanout)
+        ])
+    folders = [folder.pk for level in levels[1:] for folder in level]
+    with transaction.atomic():
+        by_folder = {}
+        for note_id in note_ids:
+            by_folder.setdefault(rng.choice(folders), []).append(note_id)
+        for folder_id, ids in by_folder.items():
+            Note.objects.filter(pk__in=ids).update(folder_id=folder_id)
+    return levels[1:]
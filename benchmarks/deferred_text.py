@@ -0,0 +1,49 @@
+"""Экономия памяти и времени от отложенной загрузки Note.text в списке.
+
+Пример запуска::
+
+    python -m benchmarks.deferred_text --notes 2000 --text-kb 32
+"""
+from .utils import (
+    base_parser, benchmark_database, measure, peak_memory, report,
+    setup_django
+)
+
+
+def main(argv=None):
+    parser = base_parser(__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=2000)
+    parser.add_argument('--text-kb', type=int, default=32)
+    parser.add_argument('--per-page', type=int, default=50)
+    parser.add_argument('--runs', type=int, default=30)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from notes.models import Note
+
+    from .datasets import create_notes, create_users
+
+    with benchmark_database(args.db_file):
+        author_ids = create_users(1)
+        create_notes(author_ids, args.notes, text_size=args.text_kb * 1024)
+        notes = Note.objects.filter(author_id=author_ids[0]).order_by('id')
+        modes = {
+            'full_rows': notes,
+            'summary': notes.summary(),
+        }
+        result = {'notes': args.notes, 'text_kb': args.text_kb}
+        for name, queryset in modes.items():
+            page = queryset[:args.per_page]
+            result[name] = {
+                'page': measure(lambda: list(page.all()), args.runs),
+                'page_peak_kib': peak_memory(lambda: list(page.all())),
+                'all_notes': measure(lambda: list(queryset.all()), 3),
+                'all_notes_peak_kib': peak_memory(
+                    lambda: list(queryset.all())
+                ),
+            }
+        report(result, args.output)
+
+
+if __name__ == '__main__':
+    main()
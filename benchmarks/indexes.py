@@ -0,0 +1,146 @@
+"""Планы и латентность горячих запросов до и после составных индексов.
+
+Пример запуска на полном объёме::
+
+    python -m benchmarks.indexes --users 10000 --notes 1000000 \
+        --db-file /tmp/bench.sqlite3
+
+На PostgreSQL замер запускается с настройками, где ``default`` указывает
+на PostgreSQL: планы берутся через ``EXPLAIN`` той базы, а в отчёт
+попадает SQL каждого запроса.
+"""
+import random
+
+from .utils import (
+    base_parser, benchmark_database, measure, report, setup_django
+)
+
+# Признаки полного просмотра таблицы или сортировки в памяти.
+BAD_PLAN_MARKERS = {
+    'sqlite': ('SCAN', 'TEMP B-TREE'),
+    'postgresql': ('Seq Scan', 'Sort'),
+    'mysql': ('ALL', 'filesort'),
+}
+LEGACY_INDEX = 'bench_notes_note_author_id'
+# До миграции 0013 slug был уникален среди всех заметок; в наборе
+# данных create_notes это так и есть.
+LEGACY_SLUG_INDEX = 'bench_notes_note_slug'
+
+
+def hot_queries(author_id, slug, cursor, per_page):
+    """Запросы, которые выполняют представления на основе NoteBase."""
+    from notes.models import Note
+
+    notes = Note.objects.filter(author_id=author_id)
+    return {
+        'list_first_page': notes.order_by('id')[:per_page + 1],
+        'list_deep_page': (
+            notes.filter(id__gt=cursor).order_by('id')[:per_page + 1]
+        ),
+        'detail_by_slug': notes.filter(slug=slug),
+        # Проверка формы: slug уникален в пределах автора.
+        'slug_is_taken': notes.filter(slug=slug).exclude(id=0),
+    }
+
+
+def inspect(queryset, vendor):
+    plan = queryset.explain()
+    markers = BAD_PLAN_MARKERS.get(vendor, ())
+    return {
+        'sql': str(queryset.query),
+        'plan': plan.splitlines(),
+        'scan_or_sort': any(marker in plan for marker in markers),
+    }
+
+
+def run_round(samples, per_page, runs):
+    from django.db import connection
+
+    result = {}
+    for author_id, slug, cursor in samples:
+        for name, queryset in hot_queries(
+                author_id, slug, cursor, per_page).items():
+            entry = result.setdefault(
+                name, inspect(queryset, connection.vendor)
+            )
+            entry.setdefault('timings', []).append(
+                measure(lambda: list(queryset.all()), runs)
+            )
+    for entry in result.values():
+        timings = entry.pop('timings')
+        entry['latency'] = {
+            key: round(sum(t[key] for t in timings) / len(timings), 4)
+            for key in ('p50_ms', 'p95_ms', 'p99_ms')
+        }
+    return result
+
+
+def drop_composite_indexes():
+    """
+    Возвращает схему к состоянию до миграции 0003.
+
+    Тогда у заметок были только индекс внешнего ключа на автора
+    и уникальный индекс slug.
+    """
+    from django.db import connection
+
+    from notes.models import Note
+
+    table = Note._meta.db_table
+    with connection.schema_editor() as editor:
+        for index in Note._meta.indexes:
+            if index.name == 'note_author_id_idx':
+                editor.remove_index(Note, index)
+        for constraint in Note._meta.constraints:
+            if constraint.name == 'note_author_slug_unique':
+                editor.remove_constraint(Note, constraint)
+        editor.execute(f'CREATE INDEX {LEGACY_INDEX} ON {table} (author_id)')
+        editor.execute(
+            f'CREATE UNIQUE INDEX {LEGACY_SLUG_INDEX} ON {table} (slug)'
+        )
+
+
+def main(argv=None):
+    parser = base_parser(__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--notes', type=int, default=1_000_000)
+    parser.add_argument('--samples', type=int, default=20)
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--per-page', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.db import connection
+
+    from notes.models import Note
+
+    from .datasets import create_notes, create_users
+
+    with benchmark_database(args.db_file):
+        author_ids = create_users(args.users)
+        create_notes(author_ids, args.notes)
+        rng = random.Random(1)
+        samples = []
+        for author_id in rng.sample(author_ids, args.samples):
+            ids = list(
+                Note.objects.filter(author_id=author_id)
+                .values_list('id', 'slug')
+            )
+            if not ids:
+                continue
+            middle_id, slug = ids[len(ids) // 2]
+            samples.append((author_id, slug, middle_id))
+        with_indexes = run_round(samples, args.per_page, args.runs)
+        drop_composite_indexes()
+        without_indexes = run_round(samples, args.per_page, args.runs)
+        report({
+            'vendor': connection.vendor,
+            'users': args.users,
+            'notes': args.notes,
+            'with_composite_indexes': with_indexes,
+            'without_composite_indexes': without_indexes,
+        }, args.output)
+
+
+if __name__ == '__main__':
+    main()
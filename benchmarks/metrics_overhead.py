@@ -0,0 +1,68 @@
+"""Накладные расходы MetricsMiddleware на один запрос.
+
+Представление, которое выполняет ``--queries`` простейших запросов
+к базе, вызывается напрямую и через middleware; разница медиан — цена
+замеров. Чтобы шум не перекрыл разницу, варианты чередуются ``--rounds``
+раз и берётся лучшая медиана каждого. Бюджет — 50 мкс.
+
+Пример запуска::
+
+    python -m benchmarks.metrics_overhead --runs 20000
+"""
+from .utils import (
+    base_parser, benchmark_database, measure, report, setup_django
+)
+
+BUDGET_US = 50
+
+
+def main(argv=None):
+    parser = base_parser(__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=5)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.db import connection
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from django.urls import resolve
+
+    from notes.middleware import MetricsMiddleware
+
+    def view(request):
+        with connection.cursor() as cursor:
+            for _ in range(args.queries):
+                cursor.execute('SELECT 1')
+        return HttpResponse('ok')
+
+    with benchmark_database(args.db_file):
+        request = RequestFactory().get('/notes/')
+        request.resolver_match = resolve('/notes/')
+        middleware = MetricsMiddleware(view)
+        plain = measured = None
+        for _ in range(args.rounds):
+            plain = min(
+                plain or {'p50_ms': float('inf')},
+                measure(lambda: view(request), args.runs),
+                key=lambda result: result['p50_ms'],
+            )
+            measured = min(
+                measured or {'p50_ms': float('inf')},
+                measure(lambda: middleware(request), args.runs),
+                key=lambda result: result['p50_ms'],
+            )
+        overhead_us = round((measured['p50_ms'] - plain['p50_ms']) * 1000, 1)
+        report({
+            'queries': args.queries,
+            'plain': plain,
+            'metrics': measured,
+            'overhead_p50_us': overhead_us,
+            'budget_us': BUDGET_US,
+            'within_budget': overhead_us < BUDGET_US,
+        }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Размер истории версий и время восстановления версии заметки.
+
+``--notes`` заметок из ``--words`` слов правятся ``--edits`` раз каждая
+через модель, как в NoteUpdate: правка заменяет, вставляет или удаляет
+несколько слов, иногда меняется заголовок. В отчёте:
+
+* байт на версию в истории против полной копии текста — как есть
+  и сжатой zlib;
+* время сохранения заметки вместе с записью версии;
+* время восстановления случайной версии (get_revision) — один запрос
+  и не больше NOTES_REVISION_SNAPSHOT_EVERY правок.
+
+Каждая восстановленная версия сверяется с исходным текстом. Пример::
+
+    python -m benchmarks.revisions --edits 5000 --snapshot-every 20
+"""
+import random
+import time
+import zlib
+
+from .utils import (
+    base_parser, benchmark_database, report, setup_django, summarize
+)
+
+
+def edit(rng, text, words):
+    """Текст с несколькими заменёнными, вставленными или удалёнными словами."""
+    from .corpus import make_text
+
+    tokens = text.split(' ')
+    for _ in range(rng.randint(1, 3)):
+        position = rng.randrange(len(tokens))
+        action = rng.random()
+        if action < 0.6:
+            tokens[position] = make_text(rng, 1)
+        elif action < 0.8 or len(tokens) < words // 2:
+            tokens.insert(position, make_text(rng, rng.randint(1, 5)))
+        else:
+            del tokens[position:position + rng.randint(1, 5)]
+    return ' '.join(tokens)
+
+
+def main(argv=None):
+    parser = base_parser(__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=3)
+    parser.add_argument('--edits', type=int, default=2000)
+    parser.add_argument('--words', type=int, default=400)
+    parser.add_argument('--runs', type=int, default=1000)
+    parser.add_argument(
+        '--snapshot-every', type=int,
+        help='NOTES_REVISION_SNAPSHOT_EVERY на время замера.',
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.db.models import Sum
+    from django.db.models.functions import Length
+    from django.test.utils import override_settings
+
+    from notes.models import Note, NoteRevision
+    from notes.revisions import get_revision
+
+    from .corpus import make_text
+
+    snapshot_every = (
+        args.snapshot_every or settings.NOTES_REVISION_SNAPSHOT_EVERY
+    )
+    rng = random.Random(args.seed)
+    with benchmark_database(args.db_file), override_settings(
+        NOTES_REVISION_SNAPSHOT_EVERY=snapshot_every
+    ):
+        author = get_user_model().objects.create(username='bench')
+        history = {}
+        save_samples = []
+        full_bytes = full_zlib_bytes = 0
+        for index in range(args.notes):
+            note = Note.objects.create(
+                title=f'Заметка {index}', author=author,
+                text=make_text(rng, args.words),
+            )
+            versions = [(note.title, note.text)]
+            for number in range(2, args.edits + 2):
+                text = note.text
+                while note.text == text:
+                    note.text = edit(rng, text, args.words)
+                if number % 50 == 0:
+                    note.title = f'Заметка {index}, правка {number}'
+                started = time.perf_counter()
+                note.save()
+                save_samples.append(time.perf_counter() - started)
+                versions.append((note.title, note.text))
+            for _, text in versions:
+                full_bytes += len(text.encode())
+                full_zlib_bytes += len(zlib.compress(text.encode(), 9))
+            history[note.pk] = (note, versions)
+
+        revisions = NoteRevision.objects.filter(note__author=author)
+        count = revisions.count()
+        stored = revisions.aggregate(size=Sum(Length('data')))['size']
+        snapshots = revisions.filter(is_snapshot=True).count()
+
+        restore_samples = []
+        notes = list(history.values())
+        for _ in range(args.runs):
+            note, versions = rng.choice(notes)
+            number = rng.randint(1, len(versions))
+            started = time.perf_counter()
+            revision = get_revision(note, number)
+            restore_samples.append(time.perf_counter() - started)
+            if (revision.title, revision.text) != versions[number - 1]:
+                raise SystemExit(
+                    f'Версия {number} заметки {note.pk} восстановлена '
+                    'с ошибкой.'
+                )
+
+    result = {
+        'notes': args.notes,
+        'edits': args.edits,
+        'words': args.words,
+        'snapshot_every': snapshot_every,
+        'revisions': count,
+        'snapshots': snapshots,
+        'bytes_per_revision': round(stored / count, 1),
+        'full_copy_bytes': round(full_bytes / count, 1),
+        'full_copy_zlib_bytes': round(full_zlib_bytes / count, 1),
+        'ratio_to_full_copy': round(stored / full_bytes, 4),
+        'save': summarize(save_samples),
+        'restore': summarize(restore_samples),
+    }
+    report(result, args.output)
+    return result
+
+
+if __name__ == '__main__':
+    main()
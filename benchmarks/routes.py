@@ -0,0 +1,316 @@
+"""Латентность, запросы к базе и память каждого маршрута notes и auth.
+
+Данные — пользователи с числом заметок по закону Ципфа и русскими
+текстами разной длины. Каждый маршрут notes.urls и yanote.urls.auth_urls
+запрашивается через тестовый клиент от имени самого активного автора,
+а команды import_notes и export_notes прогоняются на файле из
+``--import-notes`` заметок. Маршрут без сценария — ошибка: новый
+маршрут нужно добавить в ROUTE_CASES.
+
+С ``--baseline`` отчёт сравнивается с сохранённым ранее (``--output``),
+и в поле ``regressions`` попадают замеры, у которых p95 вырос больше
+чем на ``--tolerance``, или стало больше запросов к базе. Пример::
+
+    python manage.py run_benchmarks routes --output base.json
+    python manage.py run_benchmarks routes --baseline base.json
+"""
+import json
+import os
+import tempfile
+import time
+from collections import namedtuple
+
+from .utils import (
+    base_parser, benchmark_database, compare_with_baseline, peak_memory,
+    report, setup_django, summarize
+)
+
+# Сценарий маршрута. client — имя клиента (author, staff, api, anonymous),
+# args — функция от данных сценария, prepare — действие перед каждым
+# прогоном, которое в замер не входит.
+Case = namedtuple(
+    'Case', 'name method client args data prepare',
+    defaults=('GET', 'author', None, None, None),
+)
+
+NEW_NOTE = {'title': 'Новая заметка', 'text': 'Текст новой заметки'}
+
+# Меток у автора для страниц меток и фильтров списка.
+TAGS = 50
+
+
+def victim_slug(state):
+    return state['victim']
+
+
+def create_victim(state):
+    """Заметка, которую удалит следующий прогон."""
+    from notes.models import Note
+
+    state['victim'] = Note.objects.create(
+        author_id=state['author'].pk, **NEW_NOTE
+    ).slug
+
+
+def note_slug(state):
+    return state['slug']
+
+
+def note_args(state):
+    return [note_slug(state)]
+
+
+ROUTE_CASES = (
+    Case('notes:home'),
+    Case('notes:home', client='anonymous'),
+    Case('notes:list'),
+    Case('notes:add'),
+    Case('notes:add', 'POST', data=NEW_NOTE),
+    Case('notes:detail', args=note_args),
+    Case('notes:revisions', args=note_args),
+    Case('notes:revision', args=lambda state: [note_slug(state), 1]),
+    Case('notes:revision', 'POST', args=lambda state: [note_slug(state), 1]),
+    Case('notes:edit', args=note_args),
+    Case('notes:edit', 'POST', args=note_args, data=lambda state: {
+        'title': 'Изменённая', 'text': 'Текст', 'slug': note_slug(state),
+    }),
+    Case('notes:delete', args=note_args),
+    Case('notes:delete', 'POST', args=lambda state: [victim_slug(state)],
+         prepare=create_victim),
+    Case('notes:search', data={'q': 'заметка список'}),
+    Case('notes:tags'),
+    Case('notes:folders'),
+    Case('notes:folder-add'),
+    Case('notes:folder-add', 'POST', data={'name': 'Новая папка'}),
+    Case('notes:success'),
+    Case('notes:metrics', client='staff'),
+    Case('notes:api-list', client='api'),
+    Case('notes:api-list', 'POST', client='api', data=NEW_NOTE),
+    Case('notes:api-detail', client='api', args=note_args),
+    Case('notes:api-detail', 'PATCH', client='api', args=note_args,
+         data={'text': 'Изменённый текст'}),
+    Case('notes:api-detail', 'DELETE', client='api',
+         args=lambda state: [victim_slug(state)], prepare=create_victim),
+    Case('notes:api-lookup', 'POST', client='api',
+         data=lambda state: {'slugs': state['slugs']}),
+    Case('notes:api-batch', 'POST', client='api',
+         data={'create': [NEW_NOTE] * 10}),
+    Case('users:login', client='anonymous'),
+    Case('users:login', 'POST', client='anonymous',
+         data=lambda state: {
+             'username': state['author'].username, 'password': 'bench',
+         }),
+    Case('users:logout', client='login'),
+    Case('users:signup', client='anonymous'),
+)
+
+
+def check_coverage():
+    """Каждый маршрут notes и auth покрыт сценарием."""
+    from notes import urls
+    from yanote.urls import auth_urls
+
+    patterns, namespace = auth_urls
+    names = {f'{urls.app_name}:{pattern.name}' for pattern in urls.urlpatterns}
+    names |= {f'{namespace}:{pattern.name}' for pattern in patterns}
+    missing = names - {case.name for case in ROUTE_CASES}
+    if missing:
+        raise SystemExit(
+            f'Нет сценария для маршрутов: {", ".join(sorted(missing))}'
+        )
+
+
+def resolve(value, state):
+    return value(state) if callable(value) else value
+
+
+def make_request(case, clients, state):
+    from django.urls import reverse
+
+    client = clients[case.client]()
+    url = reverse(case.name, args=resolve(case.args, state) or ())
+    data = resolve(case.data, state)
+    method = getattr(client, case.method.lower())
+    if case.client == 'api' and case.method != 'GET':
+        return lambda: method(
+            url, json.dumps(data or {}), content_type='application/json'
+        )
+    return lambda: method(url, data)
+
+
+def run_case(case, clients, state, runs):
+    """Латентность, число запросов и пиковая память сценария."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    samples, queries = [], []
+    status = None
+    for index in range(runs + 1):
+        if case.prepare:
+            case.prepare(state)
+        request = make_request(case, clients, state)
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = request()
+            elapsed = time.perf_counter() - started
+        status = response.status_code
+        # Первый прогон — прогрев кешей шаблонов и соединения.
+        if index:
+            samples.append(elapsed)
+            queries.append(len(captured))
+    if case.prepare:
+        case.prepare(state)
+    result = summarize(samples)
+    result['status'] = status
+    result['queries'] = max(queries)
+    result['peak_kib'] = peak_memory(make_request(case, clients, state))
+    return result
+
+
+def make_clients(state):
+    from django.test import Client
+
+    from notes.models import ApiToken
+
+    author, staff = state['author'], state['staff']
+    key = ApiToken.objects.issue(author, 'bench')
+
+    def logged_in(user):
+        def factory():
+            client = Client()
+            client.force_login(user)
+            return client
+        return factory
+
+    author_client = logged_in(author)()
+    staff_client = logged_in(staff)()
+    api_client = Client(HTTP_AUTHORIZATION=f'Token {key}')
+    return {
+        'author': lambda: author_client,
+        'staff': lambda: staff_client,
+        'api': lambda: api_client,
+        'anonymous': Client,
+        # Выход завершает сессию, поэтому каждый раз новая.
+        'login': logged_in(author),
+    }
+
+
+def run_commands(author, count, runs):
+    """Время и память import_notes и export_notes на файле из count заметок."""
+    from django.core.management import call_command
+
+    from notes.models import Note
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, 'import.jsonl')
+        with open(source, 'w', encoding='utf-8') as file:
+            for index in range(count):
+                file.write(json.dumps({
+                    'title': f'Импорт {index}', 'text': 'Текст ' * 20,
+                    'slug': f'import-{index}',
+                }, ensure_ascii=False) + '\n')
+        target = os.path.join(tmpdir, 'export.jsonl')
+        commands = {
+            'import_notes': lambda: call_command(
+                'import_notes', source, author=author.username, verbosity=0
+            ),
+            'export_notes': lambda: call_command(
+                'export_notes', target, verbosity=0
+            ),
+        }
+        for name, command in commands.items():
+            samples = []
+            for _ in range(runs):
+                Note.objects.filter(slug__startswith='import-').delete()
+                started = time.perf_counter()
+                command()
+                samples.append(time.perf_counter() - started)
+            result = summarize(samples)
+            result['notes_per_second'] = round(
+                count / (result['p50_ms'] / 1000), 1
+            )
+            Note.objects.filter(slug__startswith='import-').delete()
+            result['peak_kib'] = peak_memory(command)
+            results[name] = result
+    return results
+
+
+def main(argv=None):
+    parser = base_parser(__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--notes', type=int, default=50_000)
+    parser.add_argument('--zipf', type=float, default=1.1)
+    parser.add_argument('--runs', type=int, default=30)
+    parser.add_argument('--import-notes', type=int, default=5000)
+    parser.add_argument('--command-runs', type=int, default=3)
+    parser.add_argument('--baseline', help='Отчёт для сравнения.')
+    parser.add_argument(
+        '--tolerance', type=float, default=0.2,
+        help='Допустимый рост p95 относительно базового отчёта.',
+    )
+    args = parser.parse_args(argv)
+
+    setup_django()
+    check_coverage()
+    from django.contrib.auth import get_user_model
+
+    from notes.models import Note
+    from notes.revisions import record_snapshots
+
+    from .datasets import (
+        create_folders, create_tags, create_users, create_zipf_notes
+    )
+
+    User = get_user_model()
+    with benchmark_database(args.db_file):
+        author_ids = create_users(args.users)
+        counts = create_zipf_notes(author_ids, args.notes, args.zipf)
+        author = User.objects.get(pk=author_ids[0])
+        author.set_password('bench')
+        author.save()
+        staff = User.objects.create(username='bench-staff', is_staff=True)
+        notes = Note.objects.filter(author=author).order_by('pk')
+        slugs = list(notes.values_list('slug', flat=True)[:50])
+        # Заметки набора созданы bulk_create, без истории версий.
+        record_snapshots(list(notes[:1]))
+        note_ids = list(notes.values_list('pk', flat=True))
+        create_tags(author.pk, note_ids, TAGS)
+        create_folders(author.pk, note_ids)
+        state = {
+            'author': author, 'staff': staff,
+            'slug': slugs[0], 'slugs': slugs,
+        }
+        clients = make_clients(state)
+        result = {
+            'dataset': {
+                'users': args.users,
+                'notes': args.notes,
+                'zipf': args.zipf,
+                'author_notes': counts[author.pk],
+            },
+            'runs': args.runs,
+            'routes': {
+                f'{case.method} {case.name} ({case.client})': run_case(
+                    case, clients, state, args.runs
+                )
+                for case in ROUTE_CASES
+            },
+            'commands': run_commands(
+                author, args.import_notes, args.command_runs
+            ),
+        }
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+        result['regressions'] = compare_with_baseline(
+            {**result['routes'], **result['commands']},
+            {**baseline['routes'], **baseline['commands']},
+            args.tolerance,
+        )
+    report(result, args.output)
+    return result
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Латентность полнотекстового поиска против поиска подстрокой.
+
+Пример запуска на полном объёме::
+
+    python -m benchmarks.search --users 10000 --notes 1000000 \
+        --db-file /tmp/bench.sqlite3
+
+Цель — p95 поиска по индексу не больше ``--p95-target-ms``; итог
+проверки попадает в отчёт в поле ``meets_target``.
+"""
+import random
+
+from .corpus import WORDS
+from .utils import (
+    base_parser, benchmark_database, measure, report, setup_django
+)
+
+
+def make_queries(count, seed=0):
+    """Запросы из одного-двух слов в разных формах и транслите."""
+    from pytils.translit import translify
+
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        words = rng.sample(WORDS, rng.randint(1, 2))
+        if rng.random() < 0.2:
+            words = [translify(word.replace('ё', 'е')) for word in words]
+        queries.append(' '.join(words))
+    return queries
+
+
+def run_backend(backend, samples, limit, runs):
+    latency = [
+        measure(lambda: backend.search(author_id, query, limit), runs)
+        for author_id, query in samples
+    ]
+    found = [
+        len(backend.search(author_id, query, limit))
+        for author_id, query in samples
+    ]
+    return {
+        'backend': type(backend).__name__,
+        'mean_found': round(sum(found) / len(found), 2),
+        'latency': {
+            key: round(sum(entry[key] for entry in latency) / len(latency), 4)
+            for key in ('p50_ms', 'p95_ms', 'p99_ms')
+        },
+    }
+
+
+def main(argv=None):
+    parser = base_parser(__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--notes', type=int, default=1_000_000)
+    parser.add_argument('--words', type=int, default=40)
+    parser.add_argument('--samples', type=int, default=50)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--p95-target-ms', type=float, default=20.0)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.db import connection
+
+    from notes.search import get_backend
+    from notes.search.simple import SimpleSearchBackend
+
+    from .datasets import create_notes, create_users
+
+    with benchmark_database(args.db_file):
+        author_ids = create_users(args.users)
+        create_notes(author_ids, args.notes, words=args.words)
+        rng = random.Random(1)
+        samples = list(zip(
+            rng.choices(author_ids, k=args.samples),
+            make_queries(args.samples),
+        ))
+        indexed = run_backend(
+            get_backend(), samples, args.limit, args.runs
+        )
+        substring = run_backend(
+            SimpleSearchBackend('default'), samples, args.limit, args.runs
+        )
+        report({
+            'vendor': connection.vendor,
+            'users': args.users,
+            'notes': args.notes,
+            'p95_target_ms': args.p95_target_ms,
+            'meets_target': (
+                indexed['latency']['p95_ms'] <= args.p95_target_ms
+            ),
+            'indexed': indexed,
+            'substring': substring,
+        }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Запросы к базе и латентность авторизованных страниц в режимах сессий.
+
+Страницы NotesList и NoteDetail запрашиваются через тестовый клиент
+от имени автора с ``--notes`` заметками в каждом режиме хранения
+сессий (YANOTE_SESSION_MODE) и для сравнения со стандартными сессиями
+Django в базе, AuthenticationMiddleware и ModelBackend (``django_db``).
+Во всех режимах пользователь берётся через CachedModelBackend.
+Для каждого режима считаются все запросы к базе и те из них, что
+читают сессию или пользователя. Пример::
+
+    python -m benchmarks.sessions --runs 500
+"""
+import time
+
+from .utils import (
+    base_parser, benchmark_database, report, setup_django, summarize
+)
+
+STOCK_AUTH = 'django.contrib.auth.middleware.AuthenticationMiddleware'
+STOCK_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+
+# Режим → SESSION_ENGINE и нужна ли стандартная аутентификация Django.
+MODES = {
+    'django_db': ('django.contrib.sessions.backends.db', True),
+    'db': ('notes.sessions.db', False),
+    'cached_db': ('notes.sessions.cached_db', False),
+    'signed_cookies': (
+        'django.contrib.sessions.backends.signed_cookies', False
+    ),
+}
+SESSION_TABLES = ('"django_session"', '"notes_usersession"', '"auth_user"')
+
+
+def mode_settings(engine, stock_auth):
+    from django.conf import settings
+
+    middleware = [
+        STOCK_AUTH if name == 'notes.middleware.AuthenticationMiddleware'
+        and stock_auth else name
+        for name in settings.MIDDLEWARE
+    ]
+    backends = [STOCK_BACKEND] if stock_auth else (
+        settings.AUTHENTICATION_BACKENDS
+    )
+    return {
+        'SESSION_ENGINE': engine,
+        'MIDDLEWARE': middleware,
+        'AUTHENTICATION_BACKENDS': backends,
+    }
+
+
+def run_page(client, url, runs):
+    """Латентность страницы и запросы к базе на один запрос."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    samples = []
+    queries = session_queries = 0
+    # Первый запрос прогревает кеши шаблонов и сессий.
+    for index in range(runs + 1):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url)
+            elapsed = time.perf_counter() - started
+        assert response.status_code == 200, response.status_code
+        if index:
+            samples.append(elapsed)
+            queries = len(captured)
+            session_queries = sum(
+                any(table in query['sql'] for table in SESSION_TABLES)
+                for query in captured
+            )
+    result = summarize(samples)
+    result['queries'] = queries
+    result['session_queries'] = session_queries
+    return result
+
+
+def main(argv=None):
+    parser = base_parser(__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=500)
+    parser.add_argument('--notes', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    from django.test.utils import override_settings
+    from django.urls import reverse
+
+    from notes.models import Note
+
+    from .datasets import create_notes, create_users
+
+    with benchmark_database(args.db_file):
+        author = get_user_model().objects.get(pk=create_users(1)[0])
+        create_notes([author.pk], args.notes)
+        slug = Note.objects.filter(author=author).first().slug
+        pages = {
+            'NotesList': reverse('notes:list'),
+            'NoteDetail': reverse('notes:detail', args=[slug]),
+        }
+        result = {'runs': args.runs, 'notes': args.notes, 'modes': {}}
+        for mode, (engine, stock_auth) in MODES.items():
+            with override_settings(**mode_settings(engine, stock_auth)):
+                client = Client()
+                client.force_login(author)
+                result['modes'][mode] = {
+                    page: run_page(client, url, args.runs)
+                    for page, url in pages.items()
+                }
+    report(result, args.output)
+    return result
+
+
+if __name__ == '__main__':
+    main()
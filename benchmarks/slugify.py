@@ -0,0 +1,65 @@
+"""Микробенчмарк: кеширующий slugify против прямого вызова pytils.
+
+Корпус — кириллические заголовки с распределением Ципфа: при импорте
+и правке заметок одни и те же заголовки повторяются многократно.
+
+Пример запуска::
+
+    python -m benchmarks.slugify --titles 100000 --distinct 5000
+"""
+import random
+import time
+
+from .corpus import WORDS
+from .utils import base_parser, report, setup_django
+
+
+def make_corpus(total, distinct, seed=0):
+    """Заголовки, частоты которых подчиняются закону Ципфа."""
+    rng = random.Random(seed)
+    titles = [
+        ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 6)))
+        + f' {index}'
+        for index in range(distinct)
+    ]
+    weights = [1 / rank for rank in range(1, distinct + 1)]
+    return rng.choices(titles, weights=weights, k=total)
+
+
+def run(func, corpus):
+    started = time.perf_counter()
+    for title in corpus:
+        func(title)
+    elapsed = time.perf_counter() - started
+    return {
+        'seconds': round(elapsed, 4),
+        'us_per_call': round(elapsed / len(corpus) * 1e6, 3),
+    }
+
+
+def main(argv=None):
+    parser = base_parser(__doc__.splitlines()[0])
+    parser.add_argument('--titles', type=int, default=100_000)
+    parser.add_argument('--distinct', type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from pytils.translit import slugify as translit_slugify
+
+    from notes import slugs
+
+    corpus = make_corpus(args.titles, args.distinct)
+    slugs._transliterate.cache_clear()
+    result = {
+        'titles': args.titles,
+        'distinct': args.distinct,
+        'pytils': run(translit_slugify, corpus),
+        'cached_cold': run(slugs.slugify, corpus),
+        'cached_warm': run(slugs.slugify, corpus),
+        'cache': slugs.slugify_cache_info()._asdict(),
+    }
+    report(result, args.output)
+
+
+if __name__ == '__main__':
+    main()
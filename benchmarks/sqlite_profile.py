@@ -0,0 +1,170 @@
+"""Параллельные чтения и записи заметок с профилями базы default и production.
+
+Каждый рабочий поток в течение ``--duration`` секунд читает первую
+страницу списка заметок и одну заметку, а с вероятностью
+``--write-share`` вместо этого создаёт заметку так же, как NoteCreate:
+форма без slug и сохранение в transaction.atomic. Нагрузка запускается
+дважды: потоками в одном процессе и отдельными процессами, каждый
+со своим соединением. Ошибки «database is locked» считаются отдельно.
+
+Пример запуска::
+
+    python -m benchmarks.sqlite_profile --workers 8 --duration 10
+"""
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+
+from .utils import (
+    base_parser, benchmark_database, report, setup_django, summarize
+)
+
+PROFILES = ('default', 'production')
+
+
+def work(db_file, author_ids, duration, write_share, seed):
+    """Нагрузка одного потока; возвращает счётчики и латентность записи."""
+    from django.conf import settings
+    from django.db import IntegrityError, OperationalError, connection
+    from django.db import transaction
+
+    from notes.forms import NoteForm
+    from notes.models import SUMMARY_FIELDS, Note
+
+    settings.DATABASES['default']['NAME'] = db_file
+    rng = random.Random(seed)
+    stats = {'reads': 0, 'writes': 0, 'lock_errors': 0, 'other_errors': 0}
+    write_latencies = []
+    deadline = time.perf_counter() + duration
+    try:
+        while time.perf_counter() < deadline:
+            author_id = rng.choice(author_ids)
+            started = time.perf_counter()
+            try:
+                if rng.random() < write_share:
+                    form = NoteForm({'title': 'Параллельная', 'text': 'Т'})
+                    form.is_valid()
+                    form.instance.author_id = author_id
+                    with transaction.atomic():
+                        form.save()
+                    write_latencies.append(time.perf_counter() - started)
+                    stats['writes'] += 1
+                else:
+                    notes = Note.objects.filter(author_id=author_id)
+                    page = list(notes.summary(SUMMARY_FIELDS)
+                                .order_by('-pk')[:settings.NOTES_PER_PAGE])
+                    if page:
+                        notes.get(slug=rng.choice(page).slug)
+                    stats['reads'] += 1
+            except OperationalError as error:
+                key = 'lock_errors' if 'locked' in str(error) else None
+                stats[key or 'other_errors'] += 1
+            except IntegrityError:
+                stats['other_errors'] += 1
+    finally:
+        connection.close()
+    return stats, write_latencies
+
+
+def run_threads(db_file, author_ids, threads, duration, write_share, seed):
+    results = [None] * threads
+
+    def target(index):
+        results[index] = work(
+            db_file, author_ids, duration, write_share, seed + index
+        )
+
+    workers = [
+        threading.Thread(target=target, args=(index,))
+        for index in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results
+
+
+def process_main(profile, db_file, author_ids, threads, duration,
+                 write_share, seed):
+    """Точка входа рабочего процесса: профиль задаётся до настройки."""
+    os.environ['YANOTE_DB_PROFILE'] = profile
+    setup_django()
+    return run_threads(
+        db_file, author_ids, threads, duration, write_share, seed
+    )
+
+
+def run_load(profile, db_file, author_ids, processes, threads, args):
+    """Запускает processes процессов по threads потоков в каждом."""
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(processes) as pool:
+        batches = pool.starmap(process_main, [
+            (profile, db_file, author_ids, threads, args.duration,
+             args.write_share, index * threads)
+            for index in range(processes)
+        ])
+    totals = {'reads': 0, 'writes': 0, 'lock_errors': 0, 'other_errors': 0}
+    write_latencies = []
+    for stats, latencies in (result for batch in batches for result in batch):
+        for key, value in stats.items():
+            totals[key] += value
+        write_latencies += latencies
+    operations = totals['reads'] + totals['writes']
+    # Запуск процессов в замер не входит: каждый поток работает ровно
+    # duration секунд.
+    elapsed = args.duration
+    return {
+        **totals,
+        'ops_per_second': round(operations / elapsed, 1),
+        'writes_per_second': round(totals['writes'] / elapsed, 1),
+        'write_latency': summarize(write_latencies) if write_latencies
+        else None,
+    }
+
+
+def main(argv=None):
+    parser = base_parser(__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--write-share', type=float, default=0.2)
+    parser.add_argument('--authors', type=int, default=20)
+    parser.add_argument('--notes', type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.db import connection
+
+    from .datasets import create_notes, create_users
+
+    result = {
+        'workers': args.workers,
+        'duration_s': args.duration,
+        'write_share': args.write_share,
+        'cpus': os.cpu_count(),
+    }
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for profile in PROFILES:
+            # Режим WAL сохраняется в файле базы, поэтому у каждого
+            # профиля своя база.
+            db_file = os.path.join(tmpdir, f'{profile}.sqlite3')
+            with benchmark_database(db_file):
+                author_ids = create_users(args.authors)
+                create_notes(author_ids, args.notes)
+                connection.close()
+                result[profile] = {
+                    'threads': run_load(
+                        profile, db_file, author_ids, 1, args.workers, args
+                    ),
+                    'processes': run_load(
+                        profile, db_file, author_ids, args.workers, 1, args
+                    ),
+                }
+    report(result, args.output)
+
+
+if __name__ == '__main__':
+    main()
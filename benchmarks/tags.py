@@ -0,0 +1,113 @@
+"""Фильтр списка заметок по метке и папке и облако меток на большом авторе.
+
+Автор получает ``--notes`` заметок, ``--tags`` меток с частотами по
+Ципфу (1–3 метки на заметку) и дерево папок ``--fanout`` в ширину
+и ``--depth`` в глубину. Через тестовый клиент замеряется NotesList:
+
+* с частой, средней и редкой меткой — первая страница и страница
+  из середины списка по курсору;
+* с корневой папкой (со всеми вложенными) и с папкой последнего уровня;
+* облако меток (TagList) по готовым счётчикам против COUNT по связям.
+
+В отчёт попадают и планы запросов страницы: фильтры должны читать
+диапазоны индексов, а не перебирать заметки автора. Пример::
+
+    python -m benchmarks.tags --notes 100000 --runs 50
+"""
+from .utils import (
+    base_parser, benchmark_database, measure, report, setup_django
+)
+
+
+def main(argv=None):
+    parser = base_parser(__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=100_000)
+    parser.add_argument('--tags', type=int, default=100)
+    parser.add_argument('--fanout', type=int, default=5)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--runs', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.db.models import Count
+    from django.test import Client
+    from django.urls import reverse
+
+    from notes.catalog import filter_notes
+    from notes.models import Note, Tag
+    from notes.pagination import FORWARD, encode_cursor
+
+    from .datasets import (
+        create_folders, create_notes, create_tags, create_users
+    )
+
+    with benchmark_database(args.db_file):
+        author = get_user_model().objects.get(pk=create_users(1)[0])
+        create_notes([author.pk], args.notes)
+        notes = Note.objects.filter(author=author)
+        note_ids = list(notes.order_by('id').values_list('id', flat=True))
+        tag_ids = create_tags(author.pk, note_ids, args.tags)
+        levels = create_folders(
+            author.pk, note_ids, fanout=args.fanout, depth=args.depth
+        )
+        tags = Tag.objects.in_bulk(tag_ids)
+        middle = encode_cursor(FORWARD, note_ids[len(note_ids) // 2])
+        cases = {}
+        for label, rank in (
+            ('frequent', 0), ('median', len(tag_ids) // 2), ('rare', -1)
+        ):
+            tag = tags[tag_ids[rank]]
+            cases[f'tag_{label}'] = ({'tag': tag.slug}, tag.note_count)
+            cases[f'tag_{label}_middle'] = (
+                {'tag': tag.slug, 'cursor': middle}, tag.note_count
+            )
+        for label, folder in (('root', levels[0][0]), ('leaf', levels[-1][0])):
+            params = {'folder': folder.pk}
+            matched = filter_notes(notes, author, params)[0].count()
+            cases[f'folder_{label}'] = (params, matched)
+
+        client = Client()
+        client.force_login(author)
+        list_url = reverse('notes:list')
+        result = {
+            'notes': args.notes,
+            'tags': args.tags,
+            'folders': sum(len(level) for level in levels),
+            'per_page': settings.NOTES_PER_PAGE,
+            'list': {},
+        }
+        for name, (params, matched) in cases.items():
+            result['list'][name] = {
+                'matched_notes': matched,
+                **measure(lambda: client.get(list_url, params), args.runs),
+            }
+        for name in ('tag_frequent', 'folder_root', 'folder_leaf'):
+            params = {
+                key: value for key, value in cases[name][0].items()
+                if key != 'cursor'
+            }
+            queryset, key, _ = filter_notes(notes, author, params)
+            result['list'][name]['plan'] = (
+                queryset.order_by(key)[:settings.NOTES_PER_PAGE + 1]
+                .explain().splitlines()
+            )
+
+        cloud_url = reverse('notes:tags')
+        result['cloud'] = {
+            'counters': measure(lambda: client.get(cloud_url), args.runs),
+            'count_query': measure(
+                lambda: list(
+                    Tag.objects.filter(author=author)
+                    .annotate(count=Count('notes'))
+                ),
+                args.runs,
+            ),
+        }
+    report(result, args.output)
+    return result
+
+
+if __name__ == '__main__':
+    main()
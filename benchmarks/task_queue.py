@@ -0,0 +1,125 @@
+"""Задержка сохранения заметки с фоновой записью версий и скорость очереди.
+
+У автора ``--notes`` заметок по ``--words`` слов. Сначала ``--edits``
+правок случайных заметок отправляются POST-запросами на NoteUpdate
+дважды: версия записывается прямо в запросе и задачей очереди
+(NOTES_TASK_QUEUE). Затем каждая заметка правится ещё раз для каждого
+размера пачки из ``--batch-sizes``, и Worker выполняет накопленные
+задачи: в отчёте задач в секунду и время на пачку. Стоимость фиксации
+транзакций видна только на файле базы, пример::
+
+    python -m benchmarks.task_queue --db-file /tmp/queue.sqlite3
+"""
+import random
+import time
+
+from .utils import (
+    base_parser, benchmark_database, report, setup_django, summarize
+)
+
+
+def change(rng, note, words):
+    """Правит текст заметки так, чтобы он точно изменился."""
+    from .revisions import edit
+
+    text = note.text
+    while note.text == text:
+        note.text = edit(rng, text, words)
+
+
+def main(argv=None):
+    parser = base_parser(__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=500)
+    parser.add_argument('--words', type=int, default=2000)
+    parser.add_argument('--edits', type=int, default=200)
+    parser.add_argument(
+        '--batch-sizes', type=int, nargs='+', default=[1, 10, 50, 200]
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    from django.test.utils import override_settings
+    from django.urls import reverse
+
+    from notes.models import Note, NoteRevision, Task
+    from notes.queue import Worker
+
+    from .corpus import make_text
+
+    rng = random.Random(args.seed)
+    with benchmark_database(args.db_file):
+        author = get_user_model().objects.create(username='bench')
+        notes = [
+            Note.objects.create(
+                title=f'Заметка {index}', author=author,
+                text=make_text(rng, args.words),
+            )
+            for index in range(args.notes)
+        ]
+        client = Client()
+        client.force_login(author)
+        result = {
+            'notes': args.notes,
+            'words': args.words,
+            'edits': args.edits,
+            'save': {},
+            'workers': {},
+        }
+        for mode, queued in (('inline', False), ('queued', True)):
+            samples = []
+            with override_settings(NOTES_TASK_QUEUE=queued):
+                for _ in range(args.edits):
+                    note = rng.choice(notes)
+                    change(rng, note, args.words)
+                    started = time.perf_counter()
+                    response = client.post(
+                        reverse('notes:edit', args=[note.slug]),
+                        {'title': note.title, 'text': note.text,
+                         'slug': note.slug},
+                    )
+                    samples.append(time.perf_counter() - started)
+                    if response.status_code != 302:
+                        raise SystemExit(
+                            f'Правка не сохранена: {response.status_code}.'
+                        )
+            result['save'][mode] = summarize(samples)
+        Worker().run()
+
+        for batch_size in args.batch_sizes:
+            with override_settings(NOTES_TASK_QUEUE=True):
+                for note in notes:
+                    change(rng, note, args.words)
+                    note.save()
+            count = Task.objects.count()
+            started = time.perf_counter()
+            done = Worker(batch_size=batch_size).run()
+            elapsed = time.perf_counter() - started
+            if done != count or Task.objects.exists():
+                raise SystemExit(
+                    f'Пачки по {batch_size}: выполнено {done} задач '
+                    f'из {count}.'
+                )
+            result['workers'][f'batch_{batch_size}'] = {
+                'tasks': done,
+                'tasks_per_second': round(done / elapsed, 1),
+                'ms_per_batch': round(
+                    elapsed * 1000 / -(-done // batch_size), 3
+                ),
+            }
+        # Все версии записаны: по одной на создание и на каждую правку.
+        expected = args.notes * (1 + len(args.batch_sizes)) + 2 * args.edits
+        revisions = NoteRevision.objects.filter(note__author=author).count()
+        if revisions != expected:
+            raise SystemExit(
+                f'Записано версий: {revisions}, ожидалось {expected}.'
+            )
+        result['revisions'] = revisions
+    report(result, args.output)
+    return result
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Время рендеринга страницы до и после кеширования шаблонов и шапки.
+
+Сравниваются три конфигурации движка шаблонов:
+
+* ``before`` — загрузчики без кеша, шапка без фрагментного кеша
+  и с тегами url, которые вычисляют адреса на каждый запрос;
+* ``cached_loader`` — скомпилированные шаблоны кешируются, шапка прежняя;
+* ``after`` — как в настройках проекта: кеш шаблонов, шапка
+  во фрагментном кеше и готовые адреса ссылок из notes.context_processors.
+
+Страница notes/success.html рендерится вместе с получением шаблона,
+как в представлении, для автора и анонимного пользователя. Пример::
+
+    python -m benchmarks.templates --runs 5000
+"""
+import re
+
+from .utils import (
+    base_parser, benchmark_database, measure, report, setup_django
+)
+
+TEMPLATE = 'notes/success.html'
+HEADER = 'includes/header.html'
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# Автономный Engine, в отличие от бэкенда DjangoTemplates, не подключает
+# библиотеки тегов установленных приложений: base.html загружает
+# notes_static во всех конфигурациях.
+LIBRARIES = {
+    'cache': 'django.templatetags.cache',
+    'notes_static': 'notes.templatetags.notes_static',
+}
+BASE_PROCESSORS = [
+    'django.template.context_processors.request',
+    'django.contrib.auth.context_processors.auth',
+]
+
+
+def legacy_header(engine):
+    """
+    Шапка в прежнем виде: без {% cache %} и с тегами url.
+
+    Получается из текущей шапки, чтобы разметка обеих версий совпадала.
+    """
+    from notes.context_processors import NAV_ROUTES
+
+    source = engine.get_template(HEADER).source
+    source = re.sub(r'{% (load |end)?cache[^%]*%}\n?', '', source)
+    return re.sub(
+        r'{{ nav_urls\.(\w+) }}',
+        lambda match: "{%% url '%s' %%}" % NAV_ROUTES[match[1]],
+        source,
+    )
+
+
+def make_engines():
+    from django.conf import settings
+    from django.template import Engine
+
+    dirs = settings.TEMPLATES[0]['DIRS']
+    current = Engine(dirs=dirs, loaders=LOADERS, libraries=LIBRARIES)
+    legacy = [
+        ('django.template.loaders.locmem.Loader',
+         {HEADER: legacy_header(current)}),
+        *LOADERS,
+    ]
+    return {
+        'before': Engine(
+            dirs=dirs, loaders=legacy, context_processors=BASE_PROCESSORS,
+            libraries=LIBRARIES,
+        ),
+        'cached_loader': Engine(
+            dirs=dirs,
+            loaders=[('django.template.loaders.cached.Loader', legacy)],
+            context_processors=BASE_PROCESSORS,
+            libraries=LIBRARIES,
+        ),
+        'after': Engine(
+            dirs=dirs,
+            loaders=[('django.template.loaders.cached.Loader', LOADERS)],
+            context_processors=[
+                *BASE_PROCESSORS, 'notes.context_processors.navigation',
+            ],
+            libraries=LIBRARIES,
+        ),
+    }
+
+
+def main(argv=None):
+    parser = base_parser(__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.models import AnonymousUser
+    from django.template import RequestContext
+    from django.test import RequestFactory
+
+    with benchmark_database(args.db_file):
+        users = {
+            'author': get_user_model().objects.create(username='bench'),
+            'anonymous': AnonymousUser(),
+        }
+        result = {'template': TEMPLATE, 'runs': args.runs}
+        for name, engine in make_engines().items():
+            result[name] = {}
+            for kind, user in users.items():
+                request = RequestFactory().get('/done/')
+                request.user = user
+
+                def render():
+                    template = engine.get_template(TEMPLATE)
+                    return template.render(RequestContext(request, {}))
+
+                render()
+                result[name][kind] = measure(render, args.runs)
+        report(result, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Размер базы и латентность страниц при сжатии больших текстов заметок.
+
+Автор получает ``--notes`` заметок-журналов по ``--text-kb`` КиБ
+(строки с отметкой времени и словами словаря) и столько же коротких
+заметок. Для каждого значения NOTES_TEXT_COMPRESSION (без сжатия,
+zlib, lzma) в отчёте:
+
+* байт в колонке text и размер файла базы;
+* время сохранения журнала;
+* латентность NotesList (текст не загружается) и NoteDetail журнала;
+* байт текста, прочитанных из базы на одну страницу NoteDetail.
+
+Пример::
+
+    python -m benchmarks.text_compression --notes 10 --text-kb 2048
+"""
+import random
+import time
+
+from .utils import (
+    base_parser, benchmark_database, measure, report, setup_django,
+    summarize
+)
+
+ALGORITHMS = (None, 'zlib', 'lzma')
+
+
+def make_log(rng, size):
+    """Текст журнала примерно из size байт в UTF-8."""
+    from .corpus import make_text
+
+    lines = []
+    total = 0
+    while total < size:
+        line = (
+            f'2026-10-18 12:{len(lines) // 60 % 60:02}:{len(lines) % 60:02} '
+            f'INFO {make_text(rng, rng.randint(4, 12))}'
+        )
+        lines.append(line)
+        total += len(line.encode()) + 1
+    return '\n'.join(lines)
+
+
+def database_size(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA page_count')
+        pages = cursor.fetchone()[0]
+        cursor.execute('PRAGMA page_size')
+        return pages * cursor.fetchone()[0]
+
+
+def main(argv=None):
+    parser = base_parser(__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=10)
+    parser.add_argument('--text-kb', type=int, default=1024)
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import override_settings
+    from django.urls import reverse
+
+    from notes.models import Note
+
+    rng = random.Random(args.seed)
+    logs = [make_log(rng, args.text_kb * 1024) for _ in range(args.notes)]
+    result = {
+        'notes': args.notes,
+        'text_kb': args.text_kb,
+        'runs': args.runs,
+        'algorithms': {},
+    }
+    for algorithm in ALGORITHMS:
+        with benchmark_database(args.db_file), override_settings(
+            NOTES_TEXT_COMPRESSION=algorithm
+        ):
+            author = get_user_model().objects.create(username='bench')
+            save_samples = []
+            for index, text in enumerate(logs):
+                Note.objects.create(
+                    title=f'Заметка {index}', text='Короткий текст.',
+                    author=author,
+                )
+                note = Note(title=f'Журнал {index}', text=text, author=author)
+                started = time.perf_counter()
+                note.save()
+                save_samples.append(time.perf_counter() - started)
+            if Note.objects.get(pk=note.pk).text != text:
+                raise SystemExit(f'Текст журнала {algorithm} искажён.')
+            with connection.cursor() as cursor:
+                # Длина строки в SQLite — в символах, длина BLOB — в байтах.
+                cursor.execute(
+                    'SELECT sum(length(CAST(text AS BLOB))) FROM notes_note'
+                )
+                stored = cursor.fetchone()[0]
+                cursor.execute(
+                    'SELECT length(CAST(text AS BLOB)) FROM notes_note '
+                    'WHERE id = %s', [note.pk]
+                )
+                detail_bytes = cursor.fetchone()[0]
+            client = Client()
+            client.force_login(author)
+            list_url = reverse('notes:list')
+            detail_url = reverse('notes:detail', args=[note.slug])
+            result['algorithms'][algorithm or 'none'] = {
+                'text_bytes': stored,
+                'database_bytes': database_size(connection),
+                'save': summarize(save_samples),
+                'list': measure(lambda: client.get(list_url), args.runs),
+                'detail': measure(lambda: client.get(detail_url), args.runs),
+                'detail_text_bytes_read': detail_bytes,
+            }
+    report(result, args.output)
+    return result
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Пропускная способность импорта заметок командой import_notes.
+
+Файл JSON Lines со случайными заметками нескольких авторов
+импортируется во временную базу; результат — заметок в секунду
+и в минуту. Цель — миллион заметок в минуту на WAL-базе в файле.
+С очередью задач (YANOTE_TASK_QUEUE) первые версии заметок пишутся
+в фоне и в замер не входят.
+
+Пример запуска::
+
+    YANOTE_DB_PROFILE=production python -m benchmarks.transfer --db-file b.db
+"""
+import io
+import json
+import os
+import random
+import tempfile
+import time
+
+from .corpus import WORDS
+from .utils import base_parser, benchmark_database, report, setup_django
+
+
+def write_records(path, authors, total, words, seed=0):
+    """Записывает total заметок со случайными текстами из WORDS."""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as file:
+        for index in range(total):
+            file.write(json.dumps({
+                'title': ' '.join(rng.choices(WORDS, k=3)) + f' {index}',
+                'text': ' '.join(rng.choices(WORDS, k=words)),
+                'author': rng.choice(authors),
+            }, ensure_ascii=False) + '\n')
+
+
+def main(argv=None):
+    parser = base_parser(__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=30_000)
+    parser.add_argument('--authors', type=int, default=50)
+    parser.add_argument('--words', type=int, default=40)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.core.management import call_command
+
+    from .datasets import create_users
+
+    with benchmark_database(args.db_file), \
+            tempfile.TemporaryDirectory() as directory:
+        create_users(args.authors)
+        path = os.path.join(directory, 'notes.jsonl')
+        write_records(
+            path, [f'bench-{index}' for index in range(args.authors)],
+            args.notes, args.words,
+        )
+        started = time.perf_counter()
+        call_command(
+            'import_notes', path, batch_size=args.batch_size,
+            stdout=io.StringIO(),
+        )
+        elapsed = time.perf_counter() - started
+    result = {
+        'notes': args.notes,
+        'authors': args.authors,
+        'words': args.words,
+        'seconds': round(elapsed, 3),
+        'notes_per_second': round(args.notes / elapsed),
+        'notes_per_minute': round(args.notes / elapsed * 60),
+    }
+    report(result, args.output)
+    return result
+
+
+if __name__ == '__main__':
+    main()
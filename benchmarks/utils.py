@@ -0,0 +1,122 @@
+"""Общие помощники для замеров: настройка Django, база и статистика."""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+def setup_django():
+    """Инициализирует Django, если скрипт запущен напрямую."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanote.settings')
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def base_parser(description):
+    """Парсер аргументов с общими для всех замеров опциями."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        '--db-file',
+        help='Файл SQLite для временной базы (по умолчанию база в памяти).',
+    )
+    parser.add_argument(
+        '--output', help='Куда дополнительно записать JSON-отчёт.'
+    )
+    return parser
+
+
+@contextmanager
+def benchmark_database(db_file=None):
+    """Создаёт временную базу с применёнными миграциями."""
+    from django.conf import settings
+    from django.test.utils import setup_databases, teardown_databases
+
+    if db_file:
+        settings.DATABASES['default'].setdefault('TEST', {})
+        settings.DATABASES['default']['TEST']['NAME'] = db_file
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+def percentile(samples, fraction):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Сводка латентности в миллисекундах по замерам в секундах."""
+    millis = [sample * 1000 for sample in samples]
+    return {
+        'runs': len(millis),
+        'mean_ms': round(statistics.fmean(millis), 4),
+        'p50_ms': round(percentile(millis, 0.50), 4),
+        'p95_ms': round(percentile(millis, 0.95), 4),
+        'p99_ms': round(percentile(millis, 0.99), 4),
+    }
+
+
+def measure(func, runs):
+    """Вызывает func указанное число раз и возвращает сводку."""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def peak_memory(func):
+    """Пиковый прирост памяти Python за время вызова, в КиБ."""
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+def compare_with_baseline(current, baseline, tolerance):
+    """
+    Замеры, ставшие хуже базовых.
+
+    current и baseline — словари «имя замера → сводка». Регрессия —
+    рост p95 больше чем в 1 + tolerance раз или рост числа запросов
+    к базе. Замеры, которых нет в базовом отчёте, не сравниваются.
+    """
+    regressions = []
+    for name, result in current.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append({
+                'name': name, 'metric': 'p95_ms',
+                'baseline': base['p95_ms'], 'current': result['p95_ms'],
+            })
+        if result.get('queries', 0) > base.get('queries', 0):
+            regressions.append({
+                'name': name, 'metric': 'queries',
+                'baseline': base['queries'], 'current': result['queries'],
+            })
+    return regressions
+
+
+def report(result, output=None):
+    """Печатает JSON-отчёт и при необходимости сохраняет его в файл."""
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    sys.stdout.write(text + '\n')
+    if output:
+        with open(output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
@@ -0,0 +1,411 @@
+"""JSON API для заметок.
+
+Клиент аутентифицируется токеном в заголовке ``Authorization: Token
+<ключ>`` (ключ выдаёт команда create_api_token) или сессией браузера.
+Токен не зависит от cookie, поэтому CSRF-проверка для него не нужна;
+при сессии изменяющие запросы должны передать заголовок X-CSRFToken.
+
+Изменяющий запрос с заголовком ``Idempotency-Key`` выполняется один
+раз: повтор с тем же ключом и телом возвращает сохранённый ответ.
+Пакетные операции выполняются в одной транзакции: либо применяются
+все изменения, либо ни одно.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router, transaction
+from django.http import HttpResponse, JsonResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from .conditional import AuthorNotesConditionalMixin, NoteConditionalMixin
+from .forms import NoteForm
+from .models import ApiToken, IdempotencyKey, Note
+from .pagination import InvalidCursor, KeysetPaginator
+
+# Поля заметки, которые может запросить клиент.
+API_FIELDS = ('id', 'slug', 'title', 'text', 'updated_at')
+EDITABLE_FIELDS = NoteForm.Meta.fields
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+TOKEN_PREFIX = 'Token '
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+IDEMPOTENCY_KEY_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+JSON_CONTENT_TYPE = 'application/json'
+
+
+class ApiError(Exception):
+    """Ошибка, которую клиент получает в виде JSON с кодом status."""
+
+    def __init__(self, status, message, errors=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.errors = errors
+
+    def response(self):
+        data = {'detail': self.message}
+        if self.errors:
+            data['errors'] = self.errors
+        return json_response(data, self.status)
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data,
+        status=status,
+        encoder=DjangoJSONEncoder,
+        json_dumps_params={'ensure_ascii': False},
+    )
+
+
+def serialize(note, fields):
+    return {field: getattr(note, field) for field in fields}
+
+
+def parse_fields(value):
+    """Список полей из параметра ``fields=slug,title`` или JSON-массива."""
+    if not value:
+        return API_FIELDS
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, list):
+        raise ApiError(400, 'fields: ожидается список полей.')
+    fields = tuple(dict.fromkeys(str(field).strip() for field in value))
+    unknown = set(fields) - set(API_FIELDS)
+    if unknown:
+        raise ApiError(
+            400, f'Неизвестные поля: {", ".join(sorted(unknown))}.'
+        )
+    return fields
+
+
+def parse_list(payload, name, limit):
+    value = payload.get(name, [])
+    if not isinstance(value, list):
+        raise ApiError(400, f'{name}: ожидается список.')
+    if len(value) > limit:
+        raise ApiError(400, f'{name}: не больше {limit} элементов.')
+    return value
+
+
+def parse_slugs(payload, name):
+    slugs = parse_list(payload, name, settings.NOTES_API_MAX_BATCH)
+    if not all(isinstance(slug, str) for slug in slugs):
+        raise ApiError(400, f'{name}: ожидается список slug.')
+    return slugs
+
+
+def form_errors(form):
+    return {field: list(errors) for field, errors in form.errors.items()}
+
+
+def save_note(author, data, note=None):
+    """
+    Создаёт или обновляет заметку через NoteForm.
+
+    Проверки те же, что и у HTML-форм. При обновлении не переданные
+    поля берутся из заметки, как в PATCH.
+    """
+    if not isinstance(data, dict):
+        raise ApiError(400, 'Ожидается объект заметки.')
+    if note is not None:
+        data = {
+            **{field: getattr(note, field) for field in EDITABLE_FIELDS},
+            **data,
+        }
+    form = NoteForm(data, instance=note, author=author)
+    if not form.is_valid():
+        raise ApiError(400, 'Ошибка в данных заметки.', form_errors(form))
+    if note is None:
+        form.instance.author = author
+    saved = form.save_unless_slug_taken()
+    if saved is None:
+        raise ApiError(409, f'slug {form.instance.slug} уже занят.')
+    return saved
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ApiView(View):
+    """
+    Общая часть представлений API: аутентификация, разбор JSON,
+    транзакция и ключи идемпотентности для изменяющих запросов.
+    """
+
+    payload = None
+    # POST, который только читает данные: без транзакции и ключей.
+    read_only = False
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            self.authenticate(request)
+            if request.method in SAFE_METHODS:
+                return super().dispatch(request, *args, **kwargs)
+            self.payload = self.parse_body(request)
+            if self.read_only:
+                return super().dispatch(request, *args, **kwargs)
+            # Заметки автора могут лежать в шарде (notes/shards.py): пакет
+            # изменений атомарен и там. Без шардов это та же транзакция.
+            with transaction.atomic(), transaction.atomic(
+                using=router.db_for_write(Note), savepoint=False
+            ):
+                record = self.claim_idempotency_key(request)
+                if record is not None and record.status:
+                    return HttpResponse(
+                        record.body,
+                        status=record.status,
+                        content_type=JSON_CONTENT_TYPE,
+                    )
+                response = super().dispatch(request, *args, **kwargs)
+                if record is not None:
+                    record.status = response.status_code
+                    record.body = response.content.decode()
+                    record.save(update_fields=('status', 'body'))
+                return response
+        except ApiError as error:
+            return error.response()
+
+    def authenticate(self, request):
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if header.startswith(TOKEN_PREFIX):
+            token = ApiToken.objects.authenticate(
+                header[len(TOKEN_PREFIX):].strip()
+            )
+            if token is None:
+                raise ApiError(401, 'Недействительный токен.')
+            request.user = token.user
+            return
+        if not request.user.is_authenticated:
+            raise ApiError(401, 'Требуется аутентификация.')
+        if request.method not in SAFE_METHODS:
+            # Сессию браузер отправляет сам, поэтому от подделки
+            # запроса защищает только CSRF-токен в заголовке.
+            middleware = CsrfViewMiddleware(lambda request: None)
+            if middleware.process_view(request, None, (), {}) is not None:
+                raise ApiError(403, 'CSRF-проверка не пройдена.')
+
+    def parse_body(self, request):
+        if not request.body:
+            return {}
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            raise ApiError(400, 'Тело запроса должно быть JSON.')
+        if not isinstance(payload, dict):
+            raise ApiError(400, 'Тело запроса должно быть JSON-объектом.')
+        return payload
+
+    def claim_idempotency_key(self, request):
+        """
+        Запись ключа идемпотентности или None, если ключа нет.
+
+        Запись создаётся в транзакции запроса: если обработка упадёт,
+        ключ освободится вместе с откатом. Параллельный запрос с тем же
+        ключом дождётся фиксации на уникальном индексе и получит
+        сохранённый ответ.
+        """
+        key = request.META.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return None
+        if len(key) > IDEMPOTENCY_KEY_LENGTH:
+            raise ApiError(400, 'Слишком длинный Idempotency-Key.')
+        request_hash = hashlib.sha256(
+            f'{request.method} {request.path}\n'.encode() + request.body
+        ).hexdigest()
+        record, created = IdempotencyKey.objects.get_or_create(
+            user=request.user, key=key,
+            defaults={'request_hash': request_hash},
+        )
+        if created:
+            return record
+        expired = record.created_at < timezone.now() - timedelta(
+            seconds=settings.NOTES_API_IDEMPOTENCY_TTL
+        )
+        if expired:
+            record.request_hash = request_hash
+            record.created_at = timezone.now()
+            record.status = 0
+            record.body = ''
+        elif record.request_hash != request_hash:
+            raise ApiError(
+                422, 'Idempotency-Key уже использован для другого запроса.'
+            )
+        return record
+
+
+class ApiNoteMixin:
+    """Как и NoteBase, ограничивает заметки текущим пользователем."""
+
+    def get_queryset(self):
+        return Note.objects.filter(author=self.request.user)
+
+    def get_fields(self):
+        return parse_fields(self.request.GET.get('fields'))
+
+
+class NoteListApi(ApiNoteMixin, AuthorNotesConditionalMixin, ApiView):
+    """
+    GET — страница заметок по курсору, POST — новая заметка.
+
+    Параметры списка: ``cursor`` из ответа, ``limit`` и ``fields``.
+    """
+
+    def get(self, request):
+        return self.conditional_response(request, self.render_page)
+
+    def render_page(self):
+        request = self.request
+        fields = self.get_fields()
+        try:
+            limit = int(request.GET.get('limit', settings.NOTES_PER_PAGE))
+        except ValueError:
+            raise ApiError(400, 'limit должен быть числом.')
+        limit = max(1, min(limit, settings.NOTES_API_MAX_LIMIT))
+        paginator = KeysetPaginator(self.get_queryset().only(*fields), limit)
+        try:
+            page = paginator.page(request.GET.get('cursor'))
+        except InvalidCursor:
+            raise ApiError(400, 'Некорректный курсор страницы.')
+        return json_response({
+            'results': [serialize(note, fields) for note in page],
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        })
+
+    def post(self, request):
+        note = save_note(request.user, self.payload)
+        return json_response(serialize(note, API_FIELDS), 201)
+
+
+class NoteApi(ApiNoteMixin, NoteConditionalMixin, ApiView):
+    """GET, PATCH и DELETE одной заметки по slug."""
+
+    slug_url_kwarg = 'slug'
+
+    def get_note(self, fields=None):
+        queryset = self.get_queryset()
+        if fields:
+            queryset = queryset.only(*fields)
+        try:
+            return queryset.get(slug=self.kwargs[self.slug_url_kwarg])
+        except Note.DoesNotExist:
+            raise ApiError(404, 'Заметка не найдена.')
+
+    def get(self, request, slug):
+        fields = self.get_fields()
+        return self.conditional_response(
+            request,
+            lambda: json_response(serialize(self.get_note(fields), fields)),
+        )
+
+    def patch(self, request, slug):
+        note = save_note(request.user, self.payload, self.get_note())
+        return json_response(serialize(note, API_FIELDS))
+
+    def delete(self, request, slug):
+        self.get_note(('id', 'author')).delete()
+        return HttpResponse(status=204)
+
+
+class NoteLookupApi(ApiNoteMixin, ApiView):
+    """
+    Пакетное чтение: ``{"slugs": [...], "fields": [...]}``.
+
+    Все заметки выбираются одним запросом и возвращаются в порядке
+    slugs; чужие и несуществующие slug попадают в ``missing``.
+    """
+
+    read_only = True
+
+    def post(self, request):
+        slugs = parse_slugs(self.payload, 'slugs')
+        fields = parse_fields(self.payload.get('fields'))
+        notes = {
+            note.slug: note
+            for note in self.get_queryset()
+            .only(*fields, 'slug').filter(slug__in=slugs).order_by()
+        }
+        return json_response({
+            'results': [
+                serialize(notes[slug], fields)
+                for slug in slugs if slug in notes
+            ],
+            'missing': [slug for slug in slugs if slug not in notes],
+        })
+
+
+class NoteBatchApi(ApiNoteMixin, ApiView):
+    """
+    Пакетные изменения в одной транзакции.
+
+    Тело: ``{"delete": [slug, ...], "update": [{"slug": ..., "changes":
+    {...}}, ...], "create": [{...}, ...]}``. Операции выполняются в этом
+    порядке, поэтому новая заметка может занять slug удалённой. Ошибка
+    в любом элементе отменяет весь пакет; в ответе указано, где она.
+    """
+
+    def post(self, request):
+        limit = settings.NOTES_API_MAX_BATCH
+        to_delete = parse_slugs(self.payload, 'delete')
+        to_update = parse_list(self.payload, 'update', limit)
+        to_create = parse_list(self.payload, 'create', limit)
+        if len(to_delete) + len(to_update) + len(to_create) > limit:
+            raise ApiError(400, f'Не больше {limit} операций в пакете.')
+        return json_response({
+            'deleted': self.delete_notes(to_delete),
+            'updated': self.update_notes(to_update),
+            'created': [
+                serialize(
+                    self.run('create', index, save_note, data), API_FIELDS
+                )
+                for index, data in enumerate(to_create)
+            ],
+        })
+
+    def run(self, operation, index, func, *args):
+        """Выполняет операцию над элементом, указывая его в ошибке."""
+        try:
+            return func(self.request.user, *args)
+        except ApiError as error:
+            error.errors = {operation: {index: error.errors or error.message}}
+            raise
+
+    def load(self, slugs, operation):
+        notes = {
+            note.slug: note
+            for note in self.get_queryset().filter(slug__in=slugs)
+        }
+        missing = [slug for slug in slugs if slug not in notes]
+        if missing:
+            raise ApiError(
+                404, 'Заметки не найдены.', {operation: {'missing': missing}}
+            )
+        return notes
+
+    def delete_notes(self, slugs):
+        if slugs:
+            self.load(slugs, 'delete')
+            self.get_queryset().filter(slug__in=slugs).delete()
+        return slugs
+
+    def update_notes(self, items):
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or not isinstance(
+                    item.get('slug'), str):
+                raise ApiError(
+                    400, 'Ошибка в пакете.',
+                    {'update': {index: 'Ожидается {"slug", "changes"}.'}},
+                )
+        notes = self.load([item['slug'] for item in items], 'update')
+        return [
+            serialize(self.run(
+                'update', index, save_note,
+                item.get('changes', {}), notes[item['slug']],
+            ), API_FIELDS)
+            for index, item in enumerate(items)
+        ]
@@ -0,0 +1,21 @@
+"""Маршруты notes.urls, где страницы заметок заменены асинхронными."""
+from django.urls import path
+
+from notes import async_views
+from notes.urls import app_name, urlpatterns as sync_urlpatterns
+
+ASYNC_VIEWS = {
+    'list': async_views.note_list,
+    'detail': async_views.note_detail,
+    'add': async_views.note_create,
+    'edit': async_views.note_update,
+    'delete': async_views.note_delete,
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS[pattern.name], name=pattern.name)
+    if pattern.name in ASYNC_VIEWS else pattern
+    for pattern in sync_urlpatterns
+]
+
+__all__ = ('app_name', 'urlpatterns')
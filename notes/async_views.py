@@ -0,0 +1,201 @@
+"""Асинхронные представления заметок для запуска под ASGI.
+
+Django 3.2 не умеет обращаться к ORM из корутин, поэтому работа с базой
+идёт в отдельном пуле потоков (``NOTES_DB_THREADS``), а цикл событий
+занят разбором запроса и рендерингом шаблонов. Каждое представление
+переходит в пул один раз: проверка пользователя, валидаторы условного
+GET и выборка данных выполняются одним заданием.
+
+Маршруты с этими представлениями собраны в notes/async_urls.py
+и подключаются, когда выставлен ``NOTES_ASYNC_VIEWS``.
+"""
+import asyncio
+import contextvars
+import functools
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.db import close_old_connections
+from django.http import Http404, HttpResponseNotAllowed, HttpResponseRedirect
+from django.http.response import HttpResponseBase
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+
+from . import metrics
+from .conditional import (
+    author_notes_validators, not_modified, note_validators, set_validators
+)
+from .catalog import filter_notes
+from .forms import NoteWithTagsForm
+from .models import SUMMARY_FIELDS, Note
+from .pagination import InvalidCursor, KeysetPaginator
+
+ALLOWED_METHODS = ('GET', 'HEAD', 'POST')
+SUCCESS_URL = 'notes:success'
+
+# Шаблон с контекстом, который представление отрендерит в цикле событий.
+Page = namedtuple('Page', 'template_name context validators')
+
+
+@functools.lru_cache(maxsize=None)
+def db_executor():
+    return ThreadPoolExecutor(
+        settings.NOTES_DB_THREADS, thread_name_prefix='notes-db'
+    )
+
+
+def run_in_db_thread(func, *args):
+    try:
+        return func(*args)
+    finally:
+        # Как по сигналу request_finished: соединение закрывается
+        # по истечении CONN_MAX_AGE или если оно сломано.
+        close_old_connections()
+
+
+async def run_db(func, *args):
+    """Выполняет синхронную функцию, работающую с базой, в пуле."""
+    if not settings.NOTES_DB_THREADS:
+        return await sync_to_async(func)(*args)
+    # В отличие от sync_to_async, run_in_executor не переносит
+    # contextvars в поток, а по ним метрики находят текущий запрос.
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        db_executor(),
+        functools.partial(context.run, run_in_db_thread, func, *args),
+    )
+
+
+def login_required(loader):
+    """Загрузчик страницы только для авторизованных пользователей."""
+    @functools.wraps(loader)
+    def wrapper(request, *args):
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return loader(request, *args)
+    return wrapper
+
+
+def page_view(loader, methods=ALLOWED_METHODS):
+    """
+    Асинхронное представление из синхронного загрузчика страницы.
+
+    Загрузчик выполняется в пуле и возвращает готовый ответ (редирект,
+    304) или Page. Шаблон рендерится уже в цикле событий: данные к этому
+    моменту загружены, и обращений к базе при рендеринге нет.
+    """
+    async def view(request, *args, **kwargs):
+        if request.method not in methods:
+            return HttpResponseNotAllowed(methods)
+        result = await run_db(loader, request, *kwargs.values())
+        if isinstance(result, HttpResponseBase):
+            return result
+        started = time.perf_counter()
+        response = render(request, result.template_name, result.context)
+        metrics.add_render_time(time.perf_counter() - started)
+        return set_validators(response, result.validators)
+    view.__name__ = view.__qualname__ = loader.__name__
+    view.__doc__ = loader.__doc__
+    return view
+
+
+def author_notes(request):
+    """Как и NoteBase, ограничивает заметки текущим пользователем."""
+    return Note.objects.filter(author=request.user)
+
+
+@login_required
+def list_page(request):
+    """Список заметок пользователя."""
+    validators = author_notes_validators(request)
+    response = not_modified(request, validators)
+    if response is not None:
+        return set_validators(response, validators)
+    notes, key, filters = filter_notes(
+        author_notes(request).summary(SUMMARY_FIELDS), request.user,
+        request.GET,
+    )
+    paginator = KeysetPaginator(notes, settings.NOTES_PER_PAGE, key=key)
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        raise Http404('Некорректный курсор страницы.')
+    return Page('notes/list.html', {
+        'paginator': paginator,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
+        'object_list': page.object_list,
+        'note_list': page.object_list,
+        **filters,
+    }, validators)
+
+
+@login_required
+def detail_page(request, slug):
+    """Заметка подробно."""
+    validators = note_validators(request, slug)
+    if validators is None:
+        raise Http404('Заметка не найдена.')
+    response = not_modified(request, validators)
+    if response is not None:
+        return set_validators(response, validators)
+    note = get_object_or_404(
+        author_notes(request).select_related('folder'), slug=slug
+    )
+    return Page('notes/detail.html', {
+        'note': note, 'object': note, 'tags': list(note.tags.all()),
+    }, validators)
+
+
+def form_page(request, note=None):
+    """Форма заметки с сохранением, как у NoteFormMixin."""
+    if request.method != 'POST':
+        form = NoteWithTagsForm(instance=note, author=request.user)
+    else:
+        form = NoteWithTagsForm(
+            request.POST, instance=note, author=request.user
+        )
+        if form.is_valid():
+            if note is None:
+                form.instance.author = request.user
+            if form.save_unless_slug_taken() is not None:
+                return HttpResponseRedirect(reverse(SUCCESS_URL))
+    form.load_choices()
+    return Page('notes/form.html', {
+        'form': form, 'note': note, 'object': note,
+    }, None)
+
+
+@login_required
+def create_page(request):
+    """Добавление заметки."""
+    return form_page(request)
+
+
+@login_required
+def update_page(request, slug):
+    """Редактирование заметки."""
+    return form_page(
+        request, get_object_or_404(author_notes(request), slug=slug)
+    )
+
+
+@login_required
+def delete_page(request, slug):
+    """Удаление заметки; как и DeleteView, принимает и метод DELETE."""
+    note = get_object_or_404(author_notes(request), slug=slug)
+    if request.method in ('POST', 'DELETE'):
+        note.delete()
+        return HttpResponseRedirect(reverse(SUCCESS_URL))
+    return Page('notes/delete.html', {'note': note, 'object': note}, None)
+
+
+note_list = page_view(list_page, methods=('GET', 'HEAD'))
+note_detail = page_view(detail_page, methods=('GET', 'HEAD'))
+note_create = page_view(create_page)
+note_update = page_view(update_page)
+note_delete = page_view(delete_page, methods=ALLOWED_METHODS + ('DELETE',))
@@ -0,0 +1,16 @@
+from django.contrib.auth.backends import ModelBackend
+
+from .cache import get_cached_user
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend, который берёт пользователя сессии из кеша процесса.
+
+    Хеш пароля в сессии по-прежнему сверяется с пользователем
+    (см. notes.sessions.get_user), а смена пароля, изменение
+    пользователя и выход сбрасывают кеш (notes.signals).
+    """
+
+    def get_user(self, user_id):
+        return get_cached_user(user_id, super().get_user)
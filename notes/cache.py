@@ -0,0 +1,64 @@
+"""Кеширование данных, которые часто показываются пользователю."""
+from django.conf import settings
+from django.core.cache import cache, caches
+
+from .models import SUMMARY_FIELDS, Note
+
+RECENT_NOTES_KEY = 'notes:recent:{author_id}'
+USER_KEY = 'user:{user_id}'
+
+
+def recent_notes_key(author_id):
+    return RECENT_NOTES_KEY.format(author_id=author_id)
+
+
+def get_recent_notes(author):
+    """
+    Последние заметки автора для домашней страницы.
+
+    В кеше лежат словари, а не объекты моделей: они компактнее
+    и одинаково хорошо сериализуются для locmem и файлового бэкенда.
+    """
+    key = recent_notes_key(author.pk)
+    notes = cache.get(key)
+    if notes is None:
+        notes = list(
+            Note.objects.filter(author=author)
+            .order_by('-id')
+            .values(*SUMMARY_FIELDS)[:settings.NOTES_COUNT_ON_HOME_PAGE]
+        )
+        cache.set(key, notes, settings.NOTES_CACHE_TIMEOUT)
+    return notes
+
+
+def invalidate_author_cache(author_id):
+    """Сбрасывает закешированные данные автора после изменения заметок."""
+    cache.delete(recent_notes_key(author_id))
+
+
+def user_key(user_id):
+    return USER_KEY.format(user_id=user_id)
+
+
+def get_cached_user(user_id, load):
+    """
+    Пользователь из кеша CACHES['users'] или load(user_id).
+
+    Кеш локальный для процесса: изменения пользователя в этом процессе
+    сбрасывают его сразу (notes.signals), из других процессов видны
+    не позже чем через NOTES_USER_CACHE_TTL секунд. Каждый get отдаёт
+    свою копию объекта, поэтому запросы не делят один экземпляр.
+    """
+    users = caches['users']
+    key = user_key(user_id)
+    user = users.get(key)
+    if user is None:
+        user = load(user_id)
+        if user is not None:
+            users.set(key, user, settings.NOTES_USER_CACHE_TTL)
+    return user
+
+
+def invalidate_user_cache(user_id):
+    """Сбрасывает закешированного пользователя."""
+    caches['users'].delete(user_key(user_id))
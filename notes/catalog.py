@@ -0,0 +1,180 @@
+"""
+Метки и папки заметок.
+
+Список заметок фильтруется параметрами ``?tag=<slug>`` и
+``?folder=<id>``; папка выбирается вместе со всеми вложенными. Оба
+фильтра — соединение по индексу: метка читает диапазон индекса
+(tag_id, note_id) связей NoteTag, папки — диапазон пути по индексу
+(author_id, path) и заметки по индексу (folder_id, id).
+"""
+from django.db import router, transaction
+from django.db.models import Count, Exists, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils.http import urlencode
+
+from .models import AuthorNotesVersion, Folder, Note, NoteTag, Tag
+from .shards import home_db
+from .slugs import slugify
+
+TAG_SEPARATOR = ','
+MAX_TAGS_PER_NOTE = 20
+# Ключ пагинации списка с меткой: note_id связи заметки с меткой.
+TAGGED_KEY = 'tagged_id'
+
+
+def tag_slug(name):
+    return slugify(name, Tag._meta.get_field('slug').max_length)
+
+
+def parse_tags(value):
+    """Названия меток из строки через запятую, без пустых и повторов."""
+    names = {}
+    for name in value.split(TAG_SEPARATOR):
+        name = ' '.join(name.split())
+        if name:
+            names.setdefault(tag_slug(name), name)
+    return list(names.values())
+
+
+def format_tags(tags):
+    return f'{TAG_SEPARATOR} '.join(tag.name for tag in tags)
+
+
+def set_tags(note, names, created=False):
+    """
+    Оставляет у заметки ровно метки с названиями names.
+
+    Недостающие метки автора создаются. Счётчики заметок у меток
+    обновляет note_tags_changed в той же транзакции. У только что
+    созданной заметки (created) меток ещё нет, и они не запрашиваются.
+    """
+    if created and not names:
+        return
+    using = router.db_for_write(Note, instance=note)
+    slugs = {tag_slug(name): name for name in names}
+    tags = Tag.objects.using(using).none()
+    # Заметка сохраняется в транзакции вызывающего кода: точка
+    # сохранения не нужна, при ошибке откатится всё изменение.
+    with transaction.atomic(using=using, savepoint=False):
+        if slugs:
+            # ignore_conflicts: ту же метку мог создать параллельный
+            # запрос, тогда берём его строку.
+            Tag.objects.using(using).bulk_create(
+                [
+                    Tag(author_id=note.author_id, name=name, slug=slug)
+                    for slug, name in slugs.items()
+                ],
+                ignore_conflicts=True,
+            )
+            tags = Tag.objects.using(using).filter(
+                author_id=note.author_id, slug__in=list(slugs)
+            )
+        note.tags.set(tags)
+
+
+def update_tag_counts(instance, action, reverse, pk_set, using):
+    """
+    Сдвигает note_count меток на добавленные или удаляемые связи.
+
+    Вызывается из m2m_changed: после добавления (pk_set — только новые
+    связи) и до удаления, пока удаляемые связи ещё есть в базе.
+    """
+    links = NoteTag.objects.using(using)
+    if reverse:
+        links = links.filter(tag=instance)
+        if pk_set is not None:
+            links = links.filter(note__in=pk_set)
+    else:
+        links = links.filter(note=instance)
+        if pk_set is not None:
+            links = links.filter(tag__in=pk_set)
+    sign = 1 if action == 'post_add' else -1
+    tags = Tag.objects.using(using)
+    if reverse:
+        # Одна метка, у которой меняется сразу несколько заметок.
+        count = links.count()
+        if count:
+            tags.filter(pk=instance.pk).update(
+                note_count=F('note_count') + sign * count
+            )
+    else:
+        # У каждой метки меняется одна связь с этой заметкой.
+        tags.filter(pk__in=links.values('tag_id')).update(
+            note_count=F('note_count') + sign
+        )
+    AuthorNotesVersion.objects.using(home_db(using)).bump(
+        [instance.author_id]
+    )
+
+
+def forget_note_tags(note, using):
+    """Уменьшает счётчики меток удаляемой заметки."""
+    Tag.objects.using(using).filter(notes=note).update(
+        note_count=F('note_count') - 1
+    )
+
+
+def recount_tags(tags):
+    """
+    Пересчитывает note_count меток из queryset tags по связям NoteTag.
+
+    Нужен после загрузки связей через bulk_create, которая не отправляет
+    m2m_changed.
+    """
+    counts = (
+        NoteTag.objects.filter(tag=OuterRef('pk'))
+        .order_by().values('tag').annotate(count=Count('*'))
+        .values('count')
+    )
+    return tags.update(note_count=Coalesce(Subquery(counts), 0))
+
+
+def filter_notes(queryset, author, params):
+    """
+    Заметки queryset с меткой ``tag`` и в папке ``folder`` из params.
+
+    Возвращает queryset, ключ курсорной пагинации и контекст шаблона:
+    выбранные метку и папку и строку filter_query для ссылок пагинации.
+    Чужие и несуществующие метки и папки дают 404.
+
+    С меткой страницы идут по note_id связей: этот порядок даёт индекс
+    (tag_id, note_id), и страница читает из него ровно свой диапазон,
+    как бы часто ни встречалась метка. Папка без вложенных читается
+    диапазоном индекса (folder_id, id).
+    """
+    key = 'id'
+    context = {}
+    query = {}
+    slug = params.get('tag')
+    if slug:
+        tag = get_object_or_404(Tag, author=author, slug=slug)
+        key = TAGGED_KEY
+        queryset = queryset.filter(notetag__tag=tag).annotate(
+            **{key: F('notetag__note_id')}
+        )
+        context['tag'] = tag
+        query['tag'] = slug
+    folder_id = params.get('folder')
+    if folder_id:
+        try:
+            folder_id = int(folder_id)
+        except ValueError:
+            raise Http404('Некорректная папка.')
+        folder = get_object_or_404(
+            Folder.objects.annotate(has_children=Exists(
+                Folder.objects.filter(parent=OuterRef('pk'))
+            )),
+            author=author, pk=folder_id,
+        )
+        if folder.has_children:
+            queryset = queryset.filter(
+                folder__in=Folder.objects.subtree(folder).values('id')
+            )
+        else:
+            queryset = queryset.filter(folder=folder)
+        context['folder'] = folder
+        query['folder'] = folder_id
+    context['filter_query'] = urlencode(query)
+    return queryset, key, context
@@ -0,0 +1,16 @@
+from django.core.checks import Error, Tags, register
+
+from .staticfiles import missing_vendor_assets
+
+
+@register(Tags.staticfiles, deploy=True)
+def check_vendor_assets(app_configs, **kwargs):
+    """Перед выкладкой сторонние файлы должны лежать в static/vendor."""
+    return [
+        Error(
+            f'Нет стороннего файла {path}.',
+            hint='Скачайте его: manage.py vendor_assets.',
+            id='notes.E001',
+        )
+        for path in missing_vendor_assets()
+    ]
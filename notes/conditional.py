@@ -0,0 +1,116 @@
+"""Условные GET-запросы (ETag и Last-Modified) для страниц заметок.
+
+Валидаторы вычисляются одним запросом к индексу, до загрузки заметок
+и рендеринга шаблона, поэтому ответ 304 почти ничего не стоит.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import AuthorNotesVersion, Note
+
+
+def make_etag(*parts):
+    """Сильный ETag из частей, однозначно определяющих содержимое."""
+    raw = '\x1f'.join(str(part) for part in parts)
+    return quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+
+
+def author_notes_validators(request):
+    """
+    Валидаторы списка: счётчик изменений заметок автора.
+
+    В ETag входит полный путь с курсором: у каждой страницы списка
+    свой тег. Номер версии читается до выборки заметок: если заметки
+    изменятся между этими запросами, клиент просто получит страницу
+    ещё раз.
+    """
+    user = request.user
+    version, _ = AuthorNotesVersion.objects.get_or_create(author_id=user.pk)
+    etag = make_etag(
+        user.pk, user.get_username(), version.version,
+        request.get_full_path(),
+    )
+    return etag, version.updated_at
+
+
+def note_validators(request, slug):
+    """Валидаторы заметки: её id и время последнего изменения."""
+    user = request.user
+    try:
+        note_id, updated_at = Note.objects.values_list(
+            'id', 'updated_at'
+        ).get(author_id=user.pk, slug=slug)
+    except Note.DoesNotExist:
+        return None
+    etag = make_etag(
+        user.pk, user.get_username(), note_id, updated_at.isoformat()
+    )
+    return etag, updated_at
+
+
+def not_modified(request, validators):
+    """Ответ 304, если у клиента актуальная версия, иначе None."""
+    if validators is None:
+        return None
+    etag, last_modified = validators
+    return get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp())
+    )
+
+
+def set_validators(response, validators):
+    if validators is None:
+        return response
+    etag, last_modified = validators
+    response.headers.setdefault('ETag', etag)
+    response.headers.setdefault(
+        'Last-Modified', http_date(int(last_modified.timestamp()))
+    )
+    # Страницы персональные: общим кешам хранить их нельзя.
+    response.headers.setdefault('Cache-Control', 'private, no-cache')
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Отвечает 304 Not Modified, если у клиента актуальная версия страницы.
+
+    Подклассы возвращают из get_validators() пару (etag, last_modified)
+    или None, если валидаторов нет и страницу нужно отдать как обычно.
+    """
+
+    def get_validators(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, lambda: super(ConditionalGetMixin, self).get(
+                request, *args, **kwargs
+            )
+        )
+
+    def conditional_response(self, request, render):
+        """Ответ 304 или результат render() с заголовками валидаторов."""
+        validators = self.get_validators()
+        response = not_modified(request, validators)
+        if response is None:
+            response = render()
+        return set_validators(response, validators)
+
+
+class AuthorNotesConditionalMixin(ConditionalGetMixin):
+    """Валидаторы списка заметок автора, см. author_notes_validators."""
+
+    def get_validators(self):
+        return author_notes_validators(self.request)
+
+
+class NoteConditionalMixin(ConditionalGetMixin):
+    """Валидаторы одной заметки, см. note_validators."""
+
+    def get_validators(self):
+        return note_validators(
+            self.request, self.kwargs[self.slug_url_kwarg]
+        )
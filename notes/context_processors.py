@@ -0,0 +1,35 @@
+"""Данные для общих частей страниц: шапки и навигации."""
+import functools
+
+from django.conf import settings
+from django.urls import get_resolver, get_script_prefix, reverse
+
+# Ссылки шапки: имя в шаблоне → имя маршрута.
+NAV_ROUTES = {
+    'home': 'notes:home',
+    'list': 'notes:list',
+    'add': 'notes:add',
+    'tags': 'notes:tags',
+    'folders': 'notes:folders',
+    'login': 'users:login',
+    'logout': 'users:logout',
+    'signup': 'users:signup',
+}
+
+
+@functools.lru_cache(maxsize=None)
+def nav_urls_for(prefix, resolver):
+    """
+    Адреса ссылок шапки, вычисленные один раз.
+
+    Адрес зависит только от префикса приложения и схемы URL, поэтому
+    они и служат ключом: reverse() не выполняется на каждый запрос.
+    """
+    return {name: reverse(route) for name, route in NAV_ROUTES.items()}
+
+
+def navigation(request):
+    return {
+        'nav_urls': nav_urls_for(get_script_prefix(), get_resolver()),
+        'header_cache_timeout': settings.NOTES_HEADER_CACHE_TIMEOUT,
+    }
@@ -0,0 +1,117 @@
+"""
+Поле текста, который в SQLite хранится сжатым, если он большой.
+
+Текст не короче NOTES_TEXT_COMPRESS_THRESHOLD байт в UTF-8 сжимается
+алгоритмом NOTES_TEXT_COMPRESSION (zlib или lzma, None — не сжимать)
+и записывается в ту же колонку как BLOB: байт-заголовок с алгоритмом
+и сжатые данные. Короткий текст остаётся обычной строкой, так что
+колонка и запросы к ней для него не меняются. SQLite допускает BLOB
+в колонке TEXT; на остальных СУБД поле ведёт себя как TextField.
+
+Из базы сжатый текст приходит объектом CompressedText и распаковывается
+при первом обращении к атрибуту модели, поэтому запрос, который текст
+не выводит, за распаковку не платит. В values() и values_list()
+приходит сам CompressedText: текст из него даёт str().
+"""
+import lzma
+import zlib
+
+from django.conf import settings
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+ALGORITHMS = {
+    'zlib': (b'\x01', zlib.compress, zlib.decompress),
+    'lzma': (b'\x02', lzma.compress, lzma.decompress),
+}
+DECOMPRESSORS = {
+    header: decompress for header, _, decompress in ALGORITHMS.values()
+}
+
+
+def compress_text(text, algorithm, threshold):
+    """BLOB с заголовком или сама строка, если сжимать не стоит."""
+    raw = text.encode()
+    if algorithm is None or len(raw) < threshold:
+        return text
+    header, compress, _ = ALGORITHMS[algorithm]
+    packed = header + compress(raw)
+    return packed if len(packed) < len(raw) else text
+
+
+def may_be_compressed(value):
+    """Могло ли значение атрибута модели попасть в базу сжатым."""
+    if isinstance(value, CompressedText):
+        return True
+    if not isinstance(value, str) or settings.NOTES_TEXT_COMPRESSION is None:
+        return False
+    return len(value.encode()) >= settings.NOTES_TEXT_COMPRESS_THRESHOLD
+
+
+def decompress_text(value):
+    """Строка из значения колонки: BLOB распаковывается, строка — как есть."""
+    if isinstance(value, CompressedText):
+        value = value.data
+    if not isinstance(value, (bytes, memoryview)):
+        return value
+    value = bytes(value)
+    return DECOMPRESSORS[value[:1]](value[1:]).decode()
+
+
+class CompressedText:
+    """Сжатый текст из базы, ещё не распакованный."""
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = bytes(data)
+
+    def __str__(self):
+        return decompress_text(self.data)
+
+    def __repr__(self):
+        return f'<CompressedText: {len(self.data)} bytes>'
+
+
+class CompressedTextDescriptor(DeferredAttribute):
+    """Распаковывает CompressedText при первом чтении атрибута."""
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, CompressedText):
+            value = instance.__dict__[self.field.attname] = str(value)
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedTextField(models.TextField):
+    descriptor_class = CompressedTextDescriptor
+
+    def from_db_value(self, value, expression, connection):
+        if isinstance(value, (bytes, memoryview)):
+            return CompressedText(value)
+        return value
+
+    def pre_save(self, model_instance, add):
+        # Нераспакованный текст не менялся: пишем те же байты.
+        value = model_instance.__dict__.get(self.attname)
+        if isinstance(value, CompressedText):
+            return value
+        return super().pre_save(model_instance, add)
+
+    def get_db_prep_save(self, value, connection):
+        if isinstance(value, CompressedText):
+            if connection.vendor == 'sqlite':
+                return value.data
+            value = str(value)
+        value = super().get_db_prep_save(value, connection)
+        if value is None or connection.vendor != 'sqlite':
+            return value
+        return compress_text(
+            value,
+            settings.NOTES_TEXT_COMPRESSION,
+            settings.NOTES_TEXT_COMPRESS_THRESHOLD,
+        )
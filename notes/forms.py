@@ -1,11 +1,15 @@
-from pytils.translit import slugify
-
 from django import forms
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, router, transaction
 
-from .models import Note
+from .catalog import (
+    MAX_TAGS_PER_NOTE, format_tags, parse_tags, set_tags, tag_slug
+)
+from .models import Folder, Note, Tag
 
 WARNING = ' - такой slug уже существует, придумайте уникальное значение!'
+# Папки глубже не создаются, чтобы путь поместился в Folder.path.
+MAX_FOLDER_DEPTH = 20
 
 
 class NoteForm(forms.ModelForm):
@@ -15,15 +19,119 @@ class NoteForm(forms.ModelForm):
         model = Note
         fields = ('title', 'text', 'slug')
 
+    def __init__(self, *args, author=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.author = author
+
     def clean_slug(self):
-        """Обрабатывает случай, если slug не уникален."""
-        cleaned_data = super().clean()
-        slug = cleaned_data.get('slug')
-        if not slug:
-            title = cleaned_data.get('title')
-            slug = slugify(title)[:100]
-        if Note.objects.filter(
-                slug=slug
+        """
+        Обрабатывает случай, если slug не уникален среди заметок автора.
+
+        Пустой slug не проверяем: свободный адрес подберёт Note.save.
+        """
+        slug = self.cleaned_data.get('slug')
+        author_id = self.instance.author_id or getattr(self.author, 'pk', None)
+        if slug and Note.objects.filter(
+                author_id=author_id, slug=slug
         ).exclude(id=self.instance.pk).exists():
             raise ValidationError(slug + WARNING)
         return slug
+
+    def validate_unique(self):
+        """Уникальность slug уже проверена в clean_slug."""
+        try:
+            self.instance.validate_unique(
+                exclude=[*self._get_validation_exclusions(), 'slug']
+            )
+        except ValidationError as error:
+            self._update_errors(error)
+
+    def save_unless_slug_taken(self, save=None):
+        """
+        Сохраняет заметку в транзакции её базы и возвращает результат.
+
+        Если тот же slug успел занять параллельный запрос, clean_slug
+        этого не видел, и база отвечает IntegrityError: тогда к полю slug
+        добавляется ошибка и возвращается None. save — функция вместо
+        self.save, например form_valid представления.
+        """
+        using = router.db_for_write(Note, instance=self.instance)
+        try:
+            with transaction.atomic(using=using):
+                return (save or self.save)()
+        except IntegrityError:
+            self.add_error('slug', self.instance.slug + WARNING)
+            return None
+
+
+class NoteWithTagsForm(NoteForm):
+    """Форма заметки на страницах сайта: с папкой и метками."""
+    tags = forms.CharField(
+        label='Метки',
+        required=False,
+        help_text='Через запятую, например: работа, идеи',
+    )
+
+    class Meta(NoteForm.Meta):
+        fields = (*NoteForm.Meta.fields, 'folder')
+
+    def __init__(self, *args, author, **kwargs):
+        super().__init__(*args, author=author, **kwargs)
+        self.fields['folder'].queryset = Folder.objects.filter(author=author)
+        if self.instance.pk and not self.is_bound:
+            self.initial['tags'] = format_tags(self.instance.tags.all())
+
+    def load_choices(self):
+        """
+        Выбирает папки для списка сразу.
+
+        Асинхронные представления рендерят форму вне потока базы,
+        где запрос за папками выполнить нельзя.
+        """
+        field = self.fields['folder']
+        field.choices = list(field.choices)
+
+    def clean_tags(self):
+        names = parse_tags(self.cleaned_data['tags'])
+        if len(names) > MAX_TAGS_PER_NOTE:
+            raise ValidationError(
+                f'Не больше {MAX_TAGS_PER_NOTE} меток у заметки.'
+            )
+        max_length = Tag._meta.get_field('name').max_length
+        for name in names:
+            if len(name) > max_length or not tag_slug(name):
+                raise ValidationError(
+                    f'Метка «{name}»: до {max_length} символов, '
+                    'хотя бы одна буква или цифра.'
+                )
+        return names
+
+    def save(self, commit=True):
+        self.creating = self.instance._state.adding
+        return super().save(commit)
+
+    def _save_m2m(self):
+        super()._save_m2m()
+        set_tags(
+            self.instance, self.cleaned_data['tags'], created=self.creating
+        )
+
+
+class FolderForm(forms.ModelForm):
+    """Форма новой папки."""
+
+    class Meta:
+        model = Folder
+        fields = ('name', 'parent')
+
+    def __init__(self, *args, author, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['parent'].queryset = Folder.objects.filter(author=author)
+
+    def clean_parent(self):
+        parent = self.cleaned_data.get('parent')
+        if parent is not None and parent.depth + 1 >= MAX_FOLDER_DEPTH:
+            raise ValidationError(
+                f'Папки вкладываются не глубже {MAX_FOLDER_DEPTH} уровней.'
+            )
+        return parent
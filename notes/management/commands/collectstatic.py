@@ -0,0 +1,22 @@
+from django.contrib.staticfiles.management.commands import collectstatic
+from django.core.management.base import CommandError
+
+from notes.staticfiles import missing_vendor_assets
+
+
+class Command(collectstatic.Command):
+    help = (
+        collectstatic.Command.help
+        + ' Отказывается собирать статику, пока сторонних файлов из '
+        'VENDOR_ASSETS нет в static/vendor: иначе сборка ушла бы '
+        'на сервер без них.'
+    )
+
+    def handle(self, **options):
+        missing = missing_vendor_assets()
+        if missing:
+            raise CommandError(
+                f'Нет сторонних файлов: {", ".join(missing)}. '
+                f'Скачайте их: manage.py vendor_assets.'
+            )
+        return super().handle(**options)
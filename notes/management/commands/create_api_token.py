@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.models import ApiToken
+
+
+class Command(BaseCommand):
+    help = (
+        'Выдаёт пользователю токен для JSON API. Ключ печатается один раз: '
+        'в базе хранится только его хеш.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Владелец токена.')
+        parser.add_argument(
+            '--name', default='', help='Название, например имя интеграции.'
+        )
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get_by_natural_key(options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден.'
+            )
+        self.stdout.write(ApiToken.objects.issue(user, options['name']))
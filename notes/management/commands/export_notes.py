@@ -0,0 +1,150 @@
+import os
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from notes.models import AuthorShard, Note, TransferCheckpoint
+from notes.shards import shard_for
+from notes.transfer import (
+    FORMATS, RecordWriter, Throughput, batched, guess_format
+)
+
+# Пользователи лежат в основной базе, а заметки — в шардах, поэтому
+# имя автора подставляется не соединением, а по author_id.
+COLUMNS = ('id', 'author_id', 'title', 'text', 'slug')
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает заметки в файл JSON Lines или CSV, читая базу порциями. '
+        'После каждой порции файл сбрасывается на диск и запоминается '
+        'последний выгруженный id, так что выгрузку можно продолжить '
+        'с флагом --resume. Шарды выгружаются по очереди.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Куда записать заметки.')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат файла; по умолчанию определяется по расширению.',
+        )
+        parser.add_argument(
+            '--author', help='Выгрузить заметки только этого пользователя.'
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Дописать файл, начиная с последней сохранённой порции.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Имя задания для возобновления; по умолчанию путь к файлу.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or guess_format(path)
+        shards = settings.NOTES_SHARDS or (DEFAULT_DB_ALIAS,)
+        author_id = None
+        if options['author']:
+            author_id = self.get_author_id(options['author'])
+            shards = (shard_for(author_id),)
+        checkpoint, _ = TransferCheckpoint.objects.get_or_create(
+            name=options['checkpoint'] or f'export:{os.path.abspath(path)}'
+        )
+        if not options['resume'] or not os.path.exists(path):
+            checkpoint.position = checkpoint.offset = 0
+            checkpoint.shard = ''
+        # Задания, начатые до шардов, выгружали основную базу.
+        current = checkpoint.shard or DEFAULT_DB_ALIAS
+        if current in shards:
+            shards = shards[shards.index(current):]
+        else:
+            checkpoint.position = 0
+        self.authors = {}
+        throughput = Throughput()
+        mode = 'r+' if checkpoint.offset else 'w'
+        with open(path, mode, encoding='utf-8', newline='') as file:
+            # Отбрасываем то, что успели записать после последней порции.
+            file.seek(checkpoint.offset)
+            file.truncate()
+            writer = RecordWriter(
+                file, fmt, write_header=not checkpoint.offset
+            )
+            for alias in shards:
+                if alias != checkpoint.shard:
+                    checkpoint.shard = alias
+                    checkpoint.position = 0
+                queryset = Note.objects.using(alias).filter(
+                    id__gt=checkpoint.position
+                )
+                if options['author']:
+                    queryset = queryset.filter(author_id=author_id)
+                rows = queryset.order_by('id').values_list(
+                    *COLUMNS
+                ).iterator(chunk_size=options['chunk_size'])
+                for chunk in batched(rows, options['chunk_size']):
+                    count = self.write_chunk(writer, chunk, alias)
+                    file.flush()
+                    os.fsync(file.fileno())
+                    checkpoint.position = chunk[-1][0]
+                    checkpoint.offset = file.tell()
+                    checkpoint.save()
+                    throughput.add(count)
+                    if options['verbosity'] > 1:
+                        self.stdout.write(f'Выгружено: {throughput}')
+            if not throughput.count:
+                file.flush()
+                checkpoint.offset = file.tell()
+                checkpoint.save()
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгрузка завершена: {throughput}.'
+        ))
+
+    def get_author_id(self, username):
+        author_id = User.objects.filter(
+            username=username
+        ).values_list('id', flat=True).first()
+        if author_id is None:
+            raise CommandError(f'Пользователь {username} не найден.')
+        return author_id
+
+    def write_chunk(self, writer, chunk, alias):
+        """Пишет заметки порции из шарда alias, возвращает их число."""
+        authors = self.authors_of(chunk)
+        count = 0
+        for _, author_id, title, text, slug in chunk:
+            username, home = authors.get(author_id, (None, None))
+            # Остатки прерванного переноса автора.
+            if home != alias:
+                continue
+            writer.write({
+                'author': username,
+                'title': title,
+                # Сжатый текст приходит CompressedText.
+                'text': str(text),
+                'slug': slug,
+            })
+            count += 1
+        return count
+
+    def authors_of(self, chunk):
+        """Имя и шард авторов порции: {author_id: (username, шард)}."""
+        unknown = {row[1] for row in chunk} - self.authors.keys()
+        if unknown:
+            homes = dict(
+                AuthorShard.objects.using(DEFAULT_DB_ALIAS)
+                .filter(author_id__in=unknown)
+                .values_list('author_id', 'alias')
+            )
+            for pk, username in User.objects.using(
+                DEFAULT_DB_ALIAS
+            ).filter(pk__in=unknown).values_list('id', 'username'):
+                self.authors[pk] = (
+                    username, homes.get(pk, DEFAULT_DB_ALIAS)
+                )
+        return self.authors
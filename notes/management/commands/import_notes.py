@@ -0,0 +1,241 @@
+import os
+from collections import defaultdict
+from contextlib import ExitStack
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import F
+
+from notes.cache import invalidate_author_cache
+from notes.fields import may_be_compressed
+from notes.models import AuthorNotesVersion, Note, TransferCheckpoint
+from notes.revisions import record_snapshots_later
+from notes.search import index_compressed
+from notes.shards import AuthorMoved, check_author_shard, shard_for
+from notes.slugs import SAVE_ATTEMPTS, SlugAllocator, slugify
+from notes.transfer import (
+    FORMATS, Throughput, batched, guess_format, read_records
+)
+
+User = get_user_model()
+
+# Поля записи, которые проверяются так же, как в форме заметки.
+CHECKED_FIELDS = ('title', 'slug')
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует заметки из файла JSON Lines или CSV пачками. '
+        'Прогресс сохраняется в той же транзакции, что и пачка, поэтому '
+        'прерванный импорт можно продолжить с флагом --resume: чтение '
+        'файла продолжится с сохранённого смещения. '
+        'Заметки пишутся в шард автора; если процесс прервали между '
+        'фиксацией шарда и основной базы, --resume повторит пачку. '
+        'Записи с недопустимым заголовком или slug пропускаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с заметками.')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат файла; по умолчанию определяется по расширению.',
+        )
+        parser.add_argument(
+            '--author',
+            help='Назначить все заметки этому пользователю вместо поля '
+                 'author из файла.',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить с последней сохранённой пачки.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Имя задания для возобновления; по умолчанию путь к файлу.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or guess_format(path)
+        checkpoint, _ = TransferCheckpoint.objects.get_or_create(
+            name=options['checkpoint'] or f'import:{os.path.abspath(path)}'
+        )
+        if not options['resume']:
+            checkpoint.position = checkpoint.offset = 0
+            checkpoint.save(
+                update_fields=('position', 'offset', 'updated_at')
+            )
+        self.authors = {}
+        self.default_author = None
+        if options['author']:
+            self.default_author = self.get_author(options['author'])
+        max_length = Note._meta.get_field('slug').max_length
+        # slug уникален в пределах автора, поэтому и счётчики свои.
+        self.max_length = max_length
+        self.shards = {}
+        self.slugs = {}
+        self.skipped = 0
+        throughput = Throughput()
+        try:
+            file = open(path, 'rb')
+        except OSError as error:
+            raise CommandError(f'Не удалось открыть {path}: {error}')
+        with file:
+            records = read_records(file, fmt, checkpoint.offset)
+            if checkpoint.position and not checkpoint.offset:
+                # Задания, начатые до смещений, помнят только число
+                # импортированных записей.
+                records = islice(records, checkpoint.position, None)
+            for batch in batched(records, options['batch_size']):
+                notes = self.build_notes(record for record, _ in batch)
+                bases = [
+                    (note.slug or slugify(note.title))[:max_length]
+                    for note in notes
+                ]
+                # Смещение сдвигается и за пропущенные записи.
+                self.save_batch(notes, bases, checkpoint, batch[-1][1])
+                throughput.add(len(notes))
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'Импортировано: {throughput}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Импорт завершён: {throughput}, пропущено {self.skipped}, '
+            f'всего в задании {checkpoint.position + throughput.count}.'
+        ))
+
+    def get_author(self, username):
+        try:
+            return User.objects.only('id').get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f'Пользователь {username} не найден.')
+
+    def build_notes(self, records):
+        """Заметки пачки; о пропущенных записях пишет в stderr."""
+        notes = []
+        for record in records:
+            try:
+                notes.append(self.build_note(record))
+            except ValidationError as error:
+                self.skipped += 1
+                self.stderr.write(
+                    f'Пропущена запись «{record.get("title")}»: '
+                    f'{"; ".join(error.messages)}'
+                )
+        return notes
+
+    def clean_fields(self, record):
+        """
+        Заголовок и slug записи, проверенные полями модели.
+
+        slug из файла попадает в адрес заметки, поэтому недопустимый
+        slug сломал бы страницы со ссылками на неё.
+        """
+        values, errors = {}, []
+        for name in CHECKED_FIELDS:
+            field = Note._meta.get_field(name)
+            try:
+                values[name] = field.clean(record.get(name) or '', None)
+            except ValidationError as error:
+                errors += [f'{name}: {message}' for message in error.messages]
+        if errors:
+            raise ValidationError(errors)
+        return values
+
+    def build_note(self, record):
+        fields = self.clean_fields(record)
+        if self.default_author is not None:
+            author_id = self.default_author.pk
+        else:
+            username = record.get('author') or ''
+            if username not in self.authors:
+                self.authors[username] = self.get_author(username).pk
+            author_id = self.authors[username]
+        return Note(
+            text=record.get('text') or '', author_id=author_id, **fields
+        )
+
+    def shard(self, author_id):
+        if author_id not in self.shards:
+            self.shards[author_id] = shard_for(author_id)
+        return self.shards[author_id]
+
+    def allocate_slugs(self, notes, bases):
+        """Подбирает slug заметкам пачки отдельно для каждого автора."""
+        by_author = defaultdict(list)
+        for note, base in zip(notes, bases):
+            by_author[note.author_id].append((note, base))
+        for author_id, pairs in by_author.items():
+            if author_id not in self.slugs:
+                self.slugs[author_id] = SlugAllocator(
+                    Note.objects.using(self.shard(author_id))
+                    .filter(author_id=author_id),
+                    self.max_length,
+                )
+            slugs = self.slugs[author_id].allocate(
+                [base for _, base in pairs]
+            )
+            for (note, _), slug in zip(pairs, slugs):
+                note.slug = slug
+
+    def write_notes(self, notes, using):
+        Note.objects.using(using).bulk_create(notes)
+        record_snapshots_later(notes, using=using)
+        # Сжатые тексты триггеры поискового индекса пропускают.
+        large = [note for note in notes if may_be_compressed(note.text)]
+        if large:
+            index_compressed(
+                using,
+                ' OR '.join(['(author_id = %s AND slug = %s)'] * len(large)),
+                [value for note in large for value in (
+                    note.author_id, note.slug
+                )],
+            )
+        # bulk_create не отправляет post_save: перенос автора проверяем
+        # сами.
+        for author_id in {note.author_id for note in notes}:
+            check_author_shard(author_id, using)
+
+    def save_batch(self, notes, bases, checkpoint, offset):
+        """
+        Сохраняет пачку и сдвигает позицию задания одной транзакцией.
+
+        offset — смещение в файле после последней записи пачки: с него
+        --resume продолжит чтение.
+
+        С шардами транзакций несколько: шарды фиксируются раньше
+        основной базы, поэтому сбой между ними не теряет заметки,
+        а повторяет пачку при --resume.
+        """
+        author_ids = {note.author_id for note in notes}
+        for attempt in range(1, SAVE_ATTEMPTS + 1):
+            self.allocate_slugs(notes, bases)
+            by_shard = defaultdict(list)
+            for note in notes:
+                by_shard[self.shard(note.author_id)].append(note)
+            try:
+                with transaction.atomic(), ExitStack() as stack:
+                    for alias in by_shard.keys() - {DEFAULT_DB_ALIAS}:
+                        stack.enter_context(transaction.atomic(using=alias))
+                    for alias, shard_notes in by_shard.items():
+                        self.write_notes(shard_notes, alias)
+                    AuthorNotesVersion.objects.bump(author_ids)
+                    TransferCheckpoint.objects.filter(
+                        pk=checkpoint.pk
+                    ).update(
+                        position=F('position') + len(notes), offset=offset
+                    )
+                break
+            except (IntegrityError, AuthorMoved):
+                # slug заняли параллельно или автора перенесли:
+                # перечитываем его slug и шард из БД.
+                if attempt == SAVE_ATTEMPTS:
+                    raise
+                for author_id in author_ids:
+                    self.slugs.pop(author_id, None)
+                    self.shards.pop(author_id, None)
+        # bulk_create не отправляет сигналы, поэтому кеш сбрасываем сами.
+        for author_id in author_ids:
+            invalidate_author_cache(author_id)
@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.shards import (
+    ShardError, author_counts, move_author, plan_rebalance, shard_for
+)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Выравнивает число заметок в шардах NOTES_SHARDS, перенося авторов '
+        'из самых полных шардов в самые пустые. С --author и --to '
+        'переносит одного автора в указанный шард.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--author', help='Перенести заметки только этого пользователя.'
+        )
+        parser.add_argument('--to', help='Шард для --author.')
+        parser.add_argument(
+            '--max-moves', type=int,
+            help='Перенести не больше стольких авторов.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать план переносов.',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.NOTES_SHARDS:
+            raise CommandError('Шарды не настроены, см. YANOTE_SHARDS.')
+        if bool(options['author']) != bool(options['to']):
+            raise CommandError('--author и --to указываются вместе.')
+        counts = author_counts()
+        if options['author']:
+            moves = [self.author_move(options['author'], options['to'])]
+        else:
+            moves = plan_rebalance(counts, options['max_moves'])
+        usernames = dict(
+            User.objects.filter(pk__in=[move[0] for move in moves])
+            .values_list('id', 'username')
+        )
+        for author_id, source, target in moves:
+            count = counts[source].get(author_id, 0)
+            self.stdout.write(
+                f'{usernames[author_id]}: {source} -> {target}, '
+                f'заметок: {count}'
+            )
+            if options['dry_run']:
+                continue
+            try:
+                move_author(author_id, target)
+            except ShardError as error:
+                self.stderr.write(self.style.WARNING(
+                    f'{usernames[author_id]} не перенесён: {error}'
+                ))
+                continue
+            counts[source].pop(author_id, None)
+            counts[target][author_id] = count
+        for alias, rows in counts.items():
+            self.stdout.write(f'{alias}: заметок {sum(rows.values())}')
+
+    def author_move(self, username, target):
+        try:
+            author = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f'Пользователь {username} не найден.')
+        if target not in settings.NOTES_SHARDS:
+            raise CommandError(f'Неизвестный шард {target}.')
+        return author.pk, shard_for(author.pk), target
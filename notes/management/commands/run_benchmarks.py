@@ -0,0 +1,46 @@
+import argparse
+import importlib
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Модули пакета benchmarks, которые можно запустить командой.
+SUITES = (
+    'routes', 'search', 'indexes', 'deferred_text', 'slugify',
+    'sqlite_profile', 'metrics_overhead', 'asgi_load', 'templates',
+    'sessions', 'revisions', 'text_compression', 'tags', 'task_queue',
+    'compression', 'transfer',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает замер из пакета benchmarks на временной базе. '
+        'Остальные аргументы передаются замеру, например: '
+        'run_benchmarks routes --runs 50 --baseline base.json. '
+        'Если замер нашёл регрессии относительно базового отчёта, '
+        'команда завершается с ошибкой.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'suite', nargs='?', default='routes', choices=SUITES,
+            help='Замер; по умолчанию все маршруты (routes).',
+        )
+        parser.add_argument(
+            'suite_args', nargs=argparse.REMAINDER,
+            help='Аргументы замера, см. run_benchmarks <замер> --help.',
+        )
+
+    def handle(self, *args, **options):
+        module = importlib.import_module(f'benchmarks.{options["suite"]}')
+        result = module.main(options['suite_args'])
+        regressions = (result or {}).get('regressions')
+        if regressions:
+            raise CommandError(
+                'Регрессии относительно базового отчёта: '
+                + ', '.join(
+                    f'{entry["name"]} ({entry["metric"]}: '
+                    f'{entry["baseline"]} -> {entry["current"]})'
+                    for entry in regressions
+                )
+            )
@@ -0,0 +1,123 @@
+import multiprocessing
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Процессы пула запускаются через spawn: так же и на Windows, и без
+# соединений с базой, унаследованных от родителя.
+CONTEXT = multiprocessing.get_context('spawn')
+
+
+class StopFlag:
+    """
+    Флаг остановки, который ставит обработчик сигнала.
+
+    Событие multiprocessing из обработчика ставить нельзя: сигнал может
+    прийти, пока основной поток ждёт это событие и держит его блокировку.
+    """
+
+    def __init__(self):
+        self.stopped = False
+
+    def set(self, *args):
+        self.stopped = True
+
+    def is_set(self):
+        return self.stopped
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+
+
+def serve(stop, batch_size, poll_interval):
+    """Выполняет задачи, пока не установлено событие stop."""
+    from django.db import close_old_connections
+
+    from notes.queue import Worker
+
+    worker = Worker(batch_size=batch_size)
+    while not stop.is_set():
+        worker.run(stop)
+        # Как после запроса: закрыть соединение с ошибкой или старше
+        # CONN_MAX_AGE.
+        close_old_connections()
+        stop.wait(poll_interval)
+
+
+def work(stop, batch_size, poll_interval):
+    """Процесс пула. Сигналы остановки обрабатывает родитель."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import django
+    django.setup()
+    serve(stop, batch_size, poll_interval)
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые задачи из очереди в базе (notes/queue.py). '
+        'С --processes больше одного запускает пул процессов и заменяет '
+        'упавшие; задачи прерванного процесса после срока видимости '
+        'выполнит другой. Останавливается по SIGINT или SIGTERM, '
+        'доделав текущие пачки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.NOTES_TASK_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--poll-interval', type=float,
+            default=settings.NOTES_TASK_POLL_INTERVAL,
+            help='Секунды между проверками пустой очереди.',
+        )
+        parser.add_argument(
+            '--until-empty', action='store_true',
+            help='Выполнить готовые задачи и завершиться.',
+        )
+
+    def handle(self, *args, **options):
+        if options['until_empty']:
+            from notes.queue import Worker
+
+            done = Worker(batch_size=options['batch_size']).run()
+            self.stdout.write(f'Выполнено задач: {done}.')
+            return
+        flag = StopFlag()
+        handlers = {
+            signum: signal.signal(signum, flag.set)
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+        try:
+            if options['processes'] > 1:
+                self.run_pool(flag, options)
+            else:
+                serve(flag, options['batch_size'], options['poll_interval'])
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+    def run_pool(self, flag, options):
+        stop = CONTEXT.Event()
+        args = (stop, options['batch_size'], options['poll_interval'])
+        processes = [None] * options['processes']
+        while not flag.is_set():
+            for index, process in enumerate(processes):
+                if process is not None and process.is_alive():
+                    continue
+                if process is not None:
+                    self.stderr.write(
+                        f'Процесс {process.pid} завершился с кодом '
+                        f'{process.exitcode}, запускаем новый.'
+                    )
+                process = CONTEXT.Process(
+                    target=work, args=args, daemon=True
+                )
+                process.start()
+                processes[index] = process
+            flag.wait(1)
+        stop.set()
+        for process in processes:
+            process.join()
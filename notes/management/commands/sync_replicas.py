@@ -0,0 +1,49 @@
+import sqlite3
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def copy_database(source, target):
+    """Копирует базу SQLite целиком, согласованным снимком (backup API)."""
+    with closing(sqlite3.connect(source)) as primary:
+        with closing(sqlite3.connect(target)) as copy:
+            primary.backup(copy)
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файлы реплик NOTES_REPLICAS — '
+        'замена репликации для проверки чтения с реплик на одной машине. '
+        'С --interval повторяет копирование, пока её не остановят.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            help='Секунды между копированиями.',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.NOTES_REPLICAS:
+            raise CommandError('Реплики не настроены, см. YANOTE_REPLICAS.')
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            raise CommandError(
+                'Команда только для SQLite: у других СУБД своя репликация.'
+            )
+        source = settings.DATABASES[DEFAULT_DB_ALIAS]['NAME']
+        while True:
+            started = time.perf_counter()
+            for alias in settings.NOTES_REPLICAS:
+                copy_database(source, settings.DATABASES[alias]['NAME'])
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f'Реплики обновлены за '
+                    f'{time.perf_counter() - started:.3f} с.'
+                )
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,56 @@
+import os
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.staticfiles import VENDOR_ASSETS, integrity
+
+DOWNLOAD_TIMEOUT = 30
+
+
+class Command(BaseCommand):
+    help = (
+        'Скачивает сторонние файлы из VENDOR_ASSETS (notes/staticfiles.py) '
+        'в первый каталог STATICFILES_DIRS и сверяет их с хешем integrity. '
+        'Без доступа к CDN файлы можно положить туда вручную и проверить '
+        'флагом --check.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только проверить уже скачанные файлы.',
+        )
+
+    def handle(self, *args, **options):
+        root = settings.STATICFILES_DIRS[0]
+        errors = []
+        for name, asset in VENDOR_ASSETS.items():
+            path = os.path.join(root, asset.path)
+            if options['check']:
+                try:
+                    with open(path, 'rb') as file:
+                        content = file.read()
+                except OSError as error:
+                    errors.append(f'{name}: {error}')
+                    continue
+            else:
+                try:
+                    with urlopen(asset.url, timeout=DOWNLOAD_TIMEOUT) as file:
+                        content = file.read()
+                except (URLError, OSError) as error:
+                    raise CommandError(
+                        f'Не удалось скачать {asset.url}: {error}'
+                    )
+            if integrity(content) != asset.integrity:
+                errors.append(f'{name}: хеш не совпадает с integrity.')
+                continue
+            if not options['check']:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'wb') as file:
+                    file.write(content)
+            self.stdout.write(f'{name}: {asset.path}')
+        if errors:
+            raise CommandError('\n'.join(errors))
@@ -0,0 +1,238 @@
+"""
+Метрики запросов: латентность, запросы к базе, рендеринг и размер ответа.
+
+Счётчики ведутся по имени маршрута (``notes:list``) без блокировок:
+у каждого потока свой набор счётчиков, а выгрузка в формате Prometheus
+складывает наборы всех потоков. Под GIL запись в счётчик своего потока
+не пересекается с чужими, а выгрузка может увидеть запрос, учтённый
+лишь частично, — для метрик это допустимо.
+"""
+import bisect
+import contextvars
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы латентности, в секундах.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNRESOLVED = 'unresolved'
+PREFIX = 'yanote'
+
+# Замеры текущего запроса, видны и в потоках sync_to_async.
+current = contextvars.ContextVar('notes_request_metrics', default=None)
+
+
+class RequestRecord:
+    """Замеры одного запроса."""
+    __slots__ = ('started', 'queries', 'render_seconds')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # Пары (sql, секунды) — для журнала медленных запросов.
+        self.queries = []
+        self.render_seconds = 0.0
+
+    @property
+    def query_seconds(self):
+        return sum(seconds for _, seconds in self.queries)
+
+
+class Series:
+    """Счётчики одного маршрута в одном потоке."""
+    __slots__ = (
+        'count', 'seconds', 'buckets', 'queries', 'query_seconds',
+        'render_seconds', 'response_bytes',
+    )
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.render_seconds = 0.0
+        self.response_bytes = 0
+
+    def add(self, seconds, record, response_bytes):
+        self.count += 1
+        self.seconds += seconds
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.queries += len(record.queries)
+        self.query_seconds += record.query_seconds
+        self.render_seconds += record.render_seconds
+        self.response_bytes += response_bytes
+
+    def merge(self, other):
+        self.count += other.count
+        self.seconds += other.seconds
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.queries += other.queries
+        self.query_seconds += other.query_seconds
+        self.render_seconds += other.render_seconds
+        self.response_bytes += other.response_bytes
+
+
+class Registry:
+    """Наборы счётчиков всех потоков."""
+
+    def __init__(self):
+        self.local = threading.local()
+        # Добавление в список под GIL атомарно, блокировка не нужна.
+        self.shards = []
+        self.next_flush = 0.0
+
+    def shard(self):
+        try:
+            return self.local.series
+        except AttributeError:
+            self.local.series = {}
+            self.shards.append(self.local.series)
+            return self.local.series
+
+    def observe(self, view_name, seconds, record, response_bytes):
+        shard = self.shard()
+        series = shard.get(view_name)
+        if series is None:
+            series = shard[view_name] = Series()
+        series.add(seconds, record, response_bytes)
+
+    def snapshot(self):
+        """Сумма счётчиков всех потоков по маршрутам."""
+        total = {}
+        for shard in list(self.shards):
+            for view_name, series in list(shard.items()):
+                total.setdefault(view_name, Series()).merge(series)
+        return total
+
+    def clear(self):
+        for shard in list(self.shards):
+            shard.clear()
+
+
+registry = Registry()
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    execute_wrapper: учитывает запрос в замерах текущего запроса.
+
+    Стоит на каждом соединении (notes.signals): под ASGI синхронные
+    представления и middleware работают с базой в других потоках,
+    а текущий запрос находится по contextvars, которые sync_to_async
+    переносит в поток.
+    """
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record = current.get()
+        if record is not None:
+            record.queries.append((sql, time.perf_counter() - started))
+
+
+def add_render_time(seconds):
+    record = current.get()
+    if record is not None:
+        record.render_seconds += seconds
+
+
+def observe(request, response, seconds, record):
+    """Учитывает завершённый запрос и пишет медленные в журнал."""
+    match = request.resolver_match
+    view_name = match.view_name if match else UNRESOLVED
+    size = 0 if response.streaming else len(response.content)
+    registry.observe(view_name, seconds, record, size)
+    flush_if_due()
+    if seconds * 1000 >= settings.NOTES_SLOW_REQUEST_MS:
+        log_slow_request(request, view_name, seconds, record)
+
+
+def log_slow_request(request, view_name, seconds, record):
+    worst = sorted(record.queries, key=lambda query: query[1], reverse=True)
+    lines = [
+        f'{query_seconds * 1000:.1f} ms: {sql}'
+        for sql, query_seconds in worst[:settings.NOTES_SLOW_REQUEST_QUERIES]
+    ]
+    logger.warning(
+        'Медленный запрос %s %s (%s): %.1f ms, запросов к базе %d '
+        '(%.1f ms), рендеринг %.1f ms\n%s',
+        request.method, request.path, view_name, seconds * 1000,
+        len(record.queries), record.query_seconds * 1000,
+        record.render_seconds * 1000, '\n'.join(lines),
+    )
+
+
+def labels(view_name, **extra):
+    pairs = {'view': view_name, **extra}
+    return ','.join(
+        '{}="{}"'.format(
+            name, value.replace('\\', r'\\').replace('"', r'\"')
+        )
+        for name, value in pairs.items()
+    )
+
+
+def render_prometheus(snapshot=None):
+    """Метрики в текстовом формате Prometheus."""
+    snapshot = registry.snapshot() if snapshot is None else snapshot
+    name = f'{PREFIX}_request_duration_seconds'
+    lines = [
+        f'# HELP {name} Время обработки запроса.',
+        f'# TYPE {name} histogram',
+    ]
+    for view_name, series in sorted(snapshot.items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), series.buckets):
+            cumulative += count
+            lines.append(
+                f'{name}_bucket{{{labels(view_name, le=str(bound))}}} '
+                f'{cumulative}'
+            )
+        lines.append(f'{name}_sum{{{labels(view_name)}}} {series.seconds}')
+        lines.append(f'{name}_count{{{labels(view_name)}}} {series.count}')
+    for field, suffix, help_text in (
+        ('queries', 'db_queries_total', 'Число запросов к базе.'),
+        ('query_seconds', 'db_seconds_total', 'Время запросов к базе.'),
+        ('render_seconds', 'render_seconds_total',
+         'Время рендеринга шаблонов.'),
+        ('response_bytes', 'response_bytes_total', 'Размер ответов.'),
+    ):
+        name = f'{PREFIX}_request_{suffix}'
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for view_name, series in sorted(snapshot.items()):
+            lines.append(
+                f'{name}{{{labels(view_name)}}} {getattr(series, field)}'
+            )
+    return '\n'.join(lines) + '\n'
+
+
+def flush_if_due():
+    """Раз в NOTES_METRICS_FLUSH_SECONDS сбрасывает метрики в файл."""
+    path = settings.NOTES_METRICS_FILE
+    if not path:
+        return
+    now = time.monotonic()
+    if now < registry.next_flush:
+        return
+    registry.next_flush = now + settings.NOTES_METRICS_FLUSH_SECONDS
+    # У каждого процесса свои счётчики и, если в пути есть {pid},
+    # свой файл.
+    flush(path.format(pid=os.getpid()))
+
+
+def flush(path):
+    """
+    Атомарно записывает метрики в файл.
+
+    Формат подходит для textfile-коллектора node_exporter.
+    """
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        file.write(render_prometheus())
+    os.replace(tmp_path, path)
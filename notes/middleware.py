@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.auth import middleware as auth_middleware
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+from django.utils.text import compress_string
+
+from . import metrics, sessions
+from .query_budget import (
+    REPEATS_ALLOWED, ROUTE_BUDGETS, QueryBudget, find_problems
+)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger('notes.query_budget')
+
+
+class ContextMiddleware:
+    """
+    Middleware, которое выставляет переменную контекста на время запроса.
+
+    Подкласс задаёт context (contextvars.ContextVar) и enter(request),
+    возвращающий её значение; leave(request, response, value) может
+    заменить ответ, пока переменная ещё выставлена. Middleware работает
+    и в синхронном, и в асинхронном стеке.
+    """
+    sync_capable = True
+    async_capable = True
+    context = None
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Как у MiddlewareMixin: обработчик должен видеть корутину.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        value = self.enter(request)
+        token = self.context.set(value)
+        try:
+            return self.leave(request, self.get_response(request), value)
+        finally:
+            self.context.reset(token)
+
+    async def __acall__(self, request):
+        value = self.enter(request)
+        token = self.context.set(value)
+        try:
+            response = await self.get_response(request)
+            return self.leave(request, response, value)
+        finally:
+            self.context.reset(token)
+
+    def enter(self, request):
+        raise NotImplementedError
+
+    def leave(self, request, response, value):
+        return response
+
+
+class MetricsMiddleware(ContextMiddleware):
+    """
+    Собирает метрики каждого запроса (см. notes/metrics.py).
+
+    Стоит первым в MIDDLEWARE, чтобы замер охватывал остальные
+    middleware, а process_template_response вызывался последним, прямо
+    перед рендерингом. Запросы к базе учитывает обёртка соединений
+    metrics.record_query в любом потоке, в том числе под ASGI.
+    """
+    context = metrics.current
+
+    def enter(self, request):
+        return metrics.RequestRecord()
+
+    def leave(self, request, response, record):
+        metrics.observe(
+            request, response, time.perf_counter() - record.started, record
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        started = time.perf_counter()
+        response.add_post_render_callback(
+            lambda rendered: metrics.add_render_time(
+                time.perf_counter() - started
+            )
+        )
+        return response
+
+
+class QueryBudgetMiddleware:
+    """
+    В режиме DEBUG предупреждает о превышении бюджета запросов.
+
+    Проверяет то же, что и тесты с notes.query_budget: объявленный
+    в ROUTE_BUDGETS бюджет маршрута и повторы одинакового SQL. Запрос
+    при этом выполняется как обычно.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Без лимитов QueryBudget только собирает запросы.
+        with QueryBudget(max_repeats=None) as capture:
+            response = self.get_response(request)
+        match = request.resolver_match
+        if match is not None:
+            problems = find_problems(
+                capture.queries,
+                ROUTE_BUDGETS.get(match.view_name, {}).get(request.method),
+                None if match.view_name in REPEATS_ALLOWED else 1,
+            )
+            if problems:
+                logger.warning(
+                    'Бюджет запросов %s %s (%s):\n%s',
+                    request.method, request.path, match.view_name,
+                    '\n'.join(problems),
+                )
+        return response
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, которые клиент принимает (q > 0)."""
+    accepted = set()
+    for item in header.split(','):
+        coding, *params = (part.strip() for part in item.split(';'))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.lower())
+    return accepted
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Сжимает ответы NOTES_COMPRESS_TYPES не меньше NOTES_COMPRESS_MIN_SIZE.
+
+    Brotli — если установлен модуль brotli и клиент его принимает,
+    иначе gzip. Маленькие ответы не сжимаются: выигрыш в байтах меньше
+    времени на сжатие. Сильный ETag, как у GZipMiddleware, становится
+    слабым: сжатое тело другое побайтно, а notes/conditional.py сравнивает
+    теги слабо, и ответ 304 по-прежнему работает. От BREACH страницы
+    с формами защищает маскирование токена CSRF в каждом ответе.
+    """
+
+    def process_response(self, request, response):
+        if (response.streaming
+                or response.has_header('Content-Encoding')
+                or response.get('Content-Type', '').partition(';')[0]
+                not in settings.NOTES_COMPRESS_TYPES):
+            return response
+        # Ответ зависит от Accept-Encoding, даже если сейчас не сжат.
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < settings.NOTES_COMPRESS_MIN_SIZE:
+            return response
+        accepted = accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if brotli is not None and 'br' in accepted:
+            encoding = 'br'
+            content = brotli.compress(
+                response.content, quality=settings.NOTES_BROTLI_QUALITY
+            )
+        elif accepted & {'gzip', '*'}:
+            encoding = 'gzip'
+            content = compress_string(response.content)
+        else:
+            return response
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = f'W/{etag}'
+        return response
+
+
+class AuthenticationMiddleware(auth_middleware.AuthenticationMiddleware):
+    """
+    Берёт request.user из сессии, если он загружен вместе с ней.
+
+    Хранилища notes.sessions читают пользователя тем же запросом, что
+    и сессию, так что отдельного запроса за пользователем не будет.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: sessions.get_user(request))
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.15 on 2026-10-18 17:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0003_note_author_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransferCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Задание')),
+                ('position', models.BigIntegerField(default=0, verbose_name='Позиция')),
+                ('offset', models.BigIntegerField(default=0, verbose_name='Смещение в файле')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from notes.search import install
+    install(schema_editor.connection.alias)
+
+
+def drop_search_index(apps, schema_editor):
+    from notes.search import uninstall
+    uninstall(schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0004_transfercheckpoint'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
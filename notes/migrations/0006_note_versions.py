@@ -0,0 +1,46 @@
+# Generated by Django 3.2.15 on 2026-10-18 17:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def create_versions(apps, schema_editor):
+    """Счётчики для уже существующих пользователей."""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    AuthorNotesVersion = apps.get_model('notes', 'AuthorNotesVersion')
+    using = schema_editor.connection.alias
+    AuthorNotesVersion.objects.using(using).bulk_create(
+        (
+            AuthorNotesVersion(author_id=author_id)
+            for author_id in User.objects.using(using)
+            .values_list('pk', flat=True).iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notes', '0005_note_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorNotesVersion',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notes_version', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Версия')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Изменено')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Изменена'),
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
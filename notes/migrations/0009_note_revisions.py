@@ -0,0 +1,55 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:11
+
+import zlib
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def create_snapshots(apps, schema_editor):
+    """Первые версии уже существующих заметок — их полный текст."""
+    Note = apps.get_model('notes', 'Note')
+    NoteRevision = apps.get_model('notes', 'NoteRevision')
+    using = schema_editor.connection.alias
+    NoteRevision.objects.using(using).bulk_create(
+        (
+            NoteRevision(
+                note_id=note_id, number=1, title=title, is_snapshot=True,
+                data=zlib.compress(text.encode(), 9),
+            )
+            for note_id, title, text in Note.objects.using(using)
+            .values_list('id', 'title', 'text').iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0008_user_sessions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(verbose_name='Номер')),
+                ('title', models.CharField(max_length=100, verbose_name='Заголовок')),
+                ('is_snapshot', models.BooleanField(default=False, verbose_name='Полный текст')),
+                ('data', models.BinaryField(verbose_name='Данные')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Создана')),
+                ('note', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='notes.note')),
+            ],
+            options={
+                'ordering': ('note', 'number'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='noterevision',
+            constraint=models.UniqueConstraint(fields=('note', 'number'), name='revision_note_number_unique'),
+        ),
+        migrations.RunPython(create_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:19
+
+from django.conf import settings
+from django.db import migrations, transaction
+from django.db.models.functions import Length
+import notes.fields
+from notes.fields import CompressedText
+
+BATCH_SIZE = 500
+
+
+def note_texts(apps, using, min_length=0):
+    """Пачки (id, текст) заметок с текстом не короче min_length."""
+    Note = apps.get_model('notes', 'Note')
+    notes = Note.objects.using(using).order_by('id')
+    if min_length:
+        notes = notes.annotate(size=Length('text')).filter(
+            size__gte=min_length
+        )
+    last_id = 0
+    while True:
+        batch = list(
+            notes.filter(id__gt=last_id).values_list('id', 'text')[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1][0]
+
+
+def compress_texts(apps, schema_editor):
+    """Сжимает большие тексты существующих заметок пачками."""
+    from notes.search import index_compressed, install
+
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    using = connection.alias
+    # Триггеры удалят из поискового индекса прежний текст, а сжатый
+    # пропустят: его индексирует index_compressed().
+    install(using)
+    Note = apps.get_model('notes', 'Note')
+    # Length считает символы, а порог задан в байтах UTF-8: символ
+    # занимает не больше 4 байт, точную проверку делает compress_text.
+    min_length = settings.NOTES_TEXT_COMPRESS_THRESHOLD // 4
+    for batch in note_texts(apps, using, min_length):
+        with transaction.atomic(using=using):
+            for note_id, text in batch:
+                if isinstance(text, str):
+                    Note.objects.using(using).filter(pk=note_id).update(
+                        text=text
+                    )
+            ids = [note_id for note_id, _ in batch]
+            index_compressed(
+                using, f"id IN ({', '.join(['%s'] * len(ids))})", ids
+            )
+
+
+def decompress_texts(apps, schema_editor):
+    from notes.search import compressed_entries, forget_compressed
+
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    # У BLOB длина в байтах, поэтому сжатые тексты ищем без фильтра.
+    for batch in note_texts(apps, connection.alias):
+        texts = [
+            (str(text), note_id) for note_id, text in batch
+            if isinstance(text, CompressedText)
+        ]
+        if not texts:
+            continue
+        ids = [note_id for _, note_id in texts]
+        with transaction.atomic(using=connection.alias):
+            # Записи сжатых заметок в индексе триггеры не удаляют.
+            forget_compressed(connection.alias, compressed_entries(
+                connection.alias,
+                f"id IN ({', '.join(['%s'] * len(ids))})", ids,
+            ))
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    'UPDATE notes_note SET text = %s WHERE id = %s', texts
+                )
+
+
+class Migration(migrations.Migration):
+    # Пачки сжимаются в отдельных транзакциях.
+    atomic = False
+
+    dependencies = [
+        ('notes', '0009_note_revisions'),
+    ]
+
+    operations = [
+        # Колонка остаётся TEXT, меняется только класс поля, поэтому
+        # таблицу не нужно пересоздавать.
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(
+                model_name='note',
+                name='text',
+                field=notes.fields.CompressedTextField(help_text='Добавьте подробностей', verbose_name='Текст'),
+            ),
+        ]),
+        migrations.RunPython(compress_texts, decompress_texts),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notes', '0010_compressed_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Folder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('path', models.CharField(editable=False, max_length=255, verbose_name='Путь')),
+            ],
+            options={
+                'ordering': ('path',),
+            },
+        ),
+        migrations.CreateModel(
+            name='NoteTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, verbose_name='Название')),
+                ('slug', models.SlugField(db_index=False, verbose_name='Адрес')),
+                ('note_count', models.PositiveIntegerField(default=0, verbose_name='Заметок')),
+            ],
+            options={
+                'ordering': ('slug',),
+            },
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='author',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='tags', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='notetag',
+            name='note',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='notes.note'),
+        ),
+        migrations.AddField(
+            model_name='notetag',
+            name='tag',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='notes.tag'),
+        ),
+        migrations.AddField(
+            model_name='folder',
+            name='author',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='folders', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='folder',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='notes.folder', verbose_name='Родительская папка'),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='folder',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notes', to='notes.folder', verbose_name='Папка'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['folder', 'id'], name='note_folder_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='notes', through='notes.NoteTag', to='notes.Tag', verbose_name='Метки'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('author', 'slug'), name='tag_author_slug_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='notetag',
+            index=models.Index(fields=['tag', 'note'], name='notetag_tag_note_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='notetag',
+            constraint=models.UniqueConstraint(fields=('note', 'tag'), name='notetag_note_tag_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='folder',
+            constraint=models.UniqueConstraint(fields=('author', 'path'), name='folder_author_path_unique'),
+        ),
+    ]
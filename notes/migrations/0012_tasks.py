@@ -0,0 +1,40 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:36
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0011_tags_and_folders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Задача')),
+                ('key', models.CharField(max_length=100, null=True, verbose_name='Ключ порядка')),
+                ('payload', models.JSONField(default=dict, verbose_name='Параметры')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Доступна')),
+                ('claim', models.CharField(blank=True, max_length=32, verbose_name='Метка процесса')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+                ('failed', models.BooleanField(default=False, verbose_name='Не выполнена')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Создана')),
+            ],
+            options={
+                'ordering': ('id',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['key', 'id'], name='task_key_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['claim'], name='task_claim_idx'),
+        ),
+    ]
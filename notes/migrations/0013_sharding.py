@@ -0,0 +1,57 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('notes', '0012_tasks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorShard',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notes_shard', serialize=False, to='auth.user')),
+                ('alias', models.CharField(max_length=100, verbose_name='Шард')),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='note',
+            name='note_author_slug_idx',
+        ),
+        migrations.AddField(
+            model_name='transfercheckpoint',
+            name='shard',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Шард'),
+        ),
+        migrations.AlterField(
+            model_name='folder',
+            name='author',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='folders', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='author',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='slug',
+            field=models.SlugField(blank=True, db_index=False, help_text='Укажите адрес для страницы заметки. Используйте только латиницу, цифры, дефисы и знаки подчёркивания', max_length=100, verbose_name='Адрес для страницы с заметкой'),
+        ),
+        migrations.AlterField(
+            model_name='tag',
+            name='author',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='tags', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='note',
+            constraint=models.UniqueConstraint(fields=('author', 'slug'), name='note_author_slug_unique'),
+        ),
+    ]
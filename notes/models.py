@@ -1,7 +1,26 @@
+import hashlib
+import secrets
+
 from django.conf import settings
+from django.contrib.sessions.base_session import (
+    AbstractBaseSession, BaseSessionManager
+)
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
+
+from .fields import CompressedTextField
+from .slugs import save_with_unique_slug, slugify
+
+# Поля, которых достаточно для вывода заметки в списке.
+SUMMARY_FIELDS = ('id', 'slug', 'title')
+
 
-from pytils.translit import slugify
+class NoteQuerySet(models.QuerySet):
+
+    def summary(self, fields=SUMMARY_FIELDS):
+        """Загружает только перечисленные поля, не трогая текст заметки."""
+        return self.only(*fields)
 
 
 class Note(models.Model):
@@ -11,28 +30,446 @@ class Note(models.Model):
         default='Название заметки',
         help_text='Дайте короткое название заметке'
     )
-    text = models.TextField(
+    text = CompressedTextField(
         'Текст',
         help_text='Добавьте подробностей'
     )
     slug = models.SlugField(
         'Адрес для страницы с заметкой',
         max_length=100,
-        unique=True,
         blank=True,
+        # Индекс покрывает уникальное ограничение (author_id, slug).
+        db_index=False,
         help_text=('Укажите адрес для страницы заметки. Используйте только '
                    'латиницу, цифры, дефисы и знаки подчёркивания')
     )
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        # Отдельный индекс по автору не нужен: его покрывают составные
+        # индексы ниже, у которых author_id стоит первым столбцом.
+        db_index=False,
+        # Заметки могут лежать в шарде, где нет таблицы пользователей
+        # с этим автором (см. notes/shards.py).
+        db_constraint=False,
+    )
+    updated_at = models.DateTimeField('Изменена', auto_now=True)
+    folder = models.ForeignKey(
+        'Folder',
+        verbose_name='Папка',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='notes',
+        # Индекс покрывает составной индекс (folder_id, id) ниже.
+        db_index=False,
+    )
+    tags = models.ManyToManyField(
+        'Tag',
+        verbose_name='Метки',
+        through='NoteTag',
+        related_name='notes',
+        blank=True,
     )
 
+    objects = NoteQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('id',)
+        constraints = (
+            # slug уникален среди заметок автора: адрес заметки всегда
+            # ищется вместе с автором, и проверка не выходит за шард.
+            models.UniqueConstraint(
+                fields=('author', 'slug'), name='note_author_slug_unique'
+            ),
+        )
+        indexes = (
+            models.Index(fields=('author', 'id'), name='note_author_id_idx'),
+            models.Index(fields=('folder', 'id'), name='note_folder_id_idx'),
+        )
+
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
+        if self.slug:
+            super().save(*args, **kwargs)
+            return
+        save_with_unique_slug(
+            self,
+            lambda: super(Note, self).save(*args, **kwargs),
+            slugify(self.title, self._meta.get_field('slug').max_length),
+            using=kwargs.get('using'),
+            scope=('author_id',),
+        )
+
+
+class NoteRevision(models.Model):
+    """
+    Версия заметки: полный текст или правка к предыдущей версии.
+
+    Данные сжаты zlib, полный текст хранится не реже чем раз
+    в NOTES_REVISION_SNAPSHOT_EVERY версий (см. notes/revisions.py).
+    """
+    note = models.ForeignKey(
+        Note,
+        on_delete=models.CASCADE,
+        related_name='revisions',
+        # Индекс не нужен: его покрывает уникальное ограничение ниже.
+        db_index=False,
+    )
+    number = models.PositiveIntegerField('Номер')
+    title = models.CharField('Заголовок', max_length=100)
+    is_snapshot = models.BooleanField('Полный текст', default=False)
+    data = models.BinaryField('Данные')
+    created_at = models.DateTimeField('Создана', default=timezone.now)
+
+    class Meta:
+        ordering = ('note', 'number')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('note', 'number'), name='revision_note_number_unique'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.note_id}: {self.number}'
+
+
+class FolderQuerySet(models.QuerySet):
+
+    def subtree(self, folder):
+        """
+        Папка folder и все вложенные в неё папки.
+
+        Пути вложенных папок начинаются с пути folder, поэтому это
+        диапазон по индексу (author_id, path) без рекурсии: после «/»
+        в ASCII идёт «0», и путь «12/» ограничивает диапазон [«12/», «120»).
+        """
+        return self.filter(
+            author_id=folder.author_id,
+            path__gte=folder.path,
+            path__lt=folder.path[:-1] + '0',
+        )
+
+
+class Folder(models.Model):
+    """
+    Папка заметок автора.
+
+    path — материализованный путь из id папок от корня, например
+    «3/17/42/»: по нему дерево выбирается одним запросом по индексу.
+    Путь вычисляется при создании папки и дальше не меняется.
+    """
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='folders',
+        db_constraint=False,
+        # Индекс покрывает уникальное ограничение (author_id, path).
+        db_index=False,
+    )
+    parent = models.ForeignKey(
+        'self',
+        verbose_name='Родительская папка',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='children',
+    )
+    name = models.CharField('Название', max_length=100)
+    path = models.CharField('Путь', max_length=255, editable=False)
+
+    objects = FolderQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('path',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('author', 'path'), name='folder_author_path_unique'
+            ),
+        )
+
+    def __str__(self):
+        return '\u00a0\u00a0' * self.depth + self.name
+
+    @property
+    def depth(self):
+        """Уровень вложенности: 0 у папки в корне."""
+        return self.path.count('/') - 1
+
+    def save(self, *args, **kwargs):
+        if self.path:
+            super().save(*args, **kwargs)
+            return
+        # Путь содержит id папки, который известен только после вставки.
+        # До этого путь уникален и не попадает ни в одно дерево.
+        self.path = f'new-{secrets.token_hex(8)}'
         super().save(*args, **kwargs)
+        prefix = self.parent.path if self.parent_id else ''
+        self.path = f'{prefix}{self.pk}/'
+        type(self).objects.using(self._state.db).filter(
+            pk=self.pk
+        ).update(path=self.path)
+
+
+class Tag(models.Model):
+    """
+    Метка заметок автора.
+
+    note_count — число заметок с меткой. Он обновляется в той же
+    транзакции, что и связи NoteTag (см. signals.note_tags_changed),
+    поэтому облако меток читается одним запросом без COUNT.
+    """
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='tags',
+        db_constraint=False,
+        # Индекс покрывает уникальное ограничение (author_id, slug).
+        db_index=False,
+    )
+    name = models.CharField('Название', max_length=50)
+    slug = models.SlugField('Адрес', max_length=50, db_index=False)
+    note_count = models.PositiveIntegerField('Заметок', default=0)
+
+    class Meta:
+        ordering = ('slug',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('author', 'slug'), name='tag_author_slug_unique'
+            ),
+        )
+
+    def __str__(self):
+        return self.name
+
+
+class NoteTag(models.Model):
+    """Связь заметки с меткой."""
+    note = models.ForeignKey(
+        Note,
+        on_delete=models.CASCADE,
+        # Индекс покрывает уникальное ограничение (note_id, tag_id).
+        db_index=False,
+    )
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        # Индекс покрывает составной индекс (tag_id, note_id).
+        db_index=False,
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('note', 'tag'), name='notetag_note_tag_unique'
+            ),
+        )
+        indexes = (
+            # Заметки с меткой по возрастанию id: фильтр списка по метке
+            # с курсорной пагинацией читает диапазон этого индекса.
+            models.Index(fields=('tag', 'note'), name='notetag_tag_note_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.note_id}: {self.tag_id}'
+
+
+class NotesVersionQuerySet(models.QuerySet):
+
+    def bump(self, author_ids):
+        """
+        Отмечает, что заметки авторов изменились.
+
+        Вызывается в той же транзакции, что и изменение заметок, или
+        сразу после её фиксации (notes.signals), поэтому номер версии
+        не меняется раньше, чем становятся видны новые данные.
+        """
+        return self.filter(author_id__in=author_ids).update(
+            version=F('version') + 1, updated_at=timezone.now()
+        )
+
+
+class AuthorNotesVersion(models.Model):
+    """
+    Счётчик изменений заметок автора для условных GET-запросов.
+
+    Строка создаётся вместе с пользователем, поэтому при изменении
+    заметок достаточно UPDATE по первичному ключу.
+    """
+    author = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notes_version',
+    )
+    version = models.PositiveBigIntegerField('Версия', default=0)
+    updated_at = models.DateTimeField('Изменено', default=timezone.now)
+
+    objects = NotesVersionQuerySet.as_manager()
+
+    def __str__(self):
+        return f'{self.author_id}: {self.version}'
+
+
+class AuthorShard(models.Model):
+    """
+    Шард, в котором лежат заметки автора (см. notes/shards.py).
+
+    Строка создаётся вместе с пользователем, если шарды настроены;
+    заметки автора без строки лежат в основной базе.
+    """
+    author = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notes_shard',
+    )
+    alias = models.CharField('Шард', max_length=100)
+
+    def __str__(self):
+        return f'{self.author_id}: {self.alias}'
+
+
+class TransferCheckpoint(models.Model):
+    """Прогресс импорта или экспорта заметок для возобновления работы."""
+    name = models.CharField('Задание', max_length=255, unique=True)
+    # Шард, который выгружается сейчас: id заметок уникальны только
+    # в пределах шарда.
+    shard = models.CharField('Шард', max_length=100, blank=True)
+    position = models.BigIntegerField('Позиция', default=0)
+    offset = models.BigIntegerField('Смещение в файле', default=0)
+    updated_at = models.DateTimeField('Обновлено', auto_now=True)
+
+    def __str__(self):
+        return f'{self.name}: {self.position}'
+
+
+class Task(models.Model):
+    """
+    Фоновая задача в очереди notes/queue.py.
+
+    Строка удаляется в той же транзакции, что и действие задачи, поэтому
+    выполненная задача не повторяется. Задачи с одинаковым ключом key
+    выполняются по одной в порядке id.
+    """
+    name = models.CharField('Задача', max_length=100)
+    key = models.CharField('Ключ порядка', max_length=100, null=True)
+    payload = models.JSONField('Параметры', default=dict)
+    # Раньше этого времени задачу не берут: это и отложенный повтор,
+    # и срок, за который взявший задачу процесс должен её выполнить.
+    available_at = models.DateTimeField('Доступна', default=timezone.now)
+    claim = models.CharField('Метка процесса', max_length=32, blank=True)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    failed = models.BooleanField('Не выполнена', default=False)
+    error = models.TextField('Ошибка', blank=True)
+    created_at = models.DateTimeField('Создана', default=timezone.now)
+
+    class Meta:
+        ordering = ('id',)
+        indexes = (
+            models.Index(fields=('key', 'id'), name='task_key_id_idx'),
+            models.Index(fields=('claim',), name='task_claim_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.name}: {self.pk}'
+
+
+def token_digest(key):
+    """Токен хранится в базе только в виде хеша."""
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class ApiTokenQuerySet(models.QuerySet):
+
+    def issue(self, user, name=''):
+        """Создаёт токен и возвращает его ключ: повторно его не узнать."""
+        key = secrets.token_urlsafe(32)
+        self.create(user=user, name=name, digest=token_digest(key))
+        return key
+
+    def authenticate(self, key):
+        """Токен с пользователем по ключу из заголовка или None."""
+        try:
+            return self.select_related('user').get(
+                digest=token_digest(key), user__is_active=True
+            )
+        except self.model.DoesNotExist:
+            return None
+
+
+class ApiToken(models.Model):
+    """Токен доступа к JSON API для интеграций."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='api_tokens',
+    )
+    name = models.CharField('Название', max_length=100, blank=True)
+    digest = models.CharField('Хеш ключа', max_length=64, unique=True)
+    created_at = models.DateTimeField('Создан', auto_now_add=True)
+
+    objects = ApiTokenQuerySet.as_manager()
+
+    def __str__(self):
+        return f'{self.user_id}: {self.name or self.digest[:8]}'
+
+
+class IdempotencyKey(models.Model):
+    """
+    Сохранённый ответ на изменяющий запрос к API.
+
+    Повтор запроса с тем же ключом Idempotency-Key возвращает этот ответ,
+    а не выполняет изменение второй раз.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE
+    )
+    key = models.CharField('Ключ', max_length=255)
+    request_hash = models.CharField('Хеш запроса', max_length=64)
+    status = models.PositiveSmallIntegerField('Код ответа', default=0)
+    body = models.TextField('Тело ответа', blank=True)
+    created_at = models.DateTimeField('Создан', default=timezone.now)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'key'), name='idempotency_user_key_unique'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user_id}: {self.key}'
+
+
+class UserSessionManager(BaseSessionManager):
+
+    def get_queryset(self):
+        # Сессия всегда нужна вместе с пользователем: один запрос вместо
+        # двух на каждый запрос авторизованного пользователя.
+        return super().get_queryset().select_related('user')
+
+
+class UserSession(AbstractBaseSession):
+    """
+    Сессия со ссылкой на пользователя.
+
+    Пользователь загружается тем же запросом, что и сессия,
+    см. notes/sessions.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+
+    objects = UserSessionManager()
+
+    @classmethod
+    def get_session_store_class(cls):
+        from .sessions.db import SessionStore
+        return SessionStore
@@ -0,0 +1,148 @@
+"""Курсорная (keyset) пагинация списков заметок.
+
+В отличие от OFFSET-пагинации, страница выбирается условием по ключу
+сортировки (``id > курсор``), поэтому стоимость запроса зависит только
+от размера страницы, а не от её номера.
+"""
+import base64
+import binascii
+import json
+
+from django.http import Http404
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+class InvalidCursor(ValueError):
+    """Курсор повреждён или сформирован не нами."""
+
+
+def encode_cursor(direction, position):
+    """Упаковывает направление и позицию в непрозрачную строку для URL."""
+    raw = json.dumps([direction, position], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Распаковывает курсор, полученный из URL."""
+    padding = '=' * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(cursor + padding)
+        direction, position = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    if direction not in (FORWARD, BACKWARD) or not isinstance(position, int):
+        raise InvalidCursor(cursor)
+    return direction, position
+
+
+class KeysetPage:
+    """Страница результатов с курсорами на соседние страницы."""
+
+    def __init__(self, object_list, key, has_next, has_previous):
+        self.object_list = object_list
+        self.key = key
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return encode_cursor(
+            FORWARD, getattr(self.object_list[-1], self.key)
+        )
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return encode_cursor(
+            BACKWARD, getattr(self.object_list[0], self.key)
+        )
+
+
+class KeysetPaginator:
+    """
+    Разбивает queryset на страницы по возрастанию уникального ключа.
+
+    Queryset уже должен быть ограничен нужным автором, поэтому в курсоре
+    хранится только значение ключа: вместе с фильтром по автору это даёт
+    диапазон по составному индексу ``(author_id, id)``.
+    """
+
+    def __init__(self, queryset, per_page, key='id'):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.key = key
+
+    def page(self, cursor=None):
+        """Возвращает страницу, на которую указывает курсор."""
+        if not cursor:
+            return self._forward(self.queryset, has_previous=False)
+        direction, position = decode_cursor(cursor)
+        if direction == FORWARD:
+            return self._forward(
+                self.queryset.filter(**{f'{self.key}__gt': position}),
+                has_previous=True,
+            )
+        return self._backward(
+            self.queryset.filter(**{f'{self.key}__lt': position})
+        )
+
+    def _forward(self, queryset, has_previous):
+        # Запрашиваем на одну запись больше, чтобы без COUNT узнать,
+        # есть ли следующая страница.
+        rows = list(queryset.order_by(self.key)[:self.per_page + 1])
+        return KeysetPage(
+            rows[:self.per_page],
+            self.key,
+            has_next=len(rows) > self.per_page,
+            has_previous=has_previous,
+        )
+
+    def _backward(self, queryset):
+        rows = list(queryset.order_by(f'-{self.key}')[:self.per_page + 1])
+        return KeysetPage(
+            rows[:self.per_page][::-1],
+            self.key,
+            has_next=True,
+            has_previous=len(rows) > self.per_page,
+        )
+
+
+class KeysetPaginationMixin:
+    """Подменяет стандартную пагинацию ListView на курсорную."""
+
+    cursor_kwarg = 'cursor'
+    cursor_key = 'id'
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, key=self.cursor_key)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404('Некорректный курсор страницы.')
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -1,7 +1,9 @@
 # conftest.py
 import pytest
 from django.test.client import Client
+from django.urls import reverse
 from notes.models import Note
+from notes.query_budget import QueryBudget, route_budget
 
 
 @pytest.fixture
@@ -21,6 +23,13 @@ def author_client(author):
     return client
 
 
+@pytest.fixture
+def cached_author_client(author_client):
+    """Клиент автора, чьи сессия и пользователь уже в кеше."""
+    author_client.get(reverse('notes:success'))
+    return author_client
+
+
 @pytest.fixture
 def not_author_client(not_author):
     client = Client()
@@ -51,3 +60,18 @@ def form_data():
         'text': 'Новый текст',
         'slug': 'new-slug'
     }
+
+
+@pytest.fixture
+def query_budget(db):
+    """
+    Проверка бюджета запросов к базе.
+
+    with query_budget('notes:list'): — бюджет маршрута из ROUTE_BUDGETS,
+    with query_budget(max_queries=3): — явный бюджет.
+    """
+    def budget(view_name=None, method='GET', **kwargs):
+        if view_name is not None:
+            return route_budget(view_name, method)
+        return QueryBudget(**kwargs)
+    return budget
@@ -0,0 +1,44 @@
+# test_query_budget.py
+import pytest
+
+from django.urls import reverse
+
+from notes.models import Note
+from notes.query_budget import QueryBudgetExceeded
+
+
+@pytest.mark.parametrize(
+    'name',
+    ('notes:home', 'notes:list', 'notes:add', 'notes:success')
+)
+def test_pages_within_budget(cached_author_client, query_budget, name):
+    with query_budget(name):
+        cached_author_client.get(reverse(name))
+
+
+@pytest.mark.parametrize(
+    'name',
+    ('notes:detail', 'notes:edit', 'notes:delete'),
+)
+def test_note_pages_within_budget(
+    cached_author_client, query_budget, note, name
+):
+    with query_budget(name):
+        cached_author_client.get(reverse(name, args=(note.slug,)))
+
+
+def test_list_has_no_n_plus_one(cached_author_client, author, query_budget):
+    Note.objects.bulk_create(
+        Note(title=f'Заметка {index}', text='Текст', slug=f'n-{index}',
+             author=author)
+        for index in range(20)
+    )
+    with query_budget('notes:list'):
+        cached_author_client.get(reverse('notes:list'))
+
+
+def test_budget_fails_on_repeated_query(query_budget, note):
+    with pytest.raises(QueryBudgetExceeded, match='N\\+1'):
+        with query_budget(max_queries=10):
+            for _ in range(2):
+                Note.objects.get(pk=note.pk)
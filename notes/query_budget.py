@@ -0,0 +1,110 @@
+"""
+Бюджеты запросов к базе и поиск N+1.
+
+QueryBudget — контекстный менеджер и декоратор: падает с
+QueryBudgetExceeded, если внутри выполнено больше запросов, чем
+объявлено, или один и тот же SQL повторился больше max_repeats раз
+(None — повторы не проверять).
+Одинаковым считается текст запроса до подстановки параметров: так
+выглядит N+1, когда запрос выполняется в цикле по объектам.
+
+ROUTE_BUDGETS — объявленные бюджеты маршрутов notes.urls. Их проверяют
+тесты, а QueryBudgetMiddleware в режиме DEBUG предупреждает о превышении
+прямо во время разработки.
+"""
+from collections import Counter
+from contextlib import ContextDecorator, ExitStack
+
+from django.db import connections
+
+# Сколько запросов к базе может выполнить маршрут при обычном запросе
+# авторизованного пользователя: сессия и пользователь уже в кеше
+# (notes/sessions, CachedModelBackend), токен API читается из базы.
+# Бюджет пакетного API — для пакета из одной операции. Изменение
+# заметки читает последние версии и добавляет новую (notes/revisions.py).
+# Форма заметки выбирает папки автора и, при правке, метки заметки;
+# удаление заметки уменьшает счётчики её меток (notes/catalog.py).
+ROUTE_BUDGETS = {
+    'notes:home': {'GET': 1},
+    'notes:add': {'GET': 1, 'POST': 8},
+    'notes:edit': {'GET': 3, 'POST': 9},
+    'notes:detail': {'GET': 3},
+    'notes:revisions': {'GET': 2},
+    'notes:revision': {'GET': 2, 'POST': 8},
+    'notes:delete': {'GET': 1, 'POST': 6},
+    'notes:list': {'GET': 2},
+    'notes:search': {'GET': 2},
+    'notes:tags': {'GET': 1},
+    'notes:folders': {'GET': 1},
+    'notes:folder-add': {'GET': 1, 'POST': 4},
+    'notes:success': {'GET': 0},
+    'notes:metrics': {'GET': 0},
+    'notes:api-list': {'GET': 3, 'POST': 11},
+    'notes:api-lookup': {'POST': 2},
+    'notes:api-batch': {'POST': 11},
+    'notes:api-detail': {'GET': 3, 'PATCH': 11, 'DELETE': 9},
+}
+
+# Пакетные операции по одному запросу на заметку — это их суть,
+# а не N+1: повторы для них не проверяются.
+REPEATS_ALLOWED = {'notes:api-batch'}
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Превышен бюджет запросов или найден повторяющийся запрос."""
+
+
+def find_problems(queries, max_queries=None, max_repeats=1):
+    """Описания нарушений бюджета для списка SQL-запросов."""
+    problems = []
+    if max_queries is not None and len(queries) > max_queries:
+        problems.append(
+            f'выполнено {len(queries)} запросов при бюджете {max_queries}'
+        )
+    if max_repeats is None:
+        return problems
+    for sql, count in Counter(queries).items():
+        if count > max_repeats:
+            problems.append(f'запрос повторён {count} раз (N+1?): {sql}')
+    return problems
+
+
+class QueryBudget(ContextDecorator):
+    """Проверяет число и повторы запросов ко всем базам в этом потоке."""
+
+    def __init__(self, max_queries=None, max_repeats=1):
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+        self.queries = []
+
+    def record(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.queries = []
+        self.stack = ExitStack()
+        for connection in connections.all():
+            self.stack.enter_context(connection.execute_wrapper(self.record))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stack.close()
+        if exc_type is not None:
+            return
+        problems = self.problems()
+        if problems:
+            raise QueryBudgetExceeded('\n'.join(
+                problems + ['Запросы:'] + self.queries
+            ))
+
+    def problems(self):
+        return find_problems(self.queries, self.max_queries, self.max_repeats)
+
+
+def route_budget(view_name, method='GET'):
+    """Бюджет маршрута из ROUTE_BUDGETS для метода запроса."""
+    return QueryBudget(
+        ROUTE_BUDGETS[view_name][method],
+        None if view_name in REPEATS_ALLOWED else 1,
+    )
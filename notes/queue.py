@@ -0,0 +1,167 @@
+"""
+Очередь фоновых задач в таблице базы, без внешнего брокера.
+
+Задача — функция handler(payload, using), зарегистрированная декоратором
+task. enqueue добавляет строку Task в текущей транзакции: задача
+появится, только если изменение, которое её породило, сохранилось.
+Процессы manage.py run_workers выполняют задачи пачками:
+
+* пачку берёт один UPDATE: он ставит задачам метку процесса claim
+  и срок available_at через NOTES_TASK_VISIBILITY_TIMEOUT секунд.
+  На PostgreSQL строки выбираются SELECT ... FOR UPDATE SKIP LOCKED,
+  на SQLite команда UPDATE и так выполняется под блокировкой записи
+  всей базы, и два процесса не возьмут одну задачу;
+* пачка выполняется в одной транзакции, каждая задача — в своей точке
+  сохранения: строка задачи удаляется (если метка всё ещё наша) вместе
+  с действием задачи. Прерванный процесс не фиксирует ничего, и после
+  срока видимости задачи берёт другой процесс. Поэтому изменения
+  в базе выполняются ровно один раз;
+* задача с ошибкой повторяется через NOTES_TASK_RETRY_DELAY * 2**(n-1)
+  секунд после n-й попытки, а после NOTES_TASK_MAX_ATTEMPTS попыток
+  остаётся в таблице с failed=True и текстом ошибки.
+
+Задачи с одинаковым ключом key выполняются по одной в порядке
+добавления: пока в очереди есть более ранняя задача с тем же ключом
+(кроме неудавшихся), следующую не берут.
+"""
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(name):
+    """Регистрирует функцию handler(payload, using) как задачу name."""
+    def register(handler):
+        TASKS[name] = handler
+        return handler
+    return register
+
+
+def enqueue(name, payload, key=None, using=None):
+    """Добавляет задачу name в очередь в текущей транзакции."""
+    if name not in TASKS:
+        raise ValueError(f'Неизвестная задача: {name}')
+    return Task.objects.using(using or router.db_for_write(Task)).create(
+        name=name, key=key, payload=payload
+    )
+
+
+def ready_tasks(using, now):
+    """Задачи, которые можно взять сейчас, по порядку добавления."""
+    earlier = Task.objects.filter(
+        key=OuterRef('key'), id__lt=OuterRef('id'), failed=False
+    )
+    return (
+        Task.objects.using(using)
+        .filter(~Exists(earlier), failed=False, available_at__lte=now)
+        .order_by('id')
+    )
+
+
+def claim(limit, using=None, timeout=None):
+    """Берёт до limit готовых задач для этого процесса."""
+    using = using or router.db_for_write(Task)
+    if timeout is None:
+        timeout = settings.NOTES_TASK_VISIBILITY_TIMEOUT
+    token = uuid.uuid4().hex
+    now = timezone.now()
+    ready = ready_tasks(using, now)
+    changes = {
+        'claim': token,
+        'available_at': now + timedelta(seconds=timeout),
+        'attempts': F('attempts') + 1,
+    }
+    tasks = Task.objects.using(using)
+    if connections[using].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=using):
+            ids = list(
+                ready.select_for_update(skip_locked=True)
+                .values_list('id', flat=True)[:limit]
+            )
+            if not ids:
+                return []
+            tasks.filter(id__in=ids).update(**changes)
+    elif not tasks.filter(id__in=ready.values('id')[:limit]).update(
+        **changes
+    ):
+        return []
+    return list(tasks.filter(claim=token))
+
+
+class Worker:
+    """Выполняет задачи очереди пачками по batch_size."""
+
+    def __init__(self, batch_size=None, using=None, timeout=None):
+        self.batch_size = batch_size or settings.NOTES_TASK_BATCH_SIZE
+        self.using = using or router.db_for_write(Task)
+        self.timeout = timeout
+
+    def run_batch(self):
+        """Берёт и выполняет одну пачку; возвращает число взятых задач."""
+        tasks = claim(self.batch_size, self.using, self.timeout)
+        if tasks:
+            with transaction.atomic(using=self.using):
+                for task in tasks:
+                    self.run_task(task)
+        return len(tasks)
+
+    def run_task(self, task):
+        try:
+            handler = TASKS.get(task.name)
+            if handler is None:
+                raise LookupError(f'Неизвестная задача: {task.name}')
+            if task.attempts > settings.NOTES_TASK_MAX_ATTEMPTS:
+                # Попытки кончились, не дойдя до fail: процесс, который
+                # брал задачу, каждый раз прерывался.
+                raise RuntimeError('Выполнение задачи прерывалось.')
+            with transaction.atomic(using=self.using):
+                owned, _ = Task.objects.using(self.using).filter(
+                    pk=task.pk, claim=task.claim
+                ).delete()
+                # Если метки уже нет, срок видимости истёк и задачу взял
+                # другой процесс.
+                if owned:
+                    handler(task.payload, self.using)
+        except Exception:
+            self.fail(task, traceback.format_exc())
+
+    def fail(self, task, error):
+        failed = task.attempts >= settings.NOTES_TASK_MAX_ATTEMPTS
+        delay = settings.NOTES_TASK_RETRY_DELAY * 2 ** (task.attempts - 1)
+        Task.objects.using(self.using).filter(
+            pk=task.pk, claim=task.claim
+        ).update(
+            claim='', failed=failed, error=error,
+            available_at=timezone.now() + timedelta(seconds=delay),
+        )
+        logger.error(
+            'Задача %s (%s) не выполнена, попытка %s%s.',
+            task.pk, task.name, task.attempts,
+            ', больше не повторяется' if failed else '',
+        )
+
+    def run(self, stop=None):
+        """
+        Выполняет пачки, пока есть готовые задачи или до события stop.
+
+        Возвращает число взятых задач.
+        """
+        done = 0
+        while stop is None or not stop.is_set():
+            count = self.run_batch()
+            if not count:
+                break
+            done += count
+        return done
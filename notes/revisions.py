@@ -0,0 +1,299 @@
+"""
+История изменений заметок в виде сжатых правок.
+
+Каждое сохранение заметки с новым заголовком или текстом добавляет
+версию NoteRevision. Текст версии хранится как правка к предыдущей:
+список операций над словами предыдущего текста, где положительное
+число — скопировать столько слов, отрицательное — пропустить,
+строка — вставить. Не реже чем раз в NOTES_REVISION_SNAPSHOT_EVERY
+версий (и всякий раз, когда правка не меньше самого текста)
+сохраняется полный текст. Данные сжимаются zlib.
+
+С очередью задач (NOTES_TASK_QUEUE) версия записывается в фоне:
+задача получает заголовок и текст на момент сохранения, а версии одной
+заметки записываются по порядку, так что история не теряет правок.
+Первые версии импортированных заметок пишет одна задача на пачку:
+до её выполнения у заметки нет истории.
+
+Поэтому для восстановления любой версии достаточно одного запроса
+за последними K версиями и применения не больше K правок.
+"""
+import json
+import re
+import zlib
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Note, NoteRevision
+from .queue import enqueue, task
+from .shards import home_db, shard_for
+
+RECORD_TASK = 'notes.record_revision'
+SNAPSHOTS_TASK = 'notes.record_snapshots'
+
+# Слово вместе с пробелами после него; пробелы в начале текста — отдельно.
+# Склейка токенов всегда даёт исходный текст.
+TOKEN_RE = re.compile(r'\S+\s*|\s+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text)
+
+
+def diff(old_tokens, new_tokens):
+    """Операции, которые превращают токены old_tokens в new_tokens."""
+    ops = []
+    matcher = SequenceMatcher(None, old_tokens, new_tokens)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append(i2 - i1)
+            continue
+        if i2 > i1:
+            ops.append(i1 - i2)
+        if j2 > j1:
+            ops.append(''.join(new_tokens[j1:j2]))
+    return ops
+
+
+def patch(tokens, ops):
+    """
+    Токены текста после операций diff.
+
+    Вставленный фрагмент разбивается на те же токены, что и в новом
+    тексте, поэтому правки применяются одна за другой без склейки
+    и повторного разбиения всего текста.
+    """
+    result = []
+    position = 0
+    for op in ops:
+        if isinstance(op, str):
+            result.extend(tokenize(op))
+        elif op > 0:
+            result.extend(tokens[position:position + op])
+            position += op
+        else:
+            position -= op
+    return result
+
+
+def make_delta(old, new):
+    """Операции, которые превращают текст old в new."""
+    return diff(tokenize(old), tokenize(new))
+
+
+def apply_delta(old, ops):
+    """Текст, полученный из old операциями make_delta."""
+    return ''.join(patch(tokenize(old), ops))
+
+
+def compress(value):
+    return zlib.compress(value.encode(), 9)
+
+
+def decompress(data):
+    return zlib.decompress(data).decode()
+
+
+def reconstruct_tokens(revisions):
+    """
+    Токены текста последней из версий, упорядоченных по номеру.
+
+    Среди версий должен быть полный текст: применяются правки начиная
+    с последнего полного текста.
+    """
+    snapshots = [
+        index for index, revision in enumerate(revisions)
+        if revision.is_snapshot
+    ]
+    if not snapshots:
+        raise ValueError('Среди версий нет полного текста.')
+    tokens = tokenize(decompress(revisions[snapshots[-1]].data))
+    for revision in revisions[snapshots[-1] + 1:]:
+        tokens = patch(tokens, json.loads(decompress(revision.data)))
+    return tokens
+
+
+def reconstruct(revisions):
+    """Текст последней из версий, упорядоченных по номеру."""
+    return ''.join(reconstruct_tokens(revisions))
+
+
+def latest_revisions(note, using=None):
+    """
+    Последние версии заметки по возрастанию номера.
+
+    Их достаточно, чтобы восстановить последнюю версию: полный текст
+    встречается не реже чем раз в NOTES_REVISION_SNAPSHOT_EVERY версий.
+    """
+    revisions = NoteRevision.objects.using(using).filter(note=note)
+    return list(reversed(
+        revisions.order_by('-number')[
+            :settings.NOTES_REVISION_SNAPSHOT_EVERY
+        ]
+    ))
+
+
+def get_revision(note, number):
+    """Версия заметки с восстановленным текстом в атрибуте text."""
+    revisions = list(NoteRevision.objects.filter(
+        note=note,
+        number__lte=number,
+        number__gt=number - settings.NOTES_REVISION_SNAPSHOT_EVERY,
+    ).order_by('number'))
+    if not revisions or revisions[-1].number != number:
+        raise NoteRevision.DoesNotExist(number)
+    revision = revisions[-1]
+    revision.text = reconstruct(revisions)
+    return revision
+
+
+def first_revision(note, note_id):
+    return NoteRevision(
+        note_id=note_id, number=1, title=note.title, is_snapshot=True,
+        data=compress(str(note.text)),
+    )
+
+
+def record_snapshots(notes, using=None):
+    """
+    Первые версии заметок, созданных через bulk_create.
+
+    bulk_create не отправляет сигналов, а на SQLite ещё и не заполняет
+    первичные ключи: их находим по автору и slug, уникальным вместе.
+    """
+    ids = {(note.author_id, note.slug): note.pk for note in notes}
+    if None in ids.values():
+        ids = {
+            (author_id, slug): note_id
+            for author_id, slug, note_id in Note.objects.using(using).filter(
+                author_id__in={author_id for author_id, _ in ids},
+                slug__in={slug for _, slug in ids},
+            ).values_list('author_id', 'slug', 'id')
+        }
+    NoteRevision.objects.using(using).bulk_create(
+        first_revision(note, ids[note.author_id, note.slug])
+        for note in notes
+    )
+
+
+def record_snapshots_later(notes, using=None):
+    """
+    Первые версии заметок bulk_create сразу или в задаче очереди.
+
+    Сжатие текстов и вставка версий заметно замедляли импорт, поэтому
+    с очередью их делает одна задача на пачку. Заметки в ней заданы
+    автором и slug: id на SQLite после bulk_create неизвестны.
+    """
+    if not settings.NOTES_TASK_QUEUE:
+        return record_snapshots(notes, using)
+    enqueue_after(using, SNAPSHOTS_TASK, {
+        'notes': [[note.author_id, note.slug] for note in notes],
+    })
+
+
+def record(note, using=None, created=False):
+    """
+    Сохраняет новую версию заметки, если заголовок или текст изменились.
+
+    Возвращает созданную версию или None. У только что созданной
+    заметки истории ещё нет, и она не запрашивается.
+    """
+    previous = [] if created else latest_revisions(note, using)
+    number = 1
+    data, is_snapshot = compress(note.text), True
+    if previous:
+        last = previous[-1]
+        old_tokens = reconstruct_tokens(previous)
+        if last.title == note.title and ''.join(old_tokens) == note.text:
+            return None
+        number = last.number + 1
+        since_snapshot = number - max(
+            revision.number for revision in previous if revision.is_snapshot
+        )
+        if since_snapshot < settings.NOTES_REVISION_SNAPSHOT_EVERY:
+            delta = compress(json.dumps(
+                diff(old_tokens, tokenize(note.text)),
+                ensure_ascii=False, separators=(',', ':'),
+            ))
+            if len(delta) < len(data):
+                data, is_snapshot = delta, False
+    return NoteRevision.objects.using(using).create(
+        note=note, number=number, title=note.title,
+        is_snapshot=is_snapshot, data=data,
+    )
+
+
+def record_later(note, using=None, created=False):
+    """Сохраняет версию заметки сразу или в задаче очереди."""
+    if not settings.NOTES_TASK_QUEUE:
+        return record(note, using, created)
+    enqueue_after(using, RECORD_TASK, {
+        'note': note.pk,
+        # По автору move_author находит его невыполненные задачи.
+        'author': note.author_id,
+        'using': using,
+        'title': note.title,
+        'text': str(note.text),
+        'created': created,
+    }, key=f'note:{note.pk}')
+
+
+def enqueue_after(using, name, payload, key=None):
+    """
+    Ставит задачу про заметки базы using.
+
+    Очередь лежит в основной базе. Если заметки в другом шарде, задача
+    ставится после фиксации его транзакции: откат записи заметок
+    не должен оставить в очереди задачу про несохранённые данные.
+    """
+    queue_db = home_db(using)
+
+    def put():
+        enqueue(name, payload, key=key, using=queue_db)
+
+    if queue_db == using:
+        put()
+    else:
+        transaction.on_commit(put, using=using)
+
+
+@task(RECORD_TASK)
+def record_task(payload, using):
+    # Задачи, поставленные до шардов, лежат в базе своих заметок.
+    using = payload.get('using') or using
+    note = (
+        Note.objects.using(using).filter(pk=payload['note']).only('id')
+        .first()
+    )
+    # Заметку могли удалить, пока задача ждала в очереди.
+    if note is not None:
+        note.title, note.text = payload['title'], payload['text']
+        record(note, using, payload['created'])
+
+
+@task(SNAPSHOTS_TASK)
+def record_snapshots_task(payload, using):
+    """
+    Первые версии заметок пачки импорта по их текущему тексту.
+
+    Шард ищется заново: автора могли перенести, пока задача ждала.
+    Заметки, у которых история уже есть (правка успела раньше задачи),
+    и удалённые заметки пропускаются.
+    """
+    by_shard = defaultdict(set)
+    for author_id in {author_id for author_id, _ in payload['notes']}:
+        by_shard[shard_for(author_id)].add(author_id)
+    keys = {tuple(key) for key in payload['notes']}
+    for alias, author_ids in by_shard.items():
+        notes = Note.objects.using(alias).filter(
+            author_id__in=author_ids,
+            slug__in={slug for _, slug in keys},
+            revisions__isnull=True,
+        ).only('id', 'author_id', 'slug', 'title', 'text')
+        NoteRevision.objects.using(alias).bulk_create(
+            first_revision(note, note.pk) for note in notes
+            if (note.author_id, note.slug) in keys
+        )
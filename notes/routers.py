@@ -0,0 +1,190 @@
+"""
+Чтение страниц заметок с реплик, запись — в основную базу.
+
+Реплики перечислены в NOTES_REPLICAS (см. yanote/settings.py).
+GET и HEAD маршрутов из REPLICA_ROUTES читают с исправной реплики,
+остальное идёт в основную базу default. ReplicaMiddleware заводит для
+запроса Route в contextvars, так что ReplicaRouter видит его во всех
+запросах ORM, в том числе в потоках асинхронных представлений.
+
+Читать свои записи: ответ на запрос, который писал в базу (INSERT,
+UPDATE или DELETE в default, их отмечает mark_writes), ставит
+cookie NOTES_REPLICA_STICKY_COOKIE на NOTES_REPLICA_STICKY_SECONDS,
+и пока она есть, клиент читает из основной базы. Время должно быть
+больше допустимого отставания реплики NOTES_REPLICA_MAX_LAG вместе
+с интервалом проверки: реплику, которая отстала сильнее, проверка
+здоровья исключает.
+
+Проверка здоровья — функция NOTES_REPLICA_LAG(alias), которая
+возвращает отставание реплики в секундах. Результат кешируется
+в процессе на NOTES_REPLICA_CHECK_INTERVAL секунд; реплика, на которой
+проверка упала с ошибкой базы, считается неисправной.
+"""
+import contextvars
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .middleware import ContextMiddleware
+from .models import AuthorNotesVersion
+
+logger = logging.getLogger(__name__)
+
+# Страницы, которые можно показать по данным реплики.
+REPLICA_ROUTES = frozenset({'notes:home', 'notes:list', 'notes:detail'})
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+current = contextvars.ContextVar('notes_db_route', default=None)
+
+# Псевдоним реплики -> (время проверки по time.monotonic, исправна ли).
+_health = {}
+
+
+def notes_version_lag(alias):
+    """
+    Отставание реплики по последнему изменению заметок.
+
+    Счётчик AuthorNotesVersion меняется вместе с каждым изменением
+    заметок. Если в основной базе есть изменение новее последнего
+    на реплике, реплика не видит всего, что сделано после своего
+    последнего изменения, — отставание считается от него.
+    """
+    def latest(using):
+        return AuthorNotesVersion.objects.using(using).aggregate(
+            latest=Max('updated_at')
+        )['latest']
+
+    primary = latest(DEFAULT_DB_ALIAS)
+    if primary is None:
+        return 0
+    replica = latest(alias)
+    if replica is None:
+        return float('inf')
+    if replica >= primary:
+        return 0
+    return max(0, (timezone.now() - replica).total_seconds())
+
+
+def is_healthy(alias):
+    now = time.monotonic()
+    checked_at, healthy = _health.get(alias, (None, False))
+    if (checked_at is not None
+            and now - checked_at < settings.NOTES_REPLICA_CHECK_INTERVAL):
+        return healthy
+    try:
+        lag = import_string(settings.NOTES_REPLICA_LAG)(alias)
+    except DatabaseError:
+        logger.warning('Реплика %s недоступна.', alias, exc_info=True)
+        healthy = False
+    else:
+        healthy = lag <= settings.NOTES_REPLICA_MAX_LAG
+        if not healthy:
+            logger.warning('Реплика %s отстаёт на %s с.', alias, lag)
+    _health[alias] = (now, healthy)
+    return healthy
+
+
+def choose_replica():
+    """Случайная исправная реплика или None, если таких нет."""
+    replicas = [
+        alias for alias in settings.NOTES_REPLICAS if is_healthy(alias)
+    ]
+    return random.choice(replicas) if replicas else None
+
+
+class Route:
+    """База для чтения в запросе request и были ли в нём записи."""
+
+    def __init__(self, request):
+        self.request = request
+        self.wrote = False
+        self.decided = False
+        self.replica = None
+
+    def read_alias(self):
+        if not self.decided:
+            match = self.request.resolver_match
+            if match is None:
+                # Маршрут ещё не найден: читают middleware до представления.
+                return DEFAULT_DB_ALIAS
+            request = self.request
+            if (request.method in SAFE_METHODS
+                    and match.view_name in REPLICA_ROUTES
+                    and settings.NOTES_REPLICA_STICKY_COOKIE
+                    not in request.COOKIES):
+                self.replica = choose_replica()
+            self.decided = True
+        return self.replica or DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    """Направляет чтение в базу, выбранную для текущего запроса."""
+
+    def db_for_read(self, model, **hints):
+        route = current.get()
+        if route is None:
+            return DEFAULT_DB_ALIAS
+        return route.read_alias()
+
+    def db_for_write(self, model, **hints):
+        # Записью запрос не считается: get_or_create тоже спрашивает
+        # db_for_write, даже когда только читает. См. mark_writes.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На всех базах одни и те же данные.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схему реплики получают вместе с данными основной базы.
+        return db not in settings.NOTES_REPLICAS
+
+
+def mark_writes(execute, sql, params, many, context):
+    """execute_wrapper основной базы: отмечает запись в текущем запросе."""
+    route = current.get()
+    if route is not None and not route.wrote:
+        route.wrote = sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS)
+    return execute(sql, params, many, context)
+
+
+class ReplicaMiddleware(ContextMiddleware):
+    """
+    Заводит Route для запроса и ставит cookie после записи, см. модуль.
+
+    Стоит до SessionMiddleware, чтобы сохранение сессии тоже считалось
+    записью.
+    """
+    context = current
+
+    def __init__(self, get_response):
+        if not settings.NOTES_REPLICAS:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def enter(self, request):
+        return Route(request)
+
+    def leave(self, request, response, route):
+        return self.stick(route, response)
+
+    def stick(self, route, response):
+        """После записи клиент какое-то время читает основную базу."""
+        if route.wrote:
+            response.set_cookie(
+                settings.NOTES_REPLICA_STICKY_COOKIE, '1',
+                max_age=settings.NOTES_REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,87 @@
+"""Полнотекстовый поиск по заметкам автора.
+
+Бэкенд выбирается настройкой ``NOTES_SEARCH_BACKEND`` (путь к классу)
+или по СУБД: FTS5 для SQLite, tsvector для PostgreSQL, поиск подстрокой
+для остальных. Индекс поддерживается триггерами в самой базе, поэтому
+в него попадают и заметки, созданные через ``bulk_create`` при импорте.
+
+Исключение — заметки со сжатым в SQLite текстом (notes/fields.py):
+их индексирует приложение. Сигналы notes.signals делают это при
+сохранении и удалении, а код, который пишет заметки пачками, вызывает
+index_compressed() и forget_compressed() сам.
+"""
+from django.conf import settings
+from django.db import connections, router
+from django.utils.module_loading import import_string
+
+BACKENDS = {
+    'sqlite': 'notes.search.sqlite.SQLiteSearchBackend',
+    'postgresql': 'notes.search.postgres.PostgresSearchBackend',
+}
+DEFAULT_BACKEND = 'notes.search.simple.SimpleSearchBackend'
+
+
+def get_backend(using=None):
+    from notes.models import Note
+
+    using = using or router.db_for_read(Note)
+    path = getattr(settings, 'NOTES_SEARCH_BACKEND', None) or BACKENDS.get(
+        connections[using].vendor, DEFAULT_BACKEND
+    )
+    return import_string(path)(using)
+
+
+def search(author_id, query, limit, using=None):
+    """Id заметок автора, подходящих под запрос, от лучших к худшим."""
+    return get_backend(using).search(author_id, query, limit)
+
+
+def install(using):
+    """Создаёт поисковый индекс в базе using, если он ещё не создан."""
+    connection = connections[using]
+    if 'notes_note' not in connection.introspection.table_names():
+        return
+    vendor = connection.vendor
+    if vendor == 'sqlite':
+        from .sqlite import ensure_schema
+        ensure_schema(using)
+    elif vendor == 'postgresql':
+        from .postgres import install
+        install(using)
+
+
+def uninstall(using):
+    vendor = connections[using].vendor
+    if vendor == 'sqlite':
+        from .sqlite import drop_schema
+        drop_schema(using)
+    elif vendor == 'postgresql':
+        from .postgres import uninstall
+        uninstall(using)
+
+
+def compressed_entries(using, where, params=()):
+    """
+    Записи индекса заметок со сжатым текстом по условию SQL where.
+
+    Снимаются до изменения или удаления заметок и передаются потом
+    в forget_compressed(): contentless-индекс удаляет запись только
+    по прежним значениям колонок.
+    """
+    if connections[using].vendor != 'sqlite':
+        return []
+    from .sqlite import compressed_rows
+    return compressed_rows(using, where, params)
+
+
+def forget_compressed(using, entries):
+    if entries:
+        from .sqlite import delete_rows
+        delete_rows(using, entries)
+
+
+def index_compressed(using, where, params=()):
+    """Добавляет в индекс заметки со сжатым текстом по условию where."""
+    if connections[using].vendor == 'sqlite':
+        from .sqlite import add_rows, compressed_rows
+        add_rows(using, compressed_rows(using, where, params))
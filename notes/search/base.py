@@ -0,0 +1,84 @@
+"""Общий интерфейс поисковых бэкендов и разбор поискового запроса."""
+import re
+
+from pytils.translit import detranslify, translify
+
+WORD = re.compile(r'\w+')
+NOT_WORD = re.compile(r'\W')
+CYRILLIC = re.compile('[а-я]')
+# Наиболее частые окончания русских слов, от длинных к коротким.
+ENDINGS = (
+    'иями', 'ями', 'ами', 'иях', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'ях', 'ах', 'ых', 'их', 'ой', 'ей', 'ий', 'ый', 'ая', 'яя', 'ое', 'ее',
+    'ые', 'ие', 'ую', 'юю', 'ом', 'ем', 'ам', 'ям', 'ов', 'ев', 'ия', 'ью',
+    'ы', 'и', 'а', 'я', 'о', 'е', 'у', 'ю', 'ь', 'й',
+)
+MIN_STEM = 3
+MIN_WORD = 2
+MAX_TERMS = 8
+
+
+def fold(text):
+    """Приводит текст к виду, в котором он лежит в индексе."""
+    return text.lower().replace('ё', 'е')
+
+
+def stem(word):
+    """
+    Лёгкий стеммер: отрезает окончание, чтобы искать по префиксу.
+
+    Полноценная морфология не нужна: запрос «заметки» превращается
+    в префикс «заметк», который совпадает и с «заметка», и с «заметку».
+    """
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def parse_query(query):
+    """
+    Разбивает запрос на термы с вариантами написания.
+
+    Каждый терм — кортеж префиксов, из которых достаточно совпадения
+    хотя бы одного: основа слова и её транслитерация (латиницей для
+    кириллицы и наоборот), чтобы «zametka» находило «заметку».
+    """
+    terms = []
+    words = [
+        word for word in WORD.findall(fold(query)) if len(word) >= MIN_WORD
+    ]
+    for word in words[:MAX_TERMS]:
+        variants = [stem(word)]
+        try:
+            if CYRILLIC.search(word):
+                variants.append(translify(variants[0], strict=False))
+            else:
+                variants.append(stem(fold(detranslify(word))))
+        except ValueError:
+            pass
+        variants = (NOT_WORD.sub('', variant).lower() for variant in variants)
+        terms.append(tuple(dict.fromkeys(filter(None, variants))))
+    return [term for term in terms if term]
+
+
+class SearchBackend:
+    """
+    Поиск по заметкам одного автора.
+
+    Бэкенд возвращает id найденных заметок, отсортированные
+    по убыванию релевантности; загрузку самих заметок делает вызывающий
+    код, чтобы выбрать только нужные ему поля.
+    """
+
+    def __init__(self, using):
+        self.using = using
+
+    def search(self, author_id, query, limit):
+        terms = parse_query(query)
+        if not terms:
+            return []
+        return self.search_terms(author_id, terms, limit)
+
+    def search_terms(self, author_id, terms, limit):
+        raise NotImplementedError
@@ -0,0 +1,59 @@
+"""Полнотекстовый поиск на PostgreSQL tsvector."""
+from django.db import connections
+
+from .base import SearchBackend
+
+INDEX = 'notes_note_search_idx'
+CONFIG = 'russian'
+# Одно и то же выражение в индексе и в запросе, иначе индекс
+# не будет использован. Заголовок получает вес A, текст — B.
+DOCUMENT = (
+    f"setweight(to_tsvector('{CONFIG}', "
+    "replace(coalesce(title, ''), 'ё', 'е')), 'A') || "
+    f"setweight(to_tsvector('{CONFIG}', "
+    "replace(coalesce(text, ''), 'ё', 'е')), 'B')"
+)
+
+
+def install(using):
+    """
+    GIN-индекс по (author_id, документ).
+
+    btree_gin позволяет держать автора в том же индексе, так что поиск
+    не читает списки совпадений других пользователей.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS btree_gin')
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {INDEX} ON notes_note '
+            f'USING gin (author_id, ({DOCUMENT}))'
+        )
+
+
+def uninstall(using):
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DROP INDEX IF EXISTS {INDEX}')
+
+
+def tsquery(terms):
+    """Термы через «и», варианты написания — префиксы через «или»."""
+    return ' & '.join(
+        '(' + ' | '.join(f'{variant}:*' for variant in term) + ')'
+        for term in terms
+    )
+
+
+class PostgresSearchBackend(SearchBackend):
+    """Поиск по GIN-индексу со словарём и стеммером russian."""
+
+    def search_terms(self, author_id, terms, limit):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f'SELECT id FROM notes_note WHERE author_id = %s '
+                f"AND ({DOCUMENT}) @@ to_tsquery('{CONFIG}', %s) "
+                f"ORDER BY ts_rank({DOCUMENT}, "
+                f"to_tsquery('{CONFIG}', %s)) DESC, id "
+                'LIMIT %s',
+                (author_id, tsquery(terms), tsquery(terms), limit),
+            )
+            return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,40 @@
+"""Поиск без полнотекстового индекса для остальных СУБД."""
+from django.db.models import Q
+
+from .base import SearchBackend
+
+
+class SimpleSearchBackend(SearchBackend):
+    """
+    Поиск подстрокой через icontains.
+
+    Индекса нет, но фильтр по автору идёт по составному индексу
+    (author_id, id), поэтому просматриваются только заметки автора.
+    Заметки, где совпал заголовок, идут первыми.
+    """
+
+    def search_terms(self, author_id, terms, limit):
+        from notes.models import Note
+
+        condition = Q()
+        in_title = Q()
+        for term in terms:
+            condition &= Q(*(
+                Q(title__icontains=variant) | Q(text__icontains=variant)
+                for variant in term
+            ), _connector=Q.OR)
+            in_title &= Q(*(
+                Q(title__icontains=variant) for variant in term
+            ), _connector=Q.OR)
+        notes = Note.objects.using(self.using).filter(
+            condition, author_id=author_id
+        )
+        title_hits = list(
+            notes.filter(in_title).order_by('-id')
+            .values_list('id', flat=True)[:limit]
+        )
+        rest = list(
+            notes.exclude(id__in=title_hits).order_by('-id')
+            .values_list('id', flat=True)[:limit - len(title_hits)]
+        ) if len(title_hits) < limit else []
+        return title_hits + rest
@@ -0,0 +1,220 @@
+"""Полнотекстовый поиск на SQLite FTS5."""
+import sqlite3
+
+from django.db import connections
+
+from notes.fields import decompress_text
+
+from .base import MIN_STEM, SearchBackend
+
+TABLE = 'notes_note_fts'
+# Автор хранится отдельной колонкой с токеном вида «a42». Вместе
+# с префиксными индексами это позволяет FTS5 идти по короткому списку
+# документов автора и сдвигаться по спискам остальных термов, не читая
+# заметки других пользователей.
+AUTHOR_TOKEN = "'a' || {row}.author_id"
+# В индекс попадает текст с «ё», заменённой на «е», как и в запросе.
+FOLDED = "replace(replace({value}, 'ё', 'е'), 'Ё', 'Е')"
+# Большой текст заметки хранится сжатым (notes/fields.py). Распаковать
+# его в триггере можно только функцией, зарегистрированной в Django,
+# и тогда в notes_note не смогли бы писать ни dbshell, ни скрипты
+# обслуживания. Поэтому триггеры индексируют заметки с текстом-строкой,
+# а сжатые добавляет и удаляет приложение (notes.search).
+PLAIN = "typeof({row}.text) = 'text'"
+# Длины префиксов, для которых FTS5 строит отдельные индексы: от
+# MIN_STEM, самой короткой основы слова из parse_query, до MAX_PREFIX.
+# Каждый индекс замедляет запись заметок, а префикс без индекса FTS5
+# ищет, объединяя списки документов всех слов с этим началом по всей
+# таблице. Поэтому терм длиннее MAX_PREFIX обрезается (заодно «zametki»,
+# которую стеммер не укорачивает, находит «zametka»), а слова короче
+# MIN_STEM ищутся целиком.
+MAX_PREFIX = 6
+PREFIXES = tuple(range(MIN_STEM, MAX_PREFIX + 1))
+
+
+def indexed_values(row):
+    return ', '.join((
+        f'{row}.id',
+        AUTHOR_TOKEN.format(row=row),
+        FOLDED.format(value=f'{row}.title'),
+        FOLDED.format(value=f'{row}.text'),
+    ))
+
+
+def fold(value):
+    """То же, что FOLDED, для значений, которые индексирует приложение."""
+    return value.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def schema_statements():
+    """
+    Виртуальная таблица и триггеры, синхронизирующие её с notes_note.
+
+    Таблица contentless: текст заметки не дублируется, а для удаления
+    из индекса триггер передаёт старые значения колонок. Триггеры,
+    в отличие от сигналов, срабатывают и при bulk_create. Заметки
+    со сжатым текстом триггеры пропускают.
+    """
+    prefix = ' '.join(map(str, PREFIXES))
+    insert = (
+        f'INSERT INTO {TABLE}(rowid, author, title, text) '
+        f"SELECT {indexed_values('new')} WHERE {PLAIN.format(row='new')};"
+    )
+    delete = (
+        f'INSERT INTO {TABLE}({TABLE}, rowid, author, title, text) '
+        f"SELECT 'delete', {indexed_values('old')} "
+        f"WHERE {PLAIN.format(row='old')};"
+    )
+    return (
+        f'CREATE VIRTUAL TABLE {TABLE} USING fts5('
+        "author, title, text, content='', "
+        f"prefix='{prefix}', tokenize='unicode61 remove_diacritics 2')",
+        f'CREATE TRIGGER {TABLE}_ai AFTER INSERT ON notes_note '
+        f'BEGIN {insert} END',
+        f'CREATE TRIGGER {TABLE}_ad AFTER DELETE ON notes_note '
+        f'BEGIN {delete} END',
+        f'CREATE TRIGGER {TABLE}_au '
+        'AFTER UPDATE OF title, text, author_id ON notes_note '
+        f'BEGIN {delete} {insert} END',
+    )
+
+
+def schema_is_current(cursor):
+    """
+    Совпадает ли схема в базе с schema_statements().
+
+    SQLite хранит в sqlite_master исходный текст CREATE, поэтому
+    сравнение ловит и пропавшие триггеры, и изменившееся определение.
+    """
+    cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+        (TABLE, f'{TABLE}_ai', f'{TABLE}_ad', f'{TABLE}_au'),
+    )
+    return {row[0] for row in cursor.fetchall()} == set(schema_statements())
+
+
+def ensure_schema(using):
+    """
+    Приводит индекс и триггеры к актуальной схеме и переиндексирует.
+
+    Django пересоздаёт таблицу SQLite при многих изменениях схемы,
+    и триггеры при этом пропадают, поэтому проверка выполняется после
+    каждой миграции, а не только в той, что добавила поиск.
+    """
+    with connections[using].cursor() as cursor:
+        if schema_is_current(cursor):
+            return
+    drop_schema(using)
+    with connections[using].cursor() as cursor:
+        for statement in schema_statements():
+            cursor.execute(statement)
+        cursor.execute(
+            f'INSERT INTO {TABLE}(rowid, author, title, text) '
+            f"SELECT {indexed_values('notes_note')} FROM notes_note "
+            f"WHERE {PLAIN.format(row='notes_note')}"
+        )
+    add_rows(using, compressed_rows(using))
+
+
+def drop_schema(using):
+    with connections[using].cursor() as cursor:
+        for suffix in ('_ai', '_ad', '_au'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {TABLE}{suffix}')
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+def compressed_rows(using, where='1', params=()):
+    """
+    Заметки со сжатым текстом, подходящие под условие SQL where.
+
+    Значения колонок индекса для них: текст уже распакован.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'SELECT id, author_id, title, text FROM notes_note '
+            f"WHERE typeof(text) = 'blob' AND ({where})",
+            params,
+        )
+        return [
+            (note_id, f'a{author_id}', fold(title),
+             fold(decompress_text(text)))
+            for note_id, author_id, title, text in cursor.fetchall()
+        ]
+
+
+def add_rows(using, rows):
+    if rows:
+        with connections[using].cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {TABLE}(rowid, author, title, text) '
+                'VALUES (%s, %s, %s, %s)',
+                rows,
+            )
+
+
+def delete_rows(using, rows):
+    """Удаляет из индекса записи, полученные от compressed_rows()."""
+    if rows:
+        with connections[using].cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {TABLE}({TABLE}, rowid, author, title, text) '
+                "VALUES ('delete', %s, %s, %s, %s)",
+                rows,
+            )
+
+
+def preload_index(connection):
+    """
+    Подключает виртуальную таблицу сразу после открытия соединения.
+
+    При первом обращении FTS5 читает свои служебные таблицы. Если это
+    происходит внутри транзакции при вставке заметки, соединение уже
+    держит блокировку на чтение и не может получить блокировку
+    на запись, пока пишут другие: SQLite сразу отвечает «database is
+    locked», не дожидаясь timeout. Чтение вне транзакции снимает эту
+    взаимоблокировку.
+    """
+    try:
+        connection.connection.execute(f'SELECT 1 FROM {TABLE} LIMIT 0')
+    except sqlite3.OperationalError:
+        # Миграции ещё не применены.
+        pass
+
+
+def match_expression(author_id, terms, column=None):
+    """Запрос FTS5: токен автора И каждый терм в одном из вариантов."""
+    scope = f'{column} : ' if column else ''
+    groups = []
+    for term in terms:
+        queries = dict.fromkeys(
+            f'"{variant[:MAX_PREFIX]}"*' if len(variant) >= MIN_STEM
+            else f'"{variant}"'
+            for variant in term
+        )
+        groups.append(scope + '(' + ' OR '.join(queries) + ')')
+    return ' AND '.join([f'author : a{int(author_id)}', *groups])
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """
+    Поиск по виртуальной таблице FTS5.
+
+    Сначала идут заметки, в заголовке которых есть все слова запроса,
+    затем остальные; внутри группы — более новые. bm25 здесь не подходит:
+    для IDF он читает списки документов термов по всей таблице, то есть
+    заметки всех пользователей, и на миллионе заметок это десятки мс.
+    """
+
+    def search_terms(self, author_id, terms, limit):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s '
+                f'ORDER BY rowid IN (SELECT rowid FROM {TABLE} '
+                f'WHERE {TABLE} MATCH %s) DESC, rowid DESC LIMIT %s',
+                (
+                    match_expression(author_id, terms),
+                    match_expression(author_id, terms, column='title'),
+                    limit,
+                ),
+            )
+            return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,83 @@
+"""Хранилища сессий, которые загружают пользователя вместе с сессией.
+
+Режим выбирается в настройках (``YANOTE_SESSION_MODE``):
+
+* ``db`` — сессии в таблице notes_usersession со ссылкой на пользователя.
+  Сессия и пользователь читаются одним запросом с JOIN;
+* ``cached_db`` — то же, но сессия сначала ищется в кеше
+  ``SESSION_CACHE_ALIAS``, а пользователь — в кеше CachedModelBackend:
+  при попадании в оба кеша запросов к базе нет;
+* ``signed_cookies`` — сессия целиком в подписанной cookie, пользователь
+  из кеша CachedModelBackend.
+
+Пользователя из сессии отдаёт get_user, которую вызывает
+notes.middleware.AuthenticationMiddleware.
+"""
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.backends import ModelBackend
+from django.utils.crypto import constant_time_compare
+
+from notes.cache import invalidate_user_cache
+
+
+def get_user(request):
+    """
+    Пользователь запроса без лишних запросов к базе.
+
+    Пользователь берётся загруженным вместе с сессией, а если сессия
+    пришла из кеша или cookie — у бэкенда (CachedModelBackend отдаёт
+    его из кеша процесса). Проверки те же, что в
+    django.contrib.auth.get_user: бэкенд из AUTHENTICATION_BACKENDS,
+    активный пользователь и хеш пароля в сессии. Если хотя бы одна
+    не проходит, решение остаётся за django.contrib.auth.get_user.
+    """
+    session = request.session
+    # Обращение к ключу загружает сессию, а с ней и пользователя.
+    user_id = session.get(auth.SESSION_KEY)
+    backend_path = session.get(auth.BACKEND_SESSION_KEY)
+    if (user_id is None
+            or backend_path not in settings.AUTHENTICATION_BACKENDS):
+        return auth.get_user(request)
+    backend = auth.load_backend(backend_path)
+    if not isinstance(backend, ModelBackend):
+        return auth.get_user(request)
+    user = getattr(session, 'user', None)
+    if user is None or user_id != user._meta.pk.value_to_string(user):
+        user = backend.get_user(user_id)
+    if user is None or not backend.user_can_authenticate(user):
+        return auth.get_user(request)
+    session_hash = session.get(auth.HASH_SESSION_KEY)
+    if session_hash and constant_time_compare(
+            session_hash, user.get_session_auth_hash()):
+        return user
+    # Пароль сменился: либо в кеше устаревший пользователь, либо
+    # устарела сессия. Пользователя перечитывает из базы, а сессию
+    # сбрасывает или принимает django.contrib.auth.get_user.
+    invalidate_user_cache(user.pk)
+    return auth.get_user(request)
+
+
+class UserSessionMixin:
+    """Сессия в notes.UserSession: пользователь читается вместе с ней."""
+
+    # Пользователь, загруженный вместе с сессией из базы.
+    user = None
+
+    @classmethod
+    def get_model_class(cls):
+        from notes.models import UserSession
+        return UserSession
+
+    def _get_session_from_db(self):
+        session = super()._get_session_from_db()
+        self.user = session.user if session else None
+        return session
+
+    def create_model_instance(self, data):
+        session = super().create_model_instance(data)
+        user_id = data.get(auth.SESSION_KEY)
+        session.user_id = None if user_id is None else (
+            session._meta.get_field('user').target_field.to_python(user_id)
+        )
+        return session
@@ -0,0 +1,42 @@
+"""
+Сессии в базе с кешем перед ней.
+
+Кеш по умолчанию локальный для процесса (CACHES['sessions']), поэтому
+выход или сброс сессии в одном процессе другие увидят только после
+NOTES_SESSION_CACHE_TTL секунд: дольше сессия в кеше не хранится.
+Для нескольких процессов без такой задержки нужен общий кеш,
+например Memcached или Redis, в CACHES['sessions'].
+"""
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+
+from . import UserSessionMixin
+
+
+class BoundedCache:
+    """Кеш, в котором записи живут не дольше ttl секунд."""
+
+    def __init__(self, cache, ttl):
+        self.cache = cache
+        self.ttl = ttl
+
+    def set(self, key, value, timeout=None):
+        if timeout is None or timeout > self.ttl:
+            timeout = self.ttl
+        self.cache.set(key, value, timeout)
+
+    def __contains__(self, key):
+        return key in self.cache
+
+    def __getattr__(self, name):
+        return getattr(self.cache, name)
+
+
+class SessionStore(UserSessionMixin, cached_db.SessionStore):
+    cache_key_prefix = 'notes.sessions.cached_db'
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._cache = BoundedCache(
+            self._cache, settings.NOTES_SESSION_CACHE_TTL
+        )
@@ -0,0 +1,8 @@
+"""Сессии в базе: сессия и пользователь читаются одним запросом."""
+from django.contrib.sessions.backends import db
+
+from . import UserSessionMixin
+
+
+class SessionStore(UserSessionMixin, db.SessionStore):
+    pass
@@ -0,0 +1,395 @@
+"""
+Заметки авторов по шардам — базам из NOTES_SHARDS.
+
+Заметки, их версии, метки и папки автора лежат в одном шарде, поэтому
+связи между ними не выходят за базу. Пользователи, счётчики изменений,
+очередь задач и справочник AuthorShard остаются в основной базе default,
+которая сама — первый шард. Схема во всех шардах полная (manage.py
+migrate --database ...), а внешний ключ на автора объявлен без
+ограничения в базе: пользователей в других шардах нет.
+
+Базу для запроса выбирает ShardRouter:
+
+* объект, загруженный из базы, остаётся в своей базе;
+* новый объект и связанные объекты пользователя (user.tags) — в шарде
+  автора по справочнику;
+* запрос без объекта, например Note.objects.filter(author=user), —
+  в шарде автора из AuthorScope: его заводит ShardMiddleware для
+  текущего пользователя, а в командах и задачах — for_author().
+
+Без автора запросы идут в основную базу: так, админка видит заметки
+только тех авторов, что лежат в default. QuerySet.create() не передаёт
+роутеру объект, поэтому вне for_author() заметку создают через save().
+
+Перенос автора в другой шард (move_author, manage.py rebalance_shards)
+держит блокировку записи исходного шарда, пока копирует данные
+и переключает справочник, и записи автора в это время ждут. Запрос,
+который выбрал старый шард до переключения, а записал после, получает
+AuthorMoved и откатывается, а ShardMiddleware отвечает 503.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, F, Max
+from django.http import HttpResponse
+
+from .cache import invalidate_author_cache
+from .middleware import ContextMiddleware
+from .models import (
+    AuthorNotesVersion, AuthorShard, Folder, Note, NoteRevision, NoteTag,
+    Tag, Task
+)
+from .search import compressed_entries, forget_compressed, index_compressed
+
+SHARDED_MODELS = frozenset({
+    'notes.note', 'notes.noterevision', 'notes.notetag', 'notes.tag',
+    'notes.folder',
+})
+
+# Сколько заметок и версий копируется одним запросом при переносе.
+COPY_BATCH_SIZE = 500
+
+current = contextvars.ContextVar('notes_author_scope', default=None)
+
+
+class AuthorMoved(Exception):
+    """Автора перенесли в другой шард, пока запрос писал в старый."""
+
+
+class ShardError(Exception):
+    """Автора нельзя перенести сейчас."""
+
+
+def shard_for(author_id):
+    """Шард автора по справочнику AuthorShard, без строки — default."""
+    if author_id is None or not settings.NOTES_SHARDS:
+        return DEFAULT_DB_ALIAS
+    # Справочник читается только из основной базы: реплика может
+    # не знать о последнем переносе.
+    alias = AuthorShard.objects.using(DEFAULT_DB_ALIAS).filter(
+        author_id=author_id
+    ).values_list('alias', flat=True).first()
+    return alias or DEFAULT_DB_ALIAS
+
+
+def place_author(author_id):
+    """Шард для заметок нового автора."""
+    shards = settings.NOTES_SHARDS
+    return shards[author_id % len(shards)]
+
+
+def home_db(using):
+    """База пользователей, счётчиков и очереди для базы заметок using."""
+    return DEFAULT_DB_ALIAS if using in settings.NOTES_SHARDS else using
+
+
+class AuthorScope:
+    """Автор, чьи заметки читает код без объекта, и кеш шардов авторов."""
+
+    def __init__(self, get_author_id):
+        self.get_author_id = get_author_id
+        self.shards = {}
+
+    def shard(self, author_id=None):
+        if author_id is None:
+            author_id = self.get_author_id()
+        if author_id not in self.shards:
+            self.shards[author_id] = shard_for(author_id)
+        return self.shards[author_id]
+
+
+@contextmanager
+def for_author(author_id):
+    """Направляет запросы к заметкам без объекта в шард автора."""
+    token = current.set(AuthorScope(lambda: author_id))
+    try:
+        yield
+    finally:
+        current.reset(token)
+
+
+def author_shard(author_id):
+    scope = current.get()
+    if scope is not None:
+        return scope.shard(author_id)
+    return shard_for(author_id)
+
+
+def check_author_shard(author_id, using):
+    """
+    Не даёт записи попасть в шард, из которого автора уже перенесли.
+
+    Вызывается после записи в транзакции шарда: перенос к этому моменту
+    либо ещё не начался и будет ждать транзакцию, либо уже закончился
+    и виден в справочнике.
+    """
+    if using in settings.NOTES_SHARDS and shard_for(author_id) != using:
+        raise AuthorMoved(f'Заметки автора {author_id} перенесены.')
+
+
+class ShardRouter:
+    """Направляет заметки и связанные с ними данные в шард автора."""
+
+    def db_for_read(self, model, **hints):
+        return self.shard(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self.shard(model, hints)
+
+    def shard(self, model, hints):
+        if (not settings.NOTES_SHARDS
+                or model._meta.label_lower not in SHARDED_MODELS):
+            return None
+        instance = hints.get('instance')
+        if isinstance(instance, get_user_model()):
+            return author_shard(instance.pk)
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        author_id = getattr(instance, 'author_id', None)
+        if author_id is not None:
+            return author_shard(author_id)
+        scope = current.get()
+        if scope is not None:
+            return scope.shard()
+        return None
+
+
+class ShardMiddleware(ContextMiddleware):
+    """Заводит AuthorScope текущего пользователя, см. модуль."""
+    context = current
+
+    def __init__(self, get_response):
+        if not settings.NOTES_SHARDS:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def enter(self, request):
+        # Пользователя ещё нет: его найдёт AuthenticationMiddleware или
+        # токен API, а шард нужен только первому запросу к заметкам.
+        return AuthorScope(
+            lambda: getattr(getattr(request, 'user', None), 'pk', None)
+        )
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, AuthorMoved):
+            response = HttpResponse(
+                'Заметки переносятся, повторите запрос.', status=503
+            )
+            response['Retry-After'] = '1'
+            return response
+        return None
+
+
+def clear_author(author_id, using):
+    """
+    Удаляет данные автора из шарда using без сигналов.
+
+    Данные либо переехали в другой шард, либо удаляются вместе
+    с автором: счётчики, кеш и метки трогать не нужно. Поисковый индекс
+    чистят триггеры в самой базе, кроме записей сжатых заметок.
+    """
+    forget_compressed(
+        using, compressed_entries(using, 'author_id = %s', [author_id])
+    )
+    NoteRevision.objects.using(using).filter(
+        note__author_id=author_id
+    ).delete()
+    NoteTag.objects.using(using).filter(note__author_id=author_id).delete()
+    Note.objects.using(using).filter(author_id=author_id)._raw_delete(using)
+    Tag.objects.using(using).filter(author_id=author_id).delete()
+    Folder.objects.using(using).filter(author_id=author_id).delete()
+
+
+def first_id(model, using):
+    return (
+        model._base_manager.using(using).aggregate(last=Max('pk'))['last']
+        or 0
+    ) + 1
+
+
+def batches(queryset, size=COPY_BATCH_SIZE):
+    batch = []
+    for item in queryset.iterator(chunk_size=size):
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def copy_author(author_id, source, target):
+    """
+    Копирует данные автора из source в target, возвращает число заметок.
+
+    id в шардах независимы, поэтому в target у объектов новые id, и связи
+    переводятся на них. Вызывается в транзакции target после записи
+    в него: новые id выделяются по максимальному, и параллельная вставка
+    ждёт конца транзакции.
+    """
+    folders = list(
+        Folder.objects.using(source).filter(author_id=author_id)
+        .order_by('path')
+    )
+    # По path родители идут раньше вложенных папок.
+    start = first_id(Folder, target)
+    folder_ids = {
+        folder.pk: start + index for index, folder in enumerate(folders)
+    }
+    Folder.objects.using(target).bulk_create(
+        Folder(
+            id=folder_ids[folder.pk], author_id=author_id,
+            parent_id=folder_ids.get(folder.parent_id), name=folder.name,
+            path=''.join(
+                f'{folder_ids[int(part)]}/'
+                for part in folder.path.split('/')[:-1]
+            ),
+        )
+        for folder in folders
+    )
+    tags = list(Tag.objects.using(source).filter(author_id=author_id))
+    start = first_id(Tag, target)
+    tag_ids = {tag.pk: start + index for index, tag in enumerate(tags)}
+    Tag.objects.using(target).bulk_create(
+        Tag(
+            id=tag_ids[tag.pk], author_id=author_id, name=tag.name,
+            slug=tag.slug, note_count=tag.note_count,
+        )
+        for tag in tags
+    )
+    note_ids = {}
+    next_id = first_id(Note, target)
+    notes = Note.objects.using(source).filter(author_id=author_id)
+    for batch in batches(notes.order_by('id')):
+        copies = []
+        for note in batch:
+            note_ids[note.pk] = next_id
+            copies.append(Note(
+                id=next_id, author_id=author_id, title=note.title,
+                text=note.text, slug=note.slug,
+                folder_id=folder_ids.get(note.folder_id),
+                updated_at=note.updated_at,
+            ))
+            next_id += 1
+        Note.objects.using(target).bulk_create(copies)
+        # bulk_create ставит updated_at (auto_now) в текущее время
+        # и в базе, и в объектах: возвращаем время из исходного шарда.
+        for note, copy in zip(batch, copies):
+            copy.updated_at = note.updated_at
+        Note.objects.using(target).bulk_update(copies, ('updated_at',))
+    index_compressed(target, 'author_id = %s', [author_id])
+    NoteTag.objects.using(target).bulk_create(
+        (
+            NoteTag(note_id=note_ids[note_id], tag_id=tag_ids[tag_id])
+            for note_id, tag_id in NoteTag.objects.using(source)
+            .filter(note__author_id=author_id)
+            .values_list('note_id', 'tag_id').iterator()
+        ),
+        batch_size=COPY_BATCH_SIZE,
+    )
+    revisions = NoteRevision.objects.using(source).filter(
+        note__author_id=author_id
+    )
+    for batch in batches(revisions.order_by('id')):
+        NoteRevision.objects.using(target).bulk_create(
+            NoteRevision(
+                note_id=note_ids[revision.note_id], number=revision.number,
+                title=revision.title, is_snapshot=revision.is_snapshot,
+                data=revision.data, created_at=revision.created_at,
+            )
+            for revision in batch
+        )
+    return len(note_ids)
+
+
+def move_author(author_id, target):
+    """
+    Переносит заметки автора в шард target, возвращает их число.
+
+    Задачи очереди ссылаются на заметки по id, которые при переносе
+    меняются, поэтому автора с невыполненными задачами не переносим.
+    """
+    if target not in settings.NOTES_SHARDS:
+        raise ShardError(f'Неизвестный шард {target}.')
+    source = shard_for(author_id)
+    if source == target:
+        return 0
+    if Task.objects.filter(payload__author=author_id, failed=False).exists():
+        raise ShardError('У автора есть невыполненные задачи очереди.')
+    with transaction.atomic(using=source):
+        # Первая запись берёт блокировку исходного шарда: изменения
+        # автора ждут конца переноса и не теряются при копировании.
+        Note.objects.using(source).filter(author_id=author_id).update(
+            updated_at=F('updated_at')
+        )
+        with transaction.atomic(using=target):
+            # Остатки прерванного переноса.
+            clear_author(author_id, target)
+            count = copy_author(author_id, source, target)
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            AuthorShard.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+                author_id=author_id, defaults={'alias': target}
+            )
+            # У заметок новые id: сохранённые страницы устарели.
+            AuthorNotesVersion.objects.using(DEFAULT_DB_ALIAS).bump(
+                [author_id]
+            )
+        clear_author(author_id, source)
+    invalidate_author_cache(author_id)
+    return count
+
+
+def author_counts():
+    """Число заметок каждого автора по шардам: {шард: {автор: число}}."""
+    directory = dict(
+        AuthorShard.objects.using(DEFAULT_DB_ALIAS)
+        .values_list('author_id', 'alias')
+    )
+    counts = {}
+    for alias in settings.NOTES_SHARDS:
+        rows = (
+            Note.objects.using(alias).order_by().values_list('author_id')
+            .annotate(count=Count('id'))
+        )
+        counts[alias] = {
+            author_id: count for author_id, count in rows
+            # Остатки прерванного переноса не считаем.
+            if directory.get(author_id, DEFAULT_DB_ALIAS) == alias
+        }
+    return counts
+
+
+def plan_rebalance(counts, max_moves=None):
+    """
+    Переносы (автор, откуда, куда), выравнивающие число заметок в шардах.
+
+    Каждый шаг переносит из самого полного шарда в самый пустой автора,
+    после которого разница между ними меньше всего. Перенос count
+    заметок сокращает разницу gap, только если count < gap, поэтому
+    сумма квадратов размеров шардов убывает и план конечен.
+    """
+    authors = {alias: dict(rows) for alias, rows in counts.items()}
+    totals = {alias: sum(rows.values()) for alias, rows in authors.items()}
+    moves = []
+    while len(totals) > 1 and (max_moves is None or len(moves) < max_moves):
+        source = max(totals, key=totals.get)
+        target = min(totals, key=totals.get)
+        gap = totals[source] - totals[target]
+        candidates = [
+            (abs(gap - 2 * count), author_id)
+            for author_id, count in authors[source].items()
+            if 0 < count < gap
+        ]
+        if not candidates:
+            break
+        _, author_id = min(candidates)
+        count = authors[source].pop(author_id)
+        authors[target][author_id] = count
+        totals[source] -= count
+        totals[target] += count
+        moves.append((author_id, source, target))
+    return moves
@@ -0,0 +1,215 @@
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_out
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_migrate, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from .cache import invalidate_author_cache, invalidate_user_cache
+from .catalog import forget_note_tags, update_tag_counts
+from .metrics import record_query
+from .models import AuthorNotesVersion, AuthorShard, Folder, Note
+from .fields import may_be_compressed
+from .revisions import record_later
+from .routers import mark_writes
+from .search import (
+    compressed_entries, forget_compressed, index_compressed,
+    install as install_search
+)
+from .search.sqlite import preload_index
+from .shards import (
+    check_author_shard, clear_author, home_db, place_author, shard_for
+)
+
+
+# Поля, от которых зависит запись заметки в поисковом индексе.
+SEARCH_FIELDS = frozenset(('title', 'text', 'author', 'author_id'))
+
+
+@receiver(post_save, sender=Note)
+@receiver(post_delete, sender=Note)
+def note_changed(sender, instance, using, **kwargs):
+    """
+    Сбрасывает кеш автора и увеличивает счётчик изменений его заметок.
+
+    После фиксации транзакции: иначе чтение между сбросом и фиксацией
+    снова положит в кеш старый список, и он продержится весь таймаут.
+    """
+    author_id = instance.author_id
+
+    def changed():
+        AuthorNotesVersion.objects.using(home_db(using)).bump([author_id])
+        invalidate_author_cache(author_id)
+
+    transaction.on_commit(changed, using=using)
+
+
+def search_fields_changed(update_fields):
+    return update_fields is None or bool(SEARCH_FIELDS & set(update_fields))
+
+
+@receiver(pre_save, sender=Note)
+def note_saving(sender, instance, using, update_fields=None, **kwargs):
+    """Запоминает запись сжатой заметки в поисковом индексе до изменения."""
+    if not instance._state.adding and search_fields_changed(update_fields):
+        instance._search_entries = compressed_entries(
+            using, 'id = %s', [instance.pk]
+        )
+
+
+@receiver(post_save, sender=Note)
+def note_indexed(sender, instance, using, update_fields=None, **kwargs):
+    """
+    Обновляет поисковый индекс сжатой заметки.
+
+    Заметки с текстом-строкой индексируют триггеры в базе, сжатые —
+    этот обработчик (см. notes/search/sqlite.py).
+    """
+    forget_compressed(using, instance.__dict__.pop('_search_entries', ()))
+    # Отложенный текст (only, defer) мог остаться сжатым.
+    text = instance.__dict__.get('text')
+    if search_fields_changed(update_fields) and (
+        'text' not in instance.__dict__ or may_be_compressed(text)
+    ):
+        index_compressed(using, 'id = %s', [instance.pk])
+
+
+@receiver(pre_delete, sender=Note)
+def note_unindexing(sender, instance, using, **kwargs):
+    instance._search_entries = compressed_entries(
+        using, 'id = %s', [instance.pk]
+    )
+
+
+@receiver(post_delete, sender=Note)
+def note_unindexed(sender, instance, using, **kwargs):
+    forget_compressed(using, instance.__dict__.pop('_search_entries', ()))
+
+
+@receiver(post_save, sender=Note)
+@receiver(post_save, sender=Folder)
+def check_shard(sender, instance, using, raw=False, **kwargs):
+    """Откатывает запись в шард, из которого автора перенесли."""
+    if not raw:
+        check_author_shard(instance.author_id, using)
+
+
+@receiver(post_save, sender=Note)
+def note_saved(sender, instance, created, using, raw=False,
+               update_fields=None, **kwargs):
+    """Добавляет версию в историю заметки (см. notes/revisions.py)."""
+    if raw or (update_fields is not None
+               and not {'title', 'text'} & set(update_fields)):
+        return
+    record_later(instance, using, created)
+
+
+@receiver(m2m_changed, sender=Note.tags.through)
+def note_tags_changed(sender, instance, action, reverse, pk_set, using,
+                      **kwargs):
+    """Обновляет счётчики заметок у меток в транзакции изменения связей."""
+    if action in ('post_add', 'pre_remove', 'pre_clear'):
+        update_tag_counts(instance, action, reverse, pk_set, using)
+
+
+@receiver(pre_delete, sender=Note)
+def note_deleting(sender, instance, using, **kwargs):
+    """
+    Уменьшает счётчики меток удаляемой заметки.
+
+    Связи NoteTag удаляются каскадом без m2m_changed; pre_delete
+    выполняется в транзакции удаления, пока связи ещё в базе.
+    """
+    forget_note_tags(instance, using)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_created(sender, instance, created, using, raw=False, **kwargs):
+    """Заводит счётчик изменений заметок и шард нового пользователя."""
+    if created and not raw:
+        AuthorNotesVersion.objects.using(using).get_or_create(
+            author_id=instance.pk
+        )
+        if settings.NOTES_SHARDS:
+            AuthorShard.objects.using(using).get_or_create(
+                author_id=instance.pk,
+                defaults={'alias': place_author(instance.pk)},
+            )
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def user_deleting(sender, instance, **kwargs):
+    """
+    Удаляет заметки автора из его шарда.
+
+    У внешнего ключа на автора нет ограничения в базе, а каскад Django
+    удаляет только то, что лежит в базе пользователя.
+    """
+    shard = shard_for(instance.pk)
+    if shard != DEFAULT_DB_ALIAS:
+        with transaction.atomic(using=shard):
+            clear_author(instance.pk, shard)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs):
+    """
+    Сбрасывает пользователя в кеше CachedModelBackend.
+
+    Смена пароля, блокировка и удаление видны в этом процессе сразу.
+    """
+    invalidate_user_cache(instance.pk)
+
+
+@receiver(user_logged_out)
+def forget_user_on_logout(sender, request, user, **kwargs):
+    if user is not None:
+        invalidate_user_cache(user.pk)
+
+
+@receiver(post_migrate)
+def restore_search_index(sender, using, **kwargs):
+    """
+    Восстанавливает поисковые триггеры после миграций.
+
+    SQLite при изменении схемы пересоздаёт таблицу notes_note,
+    и триггеры, которые держат индекс в актуальном состоянии, теряются.
+    """
+    if sender.name == 'notes':
+        install_search(using)
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Настраивает новое соединение SQLite по профилю базы."""
+    if connection.vendor == 'sqlite' and settings.SQLITE_PRAGMAS:
+        with connection.cursor() as cursor:
+            for name, value in settings.SQLITE_PRAGMAS.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def track_writes(sender, connection, **kwargs):
+    """Отмечает запросы, писавшие в основную базу (см. notes/routers.py)."""
+    if (connection.alias == DEFAULT_DB_ALIAS
+            and mark_writes not in connection.execute_wrappers):
+        # В начало списка: соединение может открыться внутри
+        # connection.execute_wrapper(), который при выходе снимает
+        # последнюю обёртку.
+        connection.execute_wrappers.insert(0, mark_writes)
+
+
+@receiver(connection_created)
+def track_request_queries(sender, connection, **kwargs):
+    """Учитывает запросы в метриках текущего запроса (notes/metrics.py)."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@receiver(connection_created)
+def preload_search_index(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        preload_index(connection)
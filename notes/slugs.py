@@ -0,0 +1,215 @@
+"""Выделение уникальных slug для заметок."""
+import random
+import re
+from functools import lru_cache
+
+from django.db import IntegrityError, router, transaction
+from django.db.models import Count, Q
+from pytils.translit import ALPHABET, TRANSTABLE
+
+# Запас длины под суффикс вида «-1234567».
+SUFFIX_RESERVE = 8
+# Символ, который больше любого допустимого символа slug.
+RANGE_END = '~'
+DEFAULT_SLUG = 'note'
+SAVE_ATTEMPTS = 10
+# Сколько семейств slug объединять через OR в одном запросе.
+FAMILIES_PER_QUERY = 200
+# Сколько последних заголовков помнит кеш транслитерации.
+SLUGIFY_CACHE_SIZE = 4096
+
+
+# Таблица pytils в виде словаря для str.translate. Как и в
+# pytils.translit.translify, побеждает первая замена символа.
+TRANSLATION = {}
+for source, target in TRANSTABLE:
+    TRANSLATION.setdefault(ord(source), target)
+ALPHABET_CHARS = frozenset(char for char in ALPHABET if len(char) == 1)
+AMPERSAND = re.compile(r'&amp;|&')
+SPACES = re.compile(r'[-\s]+')
+NOT_SLUG = re.compile(r'[^\w\s-]')
+
+
+@lru_cache(maxsize=SLUGIFY_CACHE_SIZE)
+def _transliterate(text):
+    """
+    То же, что pytils.translit.slugify, но за один проход по строке.
+
+    pytils вызывает str.replace для каждой из сотни пар таблицы, что
+    заметно при импорте, где заголовки почти не повторяются.
+    """
+    text = SPACES.sub('-', AMPERSAND.sub(' and ', str(text).lower()))
+    text = ''.join(char for char in text if char in ALPHABET_CHARS)
+    return NOT_SLUG.sub('', text.translate(TRANSLATION)).strip().lower()
+
+
+def slugify(text, max_length=None):
+    """
+    Транслитерирует заголовок в slug и обрезает его до max_length.
+
+    Результаты кешируются в ограниченном LRU-кеше: при импорте и правке
+    заметок одни и те же заголовки встречаются многократно.
+    """
+    slug = _transliterate(text)
+    return slug[:max_length] if max_length else slug
+
+
+def slugify_cache_info():
+    """Статистика кеша транслитерации: hits, misses, maxsize, currsize."""
+    return _transliterate.cache_info()
+
+
+def suffixed(stem, number):
+    return f'{stem}-{number}'
+
+
+def slug_family(base, max_length):
+    """
+    Стем для суффиксов и условие на все slug вида base, base-N.
+
+    Условие — диапазон по уникальному индексу ``slug``, а не LIKE,
+    поэтому выборка не просматривает таблицу целиком.
+    """
+    stem = base[:max_length - SUFFIX_RESERVE]
+    prefix = f'{base}-' if stem == base else stem
+    return stem, Q(slug=base) | Q(
+        slug__gte=prefix, slug__lt=prefix + RANGE_END
+    )
+
+
+def allocate_slug(queryset, base, max_length, spread=1):
+    """
+    Подбирает свободный slug: base, base-2, base-3, …
+
+    Занятые варианты ищутся одним запросом по диапазону уникального
+    индекса ``slug``, без LIKE и без цикла запросов. Обычно достаточно
+    посчитать их: при сплошной нумерации следующий номер равен числу
+    занятых плюс один. После коллизии (spread > 1) читаем занятые
+    значения целиком и берём случайный из первых spread свободных
+    вариантов, чтобы конкурирующие запросы не выбирали один и тот же.
+    """
+    base = base or DEFAULT_SLUG
+    stem, family = slug_family(base, max_length)
+    rows = queryset.filter(family)
+    if spread == 1:
+        stats = rows.aggregate(
+            total=Count('pk'), base_taken=Count('pk', filter=Q(slug=base))
+        )
+        if not stats['base_taken']:
+            return base
+        return suffixed(stem, stats['total'] + 1)
+    taken = set(rows.order_by().values_list('slug', flat=True))
+    candidates = []
+    if base not in taken:
+        candidates.append(base)
+    number = 2
+    while len(candidates) < spread:
+        if suffixed(stem, number) not in taken:
+            candidates.append(suffixed(stem, number))
+        number += 1
+    return random.choice(candidates)
+
+
+class SlugAllocator:
+    """
+    Подбирает уникальные slug для потока заметок, идущих пачками.
+
+    Для каждой базы запоминается следующий номер суффикса, поэтому
+    в установившемся режиме пачка не требует ни одного запроса: база
+    читается из БД только при первой встрече. Если другой процесс
+    занял выданный slug, вызывающий код получит IntegrityError,
+    должен вызвать forget() для пачки и повторить.
+    """
+
+    # Предел числа запомненных баз, чтобы память не росла без границ.
+    max_cached = 100_000
+
+    def __init__(self, queryset, max_length):
+        self.queryset = queryset.order_by()
+        self.max_length = max_length
+        self.next_number = {}
+
+    def forget(self, bases):
+        for base in bases:
+            self.next_number.pop(base or DEFAULT_SLUG, None)
+
+    def allocate(self, bases):
+        bases = [base or DEFAULT_SLUG for base in bases]
+        unknown = set(bases) - self.next_number.keys()
+        if unknown:
+            self._load(unknown)
+        issued = set()
+        slugs = []
+        for base in bases:
+            stem = self._stem(base)
+            number = self.next_number.get(base, 1)
+            slug = base if number == 1 else suffixed(stem, number)
+            while slug in issued:
+                number += 1
+                slug = suffixed(stem, number)
+            self.next_number[base] = max(number + 1, 2)
+            issued.add(slug)
+            slugs.append(slug)
+        return slugs
+
+    def _stem(self, base):
+        return base[:self.max_length - SUFFIX_RESERVE]
+
+    def _load(self, bases):
+        """Узнаёт по БД следующий свободный номер для новых баз."""
+        if len(self.next_number) + len(bases) > self.max_cached:
+            self.next_number.clear()
+        existing = set(
+            self.queryset.filter(slug__in=bases)
+            .values_list('slug', flat=True)
+        )
+        for base in bases - existing:
+            self.next_number[base] = 1
+        crowded = sorted(existing)
+        for start in range(0, len(crowded), FAMILIES_PER_QUERY):
+            chunk = crowded[start:start + FAMILIES_PER_QUERY]
+            families = [
+                slug_family(base, self.max_length)[1] for base in chunk
+            ]
+            taken = self.queryset.filter(
+                Q(*families, _connector=Q.OR)
+            ).values_list('slug', flat=True)
+            numbers = dict.fromkeys(chunk, 1)
+            stems = {self._stem(base): base for base in chunk}
+            for slug in taken:
+                stem, _, suffix = slug.rpartition('-')
+                if stem in stems and suffix.isdigit():
+                    base = stems[stem]
+                    numbers[base] = max(numbers[base], int(suffix))
+            for base, number in numbers.items():
+                self.next_number[base] = number + 1
+
+
+def save_with_unique_slug(instance, save, base, using=None, scope=()):
+    """
+    Сохраняет объект с автоматически подобранным slug.
+
+    scope — поля, в пределах значений которых slug уникален, например
+    ('author_id',). Если параллельный запрос успел занять тот же slug,
+    база вернёт IntegrityError: подбираем следующий свободный вариант
+    и повторяем.
+    """
+    model = type(instance)
+    using = using or router.db_for_write(model, instance=instance)
+    field = instance._meta.get_field('slug')
+    others = model._default_manager.db_manager(using).filter(
+        **{name: getattr(instance, name) for name in scope}
+    ).exclude(pk=instance.pk)
+    for attempt in range(1, SAVE_ATTEMPTS + 1):
+        instance.slug = allocate_slug(
+            others, base, field.max_length, spread=2 ** (attempt - 1)
+        )
+        try:
+            with transaction.atomic(using=using):
+                save()
+            return
+        except IntegrityError:
+            collided = others.filter(slug=instance.slug).exists()
+            if not collided or attempt == SAVE_ATTEMPTS:
+                instance.slug = ''
+                raise
@@ -0,0 +1,98 @@
+"""
+Статика: имена файлов с хешем содержимого и заголовки кеширования.
+
+manage.py collectstatic складывает статику в STATIC_ROOT и добавляет
+к именам хеш содержимого, а {% static %} подставляет эти имена по
+манифесту. Поэтому файл с хешем в имени не меняется никогда и может
+кешироваться навсегда; после правки у него будет новое имя.
+
+Сторонние файлы (Bootstrap) лежат в static/vendor, а не на CDN: сайт
+работает и во внутренней сети. Их скачивает manage.py vendor_assets,
+сверяя с хешем из VENDOR_ASSETS; без них collectstatic не запускается.
+"""
+import base64
+import functools
+import hashlib
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import (
+    ManifestStaticFilesStorage as BaseManifestStaticFilesStorage,
+    StaticFilesStorage, staticfiles_storage
+)
+from django.views import static
+
+# Год — предел max-age, который соблюдают браузеры.
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Файл без хеша в имени может измениться: браузер его перепроверяет.
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+VendorAsset = namedtuple('VendorAsset', 'path url integrity')
+
+VENDOR_ASSETS = {
+    'bootstrap': VendorAsset(
+        path='vendor/bootstrap-5.0.1/css/bootstrap.min.css',
+        url='https://cdn.jsdelivr.net/npm/bootstrap@5.0.1/dist/css/'
+            'bootstrap.min.css',
+        integrity='sha384-+0n0xVW2eSR5OomGNYDnhzAbDsOXxcvSN1TPprVMTNDbiYZCxY'
+                  'bOOl7+AMvyTG2x',
+    ),
+}
+
+
+class ManifestStaticFilesStorage(BaseManifestStaticFilesStorage):
+    """
+    Хранилище статики с хешами в именах по манифесту collectstatic.
+
+    В режиме DEBUG, пока collectstatic не запускали, манифеста нет, и
+    адреса строятся без хеша. Без DEBUG, как в Django, файл без записи
+    в манифесте — ошибка ValueError, а не ссылка мимо конвейера.
+    """
+
+    def url(self, name, force=False):
+        if not self.hashed_files and settings.DEBUG and not force:
+            return StaticFilesStorage.url(self, name)
+        return super().url(name, force)
+
+
+def integrity(content):
+    """Хеш SRI содержимого файла для атрибута integrity ссылки."""
+    digest = hashlib.sha384(content).digest()
+    return f'sha384-{base64.b64encode(digest).decode()}'
+
+
+@functools.lru_cache(maxsize=None)
+def is_vendored(path):
+    """Лежит ли сторонний файл в static/vendor."""
+    return finders.find(path) is not None
+
+
+def missing_vendor_assets():
+    """Сторонние файлы из VENDOR_ASSETS, которых нет в static/vendor."""
+    return [
+        asset.path for asset in VENDOR_ASSETS.values()
+        if finders.find(asset.path) is None
+    ]
+
+
+@functools.lru_cache(maxsize=1)
+def hashed_names():
+    """Имена файлов с хешем из манифеста collectstatic."""
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def serve(request, path):
+    """
+    Отдаёт файл из STATIC_ROOT с заголовками кеширования.
+
+    Нужен, когда перед приложением нет веб-сервера для статики
+    (NOTES_SERVE_STATIC). Файлы с хешем в имени кешируются на год,
+    остальные браузер перепроверяет по Last-Modified.
+    """
+    response = static.serve(request, path, document_root=settings.STATIC_ROOT)
+    response['Cache-Control'] = (
+        IMMUTABLE_CACHE_CONTROL if path in hashed_names()
+        else REVALIDATE_CACHE_CONTROL
+    )
+    return response
@@ -0,0 +1,36 @@
+from django import template
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import ImproperlyConfigured
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from notes.staticfiles import VENDOR_ASSETS, is_vendored
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_stylesheet(name):
+    """
+    Ссылка на сторонний CSS из VENDOR_ASSETS.
+
+    Пока файл не скачан в static/vendor (manage.py vendor_assets) и
+    collectstatic не запускали (разработка, тесты), ссылка ведёт на
+    CDN. После collectstatic файл обязан быть в манифесте: ссылка
+    на CDN молча обходила бы конвейер статики.
+    """
+    asset = VENDOR_ASSETS[name]
+    if is_vendored(asset.path):
+        return format_html(
+            '<link rel="stylesheet" href="{}">', static(asset.path)
+        )
+    if getattr(staticfiles_storage, 'hashed_files', None):
+        raise ImproperlyConfigured(
+            f'Нет файла {asset.path} в static/vendor: '
+            f'выполните manage.py vendor_assets и collectstatic.'
+        )
+    return format_html(
+        '<link rel="stylesheet" href="{}" integrity="{}" '
+        'crossorigin="anonymous">',
+        asset.url, asset.integrity,
+    )
@@ -0,0 +1,252 @@
+import io
+import json
+from http import HTTPStatus
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import Client
+from django.urls import reverse
+
+from notes.forms import NoteForm
+from notes.models import ApiToken, IdempotencyKey, Note
+from .base_test import BaseTestCase, NOTE_SLUG
+
+API_LIST_URL = reverse('notes:api-list')
+API_LOOKUP_URL = reverse('notes:api-lookup')
+API_BATCH_URL = reverse('notes:api-batch')
+API_DETAIL_URL = reverse('notes:api-detail', args=[NOTE_SLUG])
+
+
+class ApiTestCase(BaseTestCase):
+    """Клиент API с токеном автора."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.key = ApiToken.objects.issue(cls.author, 'tests')
+        cls.foreign = Note.objects.create(
+            title='Чужая', text='Текст', slug='foreign', author=cls.not_author
+        )
+
+    def setUp(self):
+        self.api = Client(HTTP_AUTHORIZATION=f'Token {self.key}')
+
+    def send(self, method, url, data=None, client=None, **headers):
+        response = getattr(client or self.api, method)(
+            url,
+            data=json.dumps(data) if data is not None else '',
+            content_type='application/json',
+            **headers,
+        )
+        body = json.loads(response.content) if response.content else None
+        return response.status_code, body
+
+
+class TestApiAuth(ApiTestCase):
+    """Тестирование аутентификации и CSRF."""
+
+    def test_anonymous_and_bad_token_get_401(self):
+        for client in (Client(), Client(HTTP_AUTHORIZATION='Token bad')):
+            with self.subTest(client=client):
+                status, _ = self.send('get', API_LIST_URL, client=client)
+                self.assertEqual(status, HTTPStatus.UNAUTHORIZED)
+
+    def test_token_writes_without_csrf(self):
+        client = Client(
+            enforce_csrf_checks=True, HTTP_AUTHORIZATION=f'Token {self.key}'
+        )
+        status, _ = self.send(
+            'post', API_LIST_URL, {'title': 'Т', 'text': 'Т'}, client
+        )
+        self.assertEqual(status, HTTPStatus.CREATED)
+
+    def test_session_writes_need_csrf_header(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.author)
+        data = {'title': 'Т', 'text': 'Т'}
+        status, _ = self.send('post', API_LIST_URL, data, client)
+        self.assertEqual(status, HTTPStatus.FORBIDDEN)
+        client.get(API_LIST_URL)
+        client.cookies['csrftoken'] = 'a' * 32
+        status, _ = self.send(
+            'post', API_LIST_URL, data, client, HTTP_X_CSRFTOKEN='a' * 32
+        )
+        self.assertEqual(status, HTTPStatus.CREATED)
+
+    def test_create_api_token_command(self):
+        out = io.StringIO()
+        call_command('create_api_token', self.not_author.username, stdout=out)
+        key = out.getvalue().strip()
+        self.assertEqual(
+            ApiToken.objects.authenticate(key).user, self.not_author
+        )
+        self.assertFalse(ApiToken.objects.filter(digest=key).exists())
+
+
+class TestApiRead(ApiTestCase):
+    """Тестирование чтения заметок через API."""
+
+    def test_list_is_cursor_paginated_and_scoped(self):
+        for index in range(4):
+            Note.objects.create(
+                title=f'Заметка {index}', text='Т', author=self.author
+            )
+        slugs, cursor = [], None
+        while True:
+            params = {'limit': 2, 'fields': 'slug'}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.api.get(API_LIST_URL, params)
+            body = response.json()
+            slugs += [note['slug'] for note in body['results']]
+            self.assertEqual(
+                {key for note in body['results'] for key in note}, {'slug'}
+            )
+            cursor = body['next']
+            if cursor is None:
+                break
+        self.assertEqual(
+            slugs,
+            list(Note.objects.filter(author=self.author)
+                 .values_list('slug', flat=True)),
+        )
+
+    def test_list_rejects_unknown_fields_and_cursor(self):
+        for params in ({'fields': 'author'}, {'cursor': 'broken'}):
+            with self.subTest(params=params):
+                response = self.api.get(API_LIST_URL, params)
+                self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_detail_supports_conditional_get(self):
+        response = self.api.get(API_DETAIL_URL, {'fields': 'title,text'})
+        self.assertEqual(
+            response.json(),
+            {'title': self.note.title, 'text': self.note.text},
+        )
+        response = self.api.get(
+            API_DETAIL_URL, {'fields': 'title,text'},
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_foreign_note_is_not_found(self):
+        response = self.api.get(
+            reverse('notes:api-detail', args=[self.foreign.slug])
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_lookup_in_one_query(self):
+        slugs = ['missing', NOTE_SLUG, self.foreign.slug]
+        with self.assertNumQueries(2):
+            status, body = self.send(
+                'post', API_LOOKUP_URL, {'slugs': slugs, 'fields': ['slug']}
+            )
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(body['results'], [{'slug': NOTE_SLUG}])
+        self.assertEqual(body['missing'], ['missing', self.foreign.slug])
+
+
+class TestApiWrite(ApiTestCase):
+    """Тестирование изменения заметок через API."""
+
+    def test_patch_and_delete(self):
+        status, body = self.send('patch', API_DETAIL_URL, {'title': 'Новый'})
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(body['title'], 'Новый')
+        self.assertEqual(body['text'], self.note.text)
+        status, _ = self.send('delete', API_DETAIL_URL)
+        self.assertEqual(status, HTTPStatus.NO_CONTENT)
+        self.assertFalse(Note.objects.filter(slug=NOTE_SLUG).exists())
+
+    def test_validation_uses_note_form(self):
+        status, body = self.send(
+            'post', API_LIST_URL,
+            {'title': 'Т', 'text': 'Т', 'slug': NOTE_SLUG},
+        )
+        self.assertEqual(status, HTTPStatus.BAD_REQUEST)
+        self.assertIn('slug', body['errors'])
+        # slug уникален только среди заметок автора.
+        status, body = self.send(
+            'post', API_LIST_URL,
+            {'title': 'Т', 'text': 'Т', 'slug': self.foreign.slug},
+        )
+        self.assertEqual(status, HTTPStatus.CREATED)
+        self.assertEqual(body['slug'], self.foreign.slug)
+
+    def test_slug_taken_concurrently(self):
+        # slug заняли уже после проверки формы.
+        with mock.patch.object(
+            NoteForm, 'clean_slug', lambda form: form.cleaned_data['slug']
+        ):
+            status, _ = self.send(
+                'post', API_LIST_URL,
+                {'title': 'Т', 'text': 'Т', 'slug': NOTE_SLUG},
+            )
+        self.assertEqual(status, HTTPStatus.CONFLICT)
+        self.assertEqual(Note.objects.filter(slug=NOTE_SLUG).count(), 1)
+
+    def test_batch_applies_all_operations(self):
+        status, body = self.send('post', API_BATCH_URL, {
+            'delete': [NOTE_SLUG],
+            'create': [
+                {'title': 'Первая', 'text': 'Т', 'slug': NOTE_SLUG},
+                {'title': 'Вторая', 'text': 'Т'},
+            ],
+        })
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(body['deleted'], [NOTE_SLUG])
+        self.assertEqual(
+            [note['title'] for note in body['created']], ['Первая', 'Вторая']
+        )
+        status, body = self.send('post', API_BATCH_URL, {
+            'update': [{'slug': NOTE_SLUG, 'changes': {'text': 'Новый'}}],
+        })
+        self.assertEqual(body['updated'][0]['text'], 'Новый')
+        self.assertEqual(Note.objects.get(slug=NOTE_SLUG).text, 'Новый')
+
+    def test_batch_is_atomic(self):
+        count = Note.objects.count()
+        status, body = self.send('post', API_BATCH_URL, {
+            'delete': [NOTE_SLUG],
+            'create': [
+                {'title': 'Верная', 'text': 'Т'},
+                {'title': 'Без текста'},
+            ],
+        })
+        self.assertEqual(status, HTTPStatus.BAD_REQUEST)
+        self.assertIn('text', body['errors']['create']['1'])
+        self.assertEqual(Note.objects.count(), count)
+        self.assertTrue(Note.objects.filter(slug=NOTE_SLUG).exists())
+
+    def test_batch_cannot_touch_foreign_notes(self):
+        status, body = self.send(
+            'post', API_BATCH_URL, {'delete': [self.foreign.slug]}
+        )
+        self.assertEqual(status, HTTPStatus.NOT_FOUND)
+        self.assertEqual(
+            body['errors'], {'delete': {'missing': [self.foreign.slug]}}
+        )
+        self.assertTrue(Note.objects.filter(pk=self.foreign.pk).exists())
+
+    def test_idempotency_key_replays_response(self):
+        data = {'title': 'Один раз', 'text': 'Т'}
+        first = self.send(
+            'post', API_LIST_URL, data, HTTP_IDEMPOTENCY_KEY='key-1'
+        )
+        second = self.send(
+            'post', API_LIST_URL, data, HTTP_IDEMPOTENCY_KEY='key-1'
+        )
+        self.assertEqual(first, second)
+        self.assertEqual(first[0], HTTPStatus.CREATED)
+        self.assertEqual(Note.objects.filter(title='Один раз').count(), 1)
+        status, _ = self.send(
+            'post', API_LIST_URL, {'title': 'Другое', 'text': 'Т'},
+            HTTP_IDEMPOTENCY_KEY='key-1',
+        )
+        self.assertEqual(status, HTTPStatus.UNPROCESSABLE_ENTITY)
+
+    def test_failed_request_releases_idempotency_key(self):
+        self.send(
+            'post', API_LIST_URL, {'title': 'Т'}, HTTP_IDEMPOTENCY_KEY='key-2'
+        )
+        self.assertFalse(IdempotencyKey.objects.filter(key='key-2').exists())
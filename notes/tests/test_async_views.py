@@ -0,0 +1,126 @@
+import asyncio
+from http import HTTPStatus
+
+from asgiref.sync import sync_to_async
+from django.test import override_settings
+from django.urls import include, path
+
+from notes import async_views, metrics
+from notes.catalog import set_tags
+from notes.forms import WARNING
+from notes.models import Folder, Note
+from yanote.urls import auth_urls
+from .base_test import (
+    ADD_NOTE_URL, BaseTestCase, DELETE_NOTE_URL, EDIT_NOTE_URL,
+    EDIT_NOTE_REDIRECT, NOTE_DETAIL_URL, NOTE_LIST_URL, NOTE_SLUG,
+    SUCCESS_URL
+)
+
+urlpatterns = [
+    path('', include('notes.async_urls')),
+    path('auth/', include(auth_urls)),
+]
+
+
+# Без пула потоков запросы к базе идут в поток теста и видят его
+# транзакцию.
+@override_settings(ROOT_URLCONF=__name__, NOTES_DB_THREADS=0)
+class TestAsyncViews(BaseTestCase):
+    """Тестирование асинхронных представлений заметок."""
+
+    def test_views_are_coroutines(self):
+        for view in (
+            async_views.note_list, async_views.note_detail,
+            async_views.note_create, async_views.note_update,
+            async_views.note_delete,
+        ):
+            with self.subTest(view=view.__name__):
+                self.assertTrue(asyncio.iscoroutinefunction(view))
+
+    def setUp(self):
+        self.async_client.force_login(self.author)
+
+    async def test_pages_over_asgi(self):
+        for url in (NOTE_LIST_URL, NOTE_DETAIL_URL, EDIT_NOTE_URL):
+            with self.subTest(url=url):
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertContains(response, self.note.title)
+
+    async def test_folder_and_tags_over_asgi(self):
+        await sync_to_async(self.organize_note)()
+        for url in (NOTE_DETAIL_URL, EDIT_NOTE_URL):
+            with self.subTest(url=url):
+                response = await self.async_client.get(url)
+                self.assertContains(response, 'Папка')
+                self.assertContains(response, 'работа')
+
+    def organize_note(self):
+        self.note.folder = Folder.objects.create(
+            author=self.author, name='Папка'
+        )
+        self.note.save()
+        set_tags(self.note, ['работа'])
+
+    async def test_metrics_over_asgi(self):
+        metrics.registry.clear()
+        await self.async_client.get(NOTE_LIST_URL)
+        series = metrics.registry.snapshot()['notes:list']
+        self.assertEqual(series.count, 1)
+        self.assertGreater(series.queries, 0)
+        self.assertGreater(series.render_seconds, 0)
+
+    def test_anonymous_is_redirected(self):
+        response = self.client.get(EDIT_NOTE_URL)
+        self.assertRedirects(response, EDIT_NOTE_REDIRECT)
+
+    def test_foreign_note_is_not_found(self):
+        for url in (NOTE_DETAIL_URL, EDIT_NOTE_URL, DELETE_NOTE_URL):
+            with self.subTest(url=url):
+                response = self.not_author_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_list_and_detail_send_304(self):
+        for url in (NOTE_LIST_URL, NOTE_DETAIL_URL):
+            with self.subTest(url=url):
+                etag = self.author_client.get(url)['ETag']
+                response = self.author_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+
+    def test_create_update_delete(self):
+        response = self.author_client.post(ADD_NOTE_URL, self.note_data)
+        self.assertRedirects(response, SUCCESS_URL)
+        self.assertTrue(
+            Note.objects.filter(slug=self.note_data['slug']).exists()
+        )
+        response = self.author_client.post(EDIT_NOTE_URL, {
+            **self.note_data, 'slug': NOTE_SLUG, 'title': 'Новый заголовок'
+        })
+        self.assertRedirects(response, SUCCESS_URL)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.title, 'Новый заголовок')
+        response = self.author_client.post(DELETE_NOTE_URL)
+        self.assertRedirects(response, SUCCESS_URL)
+        self.assertFalse(Note.objects.filter(slug=NOTE_SLUG).exists())
+
+    def test_delete_method(self):
+        response = self.author_client.delete(DELETE_NOTE_URL)
+        self.assertRedirects(response, SUCCESS_URL)
+        self.assertFalse(Note.objects.filter(slug=NOTE_SLUG).exists())
+
+    def test_invalid_form_is_shown_again(self):
+        response = self.author_client.post(
+            ADD_NOTE_URL, {**self.note_data, 'slug': NOTE_SLUG}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertFormError(response, 'form', 'slug', NOTE_SLUG + WARNING)
+
+    def test_list_rejects_post(self):
+        response = self.author_client.post(NOTE_LIST_URL)
+        self.assertEqual(
+            response.status_code, HTTPStatus.METHOD_NOT_ALLOWED
+        )
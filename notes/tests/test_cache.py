@@ -0,0 +1,108 @@
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from notes.models import Note
+from .base_test import BaseTestCase, HOME_URL, DELETE_NOTE_URL
+
+
+class TestRecentNotesCache(BaseTestCase):
+    """Тестирование кеша последних заметок на домашней странице."""
+
+    def setUp(self):
+        cache.clear()
+
+    def get_home(self, client=None):
+        """Запрашивает домашнюю страницу и собирает запросы к заметкам."""
+        with CaptureQueriesContext(connection) as queries:
+            response = (client or self.author_client).get(HOME_URL)
+        notes_queries = [
+            query for query in queries if 'notes_note' in query['sql']
+        ]
+        return response, notes_queries
+
+    def assert_cache_lifecycle(self):
+        response, queries = self.get_home()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(
+            [note['slug'] for note in response.context['recent_notes']],
+            [self.note.slug]
+        )
+        response, queries = self.get_home()
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(len(response.context['recent_notes']), 1)
+
+    def test_cache_hit_does_not_query_notes(self):
+        """Повторный заход на главную не обращается к таблице заметок."""
+        self.assert_cache_lifecycle()
+
+    def test_file_based_cache_backend(self):
+        """Кеш работает и с файловым бэкендом."""
+        with tempfile.TemporaryDirectory() as location:
+            with override_settings(CACHES={**settings.CACHES, 'default': {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': location,
+            }}):
+                self.assert_cache_lifecycle()
+
+    def test_cache_invalidated_on_save(self):
+        """После сохранения заметки автора кеш пересобирается."""
+        self.get_home()
+        with self.captureOnCommitCallbacks(execute=True):
+            new_note = Note.objects.create(
+                title='Новая', text='Текст', slug='new', author=self.author
+            )
+        response, queries = self.get_home()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(
+            response.context['recent_notes'][0]['slug'], new_note.slug
+        )
+        _, queries = self.get_home()
+        self.assertEqual(len(queries), 0)
+
+    def test_cache_invalidated_after_commit(self):
+        """До фиксации транзакции чтение не кеширует старый список."""
+        self.get_home()
+        with self.captureOnCommitCallbacks() as callbacks:
+            Note.objects.create(
+                title='Новая', text='Текст', slug='new', author=self.author
+            )
+            _, queries = self.get_home()
+            self.assertEqual(len(queries), 0)
+        for callback in callbacks:
+            callback()
+        response, queries = self.get_home()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.context['recent_notes'][0]['slug'], 'new')
+
+    def test_cache_invalidated_on_delete(self):
+        """После удаления заметки она пропадает с домашней страницы."""
+        self.get_home()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author_client.post(DELETE_NOTE_URL)
+        response, queries = self.get_home()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.context['recent_notes'], [])
+
+    def test_cache_is_per_author(self):
+        """Изменения одного автора не сбрасывают кеш другого."""
+        self.get_home()
+        self.get_home(self.not_author_client)
+        with self.captureOnCommitCallbacks(execute=True):
+            Note.objects.create(
+                title='Чужая', text='Текст', slug='other',
+                author=self.not_author,
+            )
+        _, queries = self.get_home()
+        self.assertEqual(len(queries), 0)
+
+    def test_anonymous_home_has_no_notes(self):
+        """Анонимному пользователю заметки не показываются."""
+        response, queries = self.get_home(self.client)
+        self.assertNotIn('recent_notes', response.context)
+        self.assertEqual(len(queries), 0)
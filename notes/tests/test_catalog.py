@@ -0,0 +1,265 @@
+from django.urls import reverse
+
+from notes.catalog import MAX_TAGS_PER_NOTE, parse_tags, set_tags
+from notes.models import Folder, Note, Tag
+from .base_test import (
+    ADD_NOTE_URL, BaseTestCase, DELETE_NOTE_URL, EDIT_NOTE_URL,
+    NOTE_DETAIL_URL, NOTE_LIST_URL, NOTE_SLUG
+)
+
+TAGS_URL = reverse('notes:tags')
+FOLDERS_URL = reverse('notes:folders')
+ADD_FOLDER_URL = reverse('notes:folder-add')
+
+
+class TestTags(BaseTestCase):
+    """Метки заметок и их счётчики."""
+
+    def counts(self):
+        return dict(
+            Tag.objects.filter(author=self.author)
+            .values_list('slug', 'note_count')
+        )
+
+    def edit(self, tags, slug=NOTE_SLUG):
+        response = self.author_client.post(
+            reverse('notes:edit', args=[slug]),
+            {'title': 'Т', 'text': 'Т', 'slug': slug, 'tags': tags},
+        )
+        self.assertEqual(response.status_code, 302)
+
+    def test_parse_tags(self):
+        self.assertEqual(
+            parse_tags(' Работа,идеи ,, работа,  Новые   идеи'),
+            ['Работа', 'идеи', 'Новые идеи'],
+        )
+
+    def test_counts_follow_changes(self):
+        other = Note.objects.create(
+            title='Вторая', text='Т', author=self.author
+        )
+        self.edit('работа, идеи')
+        self.edit('работа', slug=other.slug)
+        self.assertEqual(self.counts(), {'rabota': 2, 'idei': 1})
+        self.edit('идеи, планы')
+        self.assertEqual(
+            self.counts(), {'rabota': 1, 'idei': 1, 'planyi': 1}
+        )
+        self.author_client.post(DELETE_NOTE_URL)
+        self.assertEqual(
+            self.counts(), {'rabota': 1, 'idei': 0, 'planyi': 0}
+        )
+
+    def test_counts_follow_related_manager(self):
+        tag = Tag.objects.create(author=self.author, name='а', slug='a')
+        self.note.tags.add(tag)
+        self.note.tags.add(tag)
+        tag.refresh_from_db()
+        self.assertEqual(tag.note_count, 1)
+        other = Note.objects.create(title='В', text='Т', author=self.author)
+        tag.notes.add(other)
+        tag.refresh_from_db()
+        self.assertEqual(tag.note_count, 2)
+        tag.notes.remove(self.note, self.note)
+        tag.refresh_from_db()
+        self.assertEqual(tag.note_count, 1)
+        other.tags.clear()
+        tag.refresh_from_db()
+        self.assertEqual(tag.note_count, 0)
+
+    def test_form_shows_current_tags(self):
+        set_tags(self.note, ['работа', 'идеи'])
+        form = self.author_client.get(EDIT_NOTE_URL).context['form']
+        self.assertEqual(form.initial['tags'], 'идеи, работа')
+
+    def test_too_many_tags(self):
+        tags = ', '.join(f'метка{index}' for index in range(21))
+        response = self.author_client.post(ADD_NOTE_URL, {
+            'title': 'Т', 'text': 'Т', 'tags': tags,
+        })
+        self.assertFormError(
+            response, 'form', 'tags',
+            f'Не больше {MAX_TAGS_PER_NOTE} меток у заметки.',
+        )
+
+    def test_tags_of_authors_are_separate(self):
+        set_tags(self.note, ['работа'])
+        foreign = Note.objects.create(
+            title='Чужая', text='Т', author=self.not_author
+        )
+        set_tags(foreign, ['работа'])
+        self.assertEqual(Tag.objects.filter(slug='rabota').count(), 2)
+        response = self.not_author_client.get(NOTE_LIST_URL, {'tag': 'rabota'})
+        self.assertEqual(list(response.context['object_list']), [foreign])
+
+    def test_cloud(self):
+        set_tags(self.note, ['работа', 'идеи'])
+        set_tags(self.note, ['работа'])
+        response = self.author_client.get(TAGS_URL)
+        self.assertEqual(
+            [(tag.name, tag.note_count)
+             for tag in response.context['object_list']],
+            [('работа', 1)],
+        )
+
+    def test_detail_shows_tags(self):
+        set_tags(self.note, ['работа'])
+        response = self.author_client.get(NOTE_DETAIL_URL)
+        self.assertContains(response, f'{NOTE_LIST_URL}?tag=rabota')
+
+
+class TestNotesFilter(BaseTestCase):
+    """Список заметок с меткой или в папке."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.root = Folder.objects.create(author=cls.author, name='Работа')
+        cls.child = Folder.objects.create(
+            author=cls.author, name='Проекты', parent=cls.root
+        )
+        cls.grandchild = Folder.objects.create(
+            author=cls.author, name='Старые', parent=cls.child
+        )
+        cls.other = Folder.objects.create(author=cls.author, name='Дом')
+        cls.notes = {
+            folder: Note.objects.create(
+                title=folder.name, text='Т', author=cls.author,
+                folder=folder,
+            )
+            for folder in (cls.root, cls.child, cls.grandchild, cls.other)
+        }
+
+    def listed(self, **params):
+        response = self.author_client.get(NOTE_LIST_URL, params)
+        self.assertEqual(response.status_code, 200)
+        return list(response.context['object_list'])
+
+    def test_folder_path(self):
+        self.assertEqual(self.root.path, f'{self.root.pk}/')
+        self.assertEqual(
+            self.grandchild.path,
+            f'{self.root.pk}/{self.child.pk}/{self.grandchild.pk}/',
+        )
+        self.assertEqual(self.grandchild.depth, 2)
+
+    def test_folder_with_subfolders(self):
+        cases = (
+            (self.root, [self.root, self.child, self.grandchild]),
+            (self.child, [self.child, self.grandchild]),
+            (self.other, [self.other]),
+        )
+        for folder, expected in cases:
+            with self.subTest(folder=folder.name):
+                self.assertEqual(
+                    self.listed(folder=folder.pk),
+                    [self.notes[folder] for folder in expected],
+                )
+
+    def test_tag_and_folder(self):
+        for folder in (self.child, self.other):
+            set_tags(self.notes[folder], ['срочно'])
+        self.assertEqual(
+            self.listed(tag='srochno'),
+            [self.notes[self.child], self.notes[self.other]],
+        )
+        self.assertEqual(
+            self.listed(tag='srochno', folder=self.root.pk),
+            [self.notes[self.child]],
+        )
+
+    def test_filtered_list_queries(self):
+        self.author_client.get(NOTE_LIST_URL)
+        # Счётчик изменений, метка и страница заметок.
+        with self.assertNumQueries(3):
+            self.listed(folder=self.root.pk)
+
+    def test_unknown_filters_are_not_found(self):
+        foreign = Folder.objects.create(author=self.not_author, name='Чужая')
+        cases = (
+            {'tag': 'net-takoy'},
+            {'folder': foreign.pk},
+            {'folder': 'x'},
+        )
+        for params in cases:
+            with self.subTest(params=params):
+                response = self.author_client.get(NOTE_LIST_URL, params)
+                self.assertEqual(response.status_code, 404)
+
+    def test_pagination_keeps_filter(self):
+        Note.objects.bulk_create(
+            Note(title='Т', text='Т', slug=f'n-{index}', author=self.author,
+                 folder=self.other)
+            for index in range(60)
+        )
+        response = self.author_client.get(
+            NOTE_LIST_URL, {'folder': self.other.pk}
+        )
+        self.assertContains(response, f'?folder={self.other.pk}&amp;cursor=')
+
+    def test_tag_pages(self):
+        Note.objects.bulk_create(
+            Note(title='Т', text='Т', slug=f'n-{index}', author=self.author)
+            for index in range(60)
+        )
+        notes = list(Note.objects.filter(slug__startswith='n-'))[::2]
+        tag = Tag.objects.create(author=self.author, name='а', slug='a')
+        tag.notes.add(*notes)
+        listed = []
+        params = {'tag': 'a'}
+        while True:
+            response = self.author_client.get(NOTE_LIST_URL, params)
+            listed += response.context['object_list']
+            page = response.context['page_obj']
+            if not page.has_next():
+                break
+            params['cursor'] = page.next_cursor
+        self.assertEqual(listed, notes)
+
+    def test_tag_change_changes_etag(self):
+        etag = self.author_client.get(NOTE_LIST_URL)['ETag']
+        self.notes[self.root].tags.add(
+            Tag.objects.create(author=self.author, name='а', slug='a')
+        )
+        self.assertNotEqual(
+            self.author_client.get(NOTE_LIST_URL)['ETag'], etag
+        )
+
+
+class TestFolders(BaseTestCase):
+    """Страницы папок."""
+
+    def test_create(self):
+        response = self.author_client.post(ADD_FOLDER_URL, {'name': 'Дом'})
+        self.assertRedirects(response, FOLDERS_URL)
+        parent = Folder.objects.get(author=self.author)
+        self.author_client.post(
+            ADD_FOLDER_URL, {'name': 'Кухня', 'parent': parent.pk}
+        )
+        response = self.author_client.get(FOLDERS_URL)
+        self.assertEqual(
+            [(folder.name, folder.depth)
+             for folder in response.context['object_list']],
+            [('Дом', 0), ('Кухня', 1)],
+        )
+
+    def test_foreign_parent_is_rejected(self):
+        foreign = Folder.objects.create(author=self.not_author, name='Чужая')
+        response = self.author_client.post(
+            ADD_FOLDER_URL, {'name': 'Моя', 'parent': foreign.pk}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Folder.objects.filter(author=self.author).exists())
+
+    def test_note_form_offers_own_folders(self):
+        own = Folder.objects.create(author=self.author, name='Моя')
+        Folder.objects.create(author=self.not_author, name='Чужая')
+        form = self.author_client.get(ADD_NOTE_URL).context['form']
+        self.assertEqual(list(form.fields['folder'].queryset), [own])
+
+    def test_deleted_folder_keeps_notes(self):
+        folder = Folder.objects.create(author=self.author, name='Папка')
+        Note.objects.filter(pk=self.note.pk).update(folder=folder)
+        folder.delete()
+        self.note.refresh_from_db()
+        self.assertIsNone(self.note.folder)
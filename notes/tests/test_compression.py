@@ -0,0 +1,170 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from notes.fields import CompressedText, compress_text, decompress_text
+from notes.models import Note
+from notes.revisions import get_revision
+from notes.search.sqlite import drop_schema, ensure_schema
+from .base_test import BaseTestCase
+
+SEARCH_URL = reverse('notes:search')
+# Длинный текст, который хорошо сжимается, с редким словом в конце.
+LONG_TEXT = 'Строка журнала сборки, шаг выполнен.\n' * 200 + 'Финиш ракеты.'
+
+
+def ensure_schema_rebuilt():
+    """Перестраивает поисковый индекс с нуля, как после миграции."""
+    drop_schema(connection.alias)
+    ensure_schema(connection.alias)
+
+
+def raw_text(note):
+    """Значение колонки text как оно лежит в базе."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT text FROM notes_note WHERE id = %s', [note.pk]
+        )
+        return cursor.fetchone()[0]
+
+
+class TestCompressText(SimpleTestCase):
+    """Сжатие и распаковка значения колонки."""
+
+    def test_round_trip(self):
+        for algorithm, header in (('zlib', b'\x01'), ('lzma', b'\x02')):
+            with self.subTest(algorithm=algorithm):
+                packed = compress_text(LONG_TEXT, algorithm, 1024)
+                self.assertEqual(packed[:1], header)
+                self.assertEqual(decompress_text(packed), LONG_TEXT)
+                self.assertEqual(
+                    str(CompressedText(packed)), LONG_TEXT
+                )
+
+    def test_text_is_kept_as_is(self):
+        cases = (
+            ('Короткий текст', 'zlib', 1024),
+            (LONG_TEXT, None, 1024),
+            # Сжатие не даёт выигрыша.
+            ('qZ8!', 'zlib', 1),
+        )
+        for text, algorithm, threshold in cases:
+            with self.subTest(text=text[:10], algorithm=algorithm):
+                self.assertEqual(
+                    compress_text(text, algorithm, threshold), text
+                )
+                self.assertEqual(decompress_text(text), text)
+
+
+@override_settings(NOTES_TEXT_COMPRESS_THRESHOLD=1024)
+class TestCompressedTextField(BaseTestCase):
+    """Большой текст заметки хранится сжатым и читается как обычный."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        with override_settings(NOTES_TEXT_COMPRESS_THRESHOLD=1024):
+            cls.long_note = Note.objects.create(
+                title='Журнал', text=LONG_TEXT, author=cls.author
+            )
+
+    def test_long_text_is_stored_compressed(self):
+        value = raw_text(self.long_note)
+        self.assertIsInstance(value, bytes)
+        self.assertEqual(value[:1], b'\x01')
+        self.assertLess(len(value), len(LONG_TEXT.encode()))
+        self.assertEqual(raw_text(self.note), self.note.text)
+
+    @override_settings(NOTES_TEXT_COMPRESSION='lzma')
+    def test_algorithm_from_settings(self):
+        self.long_note.save()
+        self.assertEqual(raw_text(self.long_note)[:1], b'\x02')
+        self.long_note.refresh_from_db()
+        self.assertEqual(self.long_note.text, LONG_TEXT)
+
+    def test_text_is_decompressed_on_access(self):
+        note = Note.objects.get(pk=self.long_note.pk)
+        self.assertIsInstance(note.__dict__['text'], CompressedText)
+        self.assertEqual(note.text, LONG_TEXT)
+        self.assertEqual(note.__dict__['text'], LONG_TEXT)
+
+    def test_untouched_text_is_saved_as_is(self):
+        stored = raw_text(self.long_note)
+        note = Note.objects.get(pk=self.long_note.pk)
+        note.title = 'Новый журнал'
+        note.save(update_fields=('title', 'text'))
+        self.assertEqual(raw_text(note), stored)
+        self.assertEqual(
+            Note.objects.get(pk=note.pk).text, LONG_TEXT
+        )
+
+    def test_values_list_gives_compressed_text(self):
+        text = Note.objects.values_list('text', flat=True).get(
+            pk=self.long_note.pk
+        )
+        self.assertIsInstance(text, CompressedText)
+        self.assertEqual(str(text), LONG_TEXT)
+
+    def test_search_finds_words_in_compressed_text(self):
+        response = self.author_client.get(SEARCH_URL, {'q': 'ракета'})
+        self.assertEqual(
+            list(response.context['object_list']), [self.long_note]
+        )
+        self.long_note.text = 'Ракета отменена.' * 100
+        self.long_note.save()
+        response = self.author_client.get(SEARCH_URL, {'q': 'финиш'})
+        self.assertEqual(list(response.context['object_list']), [])
+
+    def search(self, query):
+        response = self.author_client.get(SEARCH_URL, {'q': query})
+        return list(response.context['object_list'])
+
+    def test_search_index_follows_compressed_note(self):
+        """Сжатые заметки индексирует приложение, а не триггеры."""
+        note = Note.objects.get(pk=self.long_note.pk)
+        for title in ('Кометы', 'Отчёт'):
+            note.title = title
+            note.save(update_fields=('title',))
+        self.assertEqual(self.search('кометы'), [])
+        self.assertEqual(self.search('отчет ракета'), [note])
+        ensure_schema_rebuilt()
+        self.assertEqual(self.search('отчет ракета'), [note])
+        note.delete()
+        self.assertEqual(self.search('ракета'), [])
+
+    def test_imported_compressed_note_is_found(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'notes.jsonl')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(json.dumps({
+                    'author': self.author.username, 'title': 'Импорт',
+                    'text': LONG_TEXT.replace('ракеты', 'спутника'),
+                }) + '\n')
+            call_command('import_notes', path, stdout=io.StringIO())
+        imported = Note.objects.get(title='Импорт')
+        self.assertIsInstance(raw_text(imported), bytes)
+        self.assertEqual(self.search('спутник'), [imported])
+
+    def test_detail_and_revisions_show_text(self):
+        response = self.author_client.get(
+            reverse('notes:detail', args=[self.long_note.slug])
+        )
+        self.assertEqual(response.context['note'].text, LONG_TEXT)
+        self.assertEqual(get_revision(self.long_note, 1).text, LONG_TEXT)
+
+    def test_export(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'notes.jsonl')
+            call_command(
+                'export_notes', path, author=self.author.username,
+                stdout=io.StringIO(),
+            )
+            with open(path, encoding='utf-8') as file:
+                texts = [json.loads(line)['text'] for line in file]
+        self.assertIn(LONG_TEXT, texts)
@@ -0,0 +1,108 @@
+from http import HTTPStatus
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from notes.models import Note
+from notes.pagination import FORWARD, encode_cursor
+from .base_test import (
+    BaseTestCase, DELETE_NOTE_URL, NOTE_DETAIL_URL, NOTE_LIST_URL
+)
+
+# Запросы middleware аутентификации к сессии и пользователю.
+AUTH_TABLES = ('django_session', 'auth_user')
+
+
+class TestConditionalGet(BaseTestCase):
+    """Тестирование ответов 304 для страниц заметки и списка."""
+
+    def get(self, url, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.author_client.get(url, **headers)
+        own_queries = [
+            query['sql'] for query in queries
+            if not any(table in query['sql'] for table in AUTH_TABLES)
+        ]
+        return response, own_queries
+
+    def assert_not_modified(self, url, **headers):
+        response, queries = self.get(url, **headers)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(response.templates, [])
+        self.assertLessEqual(len(queries), 1)
+        for sql in queries:
+            self.assertNotIn('"text"', sql)
+        return response
+
+    def test_pages_send_validators(self):
+        for url in (NOTE_DETAIL_URL, NOTE_LIST_URL):
+            with self.subTest(url=url):
+                response, _ = self.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertRegex(response['ETag'], r'^"[0-9a-f]+"$')
+                self.assertIn('Last-Modified', response)
+                self.assertIn('private', response['Cache-Control'])
+
+    def test_matching_etag_gets_304_in_one_query(self):
+        for url in (NOTE_DETAIL_URL, NOTE_LIST_URL):
+            with self.subTest(url=url):
+                etag = self.get(url)[0]['ETag']
+                response = self.assert_not_modified(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response['ETag'], etag)
+
+    def test_if_modified_since_gets_304(self):
+        for url in (NOTE_DETAIL_URL, NOTE_LIST_URL):
+            with self.subTest(url=url):
+                last_modified = self.get(url)[0]['Last-Modified']
+                self.assert_not_modified(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified
+                )
+
+    def test_note_edit_changes_etags(self):
+        detail_etag = self.get(NOTE_DETAIL_URL)[0]['ETag']
+        list_etag = self.get(NOTE_LIST_URL)[0]['ETag']
+        self.note.title = 'Новый заголовок'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.note.save()
+        for url, etag in (
+            (NOTE_DETAIL_URL, detail_etag), (NOTE_LIST_URL, list_etag)
+        ):
+            with self.subTest(url=url):
+                response, _ = self.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_create_and_delete_change_list_etag(self):
+        etag = self.get(NOTE_LIST_URL)[0]['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Note.objects.create(
+                title='Ещё одна', text='Текст', author=self.author
+            )
+        created_etag = self.get(NOTE_LIST_URL)[0]['ETag']
+        self.assertNotEqual(created_etag, etag)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author_client.post(DELETE_NOTE_URL)
+        self.assertNotEqual(self.get(NOTE_LIST_URL)[0]['ETag'], created_etag)
+
+    def test_other_authors_changes_keep_list_etag(self):
+        etag = self.get(NOTE_LIST_URL)[0]['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Note.objects.create(
+                title='Чужая', text='Текст', author=self.not_author
+            )
+        self.assert_not_modified(NOTE_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+
+    def test_list_pages_have_different_etags(self):
+        first = self.get(NOTE_LIST_URL)[0]['ETag']
+        cursor = encode_cursor(FORWARD, self.note.id)
+        second = self.get(f'{NOTE_LIST_URL}?cursor={cursor}')[0]['ETag']
+        self.assertNotEqual(second, first)
+
+    def test_foreign_note_is_not_found_even_with_etag(self):
+        etag = self.get(NOTE_DETAIL_URL)[0]['ETag']
+        response = self.not_author_client.get(
+            NOTE_DETAIL_URL, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
@@ -1,5 +1,16 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
 from notes.forms import NoteForm
-from .base_test import NOTE_LIST_URL, EDIT_NOTE_URL, BaseTestCase, ADD_NOTE_URL
+from notes.models import Note
+from .base_test import (
+    ADD_NOTE_URL, EDIT_NOTE_URL, HOME_URL, LOGIN_URL, LOGOUT_URL,
+    NOTE_LIST_URL, SIGNUP_URL, BaseTestCase
+)
 
 
 class TestNoteViews(BaseTestCase):
@@ -27,12 +38,22 @@ class TestNoteViews(BaseTestCase):
         """
         notes = self.author_client.get(NOTE_LIST_URL).context['object_list']
         self.assertIn(self.note, notes)
-        note = notes.get(pk=self.note.pk)
+        note = notes[notes.index(self.note)]
         self.assertEqual(note.title, self.note.title)
         self.assertEqual(note.text, self.note.text)
         self.assertEqual(note.slug, self.note.slug)
         self.assertEqual(note.author, self.note.author)
 
+    def test_note_list_does_not_load_text(self):
+        """Список заметок не выбирает из базы текст заметок."""
+        with CaptureQueriesContext(connection) as queries:
+            self.author_client.get(NOTE_LIST_URL)
+        notes_queries = [
+            query['sql'] for query in queries if 'notes_note' in query['sql']
+        ]
+        self.assertEqual(len(notes_queries), 1)
+        self.assertNotIn('"notes_note"."text"', notes_queries[0])
+
     def test_non_author_note_list_does_not_contain_note(self):
         """
         Проверяет, что заметка автора не попадает в список заметок
@@ -42,3 +63,109 @@ class TestNoteViews(BaseTestCase):
             self.note,
             self.not_author_client.get(NOTE_LIST_URL).context['object_list']
         )
+
+
+@override_settings(NOTES_PER_PAGE=10)
+class TestNotesPagination(BaseTestCase):
+    """Тестирование курсорной пагинации списка заметок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Note.objects.bulk_create(
+            Note(
+                title=f'Заметка {index}',
+                text='Текст',
+                slug=f'note-{index}',
+                author=cls.author,
+            )
+            for index in range(24)
+        )
+        cls.expected_ids = list(
+            Note.objects.filter(author=cls.author)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+
+    def get_page(self, cursor=None):
+        data = {'cursor': cursor} if cursor else {}
+        return self.author_client.get(NOTE_LIST_URL, data).context['page_obj']
+
+    def test_pages_cover_all_notes_in_order(self):
+        """Проход по курсорам вперёд возвращает все заметки по порядку."""
+        page = self.get_page()
+        self.assertFalse(page.has_previous())
+        seen = [note.id for note in page]
+        while page.has_next():
+            page = self.get_page(page.next_cursor)
+            seen.extend(note.id for note in page)
+        self.assertEqual(seen, self.expected_ids)
+        self.assertFalse(page.has_next())
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Курсор «назад» возвращает ровно предыдущую страницу."""
+        first = self.get_page()
+        second = self.get_page(first.next_cursor)
+        back = self.get_page(second.previous_cursor)
+        self.assertEqual(
+            [note.id for note in back], [note.id for note in first]
+        )
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_deep_page_costs_same_queries(self):
+        """Число запросов не зависит от глубины страницы."""
+        first = self.get_page()
+        last_cursor = self.get_page(first.next_cursor).next_cursor
+        with CaptureQueriesContext(connection) as first_queries:
+            self.author_client.get(NOTE_LIST_URL)
+        with CaptureQueriesContext(connection) as deep_queries:
+            self.author_client.get(NOTE_LIST_URL, {'cursor': last_cursor})
+        self.assertEqual(len(deep_queries), len(first_queries))
+        self.assertNotIn('OFFSET', deep_queries[-1]['sql'])
+
+    def test_invalid_cursor_returns_404(self):
+        """Повреждённый курсор приводит к ошибке 404."""
+        for cursor in ('garbage', 'WyJ4IiwxXQ', '!!!'):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(
+                    self.author_client.get(
+                        NOTE_LIST_URL, {'cursor': cursor}
+                    ).status_code,
+                    HTTPStatus.NOT_FOUND
+                )
+
+
+class TestHeader(BaseTestCase):
+    """Шапка страницы кешируется отдельно для каждого пользователя."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_links_depend_on_authentication(self):
+        anonymous = Client().get(HOME_URL)
+        author = self.author_client.get(HOME_URL)
+        for url in (LOGIN_URL, SIGNUP_URL):
+            with self.subTest(url=url):
+                self.assertContains(anonymous, f'href="{url}"')
+                self.assertNotContains(author, f'href="{url}"')
+        for url in (NOTE_LIST_URL, ADD_NOTE_URL, LOGOUT_URL):
+            with self.subTest(url=url):
+                self.assertContains(author, f'href="{url}"')
+                self.assertNotContains(anonymous, f'href="{url}"')
+
+    def test_header_is_not_shared_between_users(self):
+        self.assertContains(
+            self.author_client.get(HOME_URL), self.author.username
+        )
+        response = self.not_author_client.get(HOME_URL)
+        self.assertContains(response, self.not_author.username)
+        self.assertNotContains(response, self.author.username)
+
+    def test_renamed_user_gets_new_header(self):
+        self.author_client.get(HOME_URL)
+        self.author.username = 'Переименованный'
+        self.author.save()
+        self.assertContains(
+            self.author_client.get(HOME_URL), 'Переименованный'
+        )
@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, transaction
+from django.test import SimpleTestCase, override_settings
+
+PROFILE_DB = 'profile'
+
+PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 1234,
+}
+
+
+@override_settings(SQLITE_PRAGMAS=PRAGMAS)
+class TestSQLiteProfile(SimpleTestCase):
+    """Тестирование PRAGMA и режима транзакций профиля production."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'profile.sqlite3')
+        connections.databases[PROFILE_DB] = {
+            'ENGINE': 'yanote.sqlite3',
+            'NAME': self.path,
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+        }
+
+    def tearDown(self):
+        connections[PROFILE_DB].close()
+        del connections[PROFILE_DB]
+        del connections.databases[PROFILE_DB]
+        self.tmpdir.cleanup()
+
+    def pragma(self, name):
+        with connections[PROFILE_DB].cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_to_new_connection(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 1234)
+
+    def test_transaction_takes_write_lock_at_begin(self):
+        with transaction.atomic(using=PROFILE_DB):
+            # Транзакция ещё ничего не писала, но другой писатель уже
+            # не может начать свою.
+            connections[PROFILE_DB].cursor().execute('SELECT 1')
+            other = sqlite3.connect(self.path, timeout=0)
+            try:
+                with self.assertRaisesMessage(
+                    sqlite3.OperationalError, 'locked'
+                ):
+                    other.execute('BEGIN IMMEDIATE')
+            finally:
+                other.close()
+
+    def test_unknown_transaction_mode(self):
+        connections.databases[PROFILE_DB]['OPTIONS'] = {
+            'transaction_mode': 'LAZY'
+        }
+        with self.assertRaises(ImproperlyConfigured):
+            with transaction.atomic(using=PROFILE_DB):
+                pass
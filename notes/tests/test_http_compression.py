@@ -0,0 +1,106 @@
+import gzip
+import json
+from http import HTTPStatus
+from unittest import mock
+
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from notes.middleware import accepted_encodings
+from notes.models import ApiToken, Note
+from .base_test import BaseTestCase, NOTE_DETAIL_URL, NOTE_LIST_URL
+
+API_LIST_URL = reverse('notes:api-list')
+
+
+class FakeBrotli:
+    """Заменитель модуля brotli: его нет в зависимостях."""
+
+    @staticmethod
+    def compress(content, quality):
+        return b'br:' + gzip.compress(content)
+
+
+class TestCompressionMiddleware(BaseTestCase):
+    """Тестирование сжатия ответов HTML и JSON."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Note.objects.bulk_create(
+            Note(
+                title=f'Заметка {index}', text='Текст', slug=f'note-{index}',
+                author=cls.author,
+            )
+            for index in range(30)
+        )
+
+    def get(self, url, client=None, **headers):
+        return (client or self.author_client).get(url, **headers)
+
+    def test_html_gzip(self):
+        plain = self.get(NOTE_LIST_URL)
+        response = self.get(NOTE_LIST_URL, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(
+            int(response['Content-Length']), len(response.content)
+        )
+        self.assertLess(len(response.content), len(plain.content))
+
+    def test_json_gzip(self):
+        key = ApiToken.objects.issue(self.author, 'tests')
+        client = Client(HTTP_AUTHORIZATION=f'Token {key}')
+        response = self.get(
+            API_LIST_URL, client, HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        body = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(body['results']), 31)
+
+    def test_brotli_preferred(self):
+        with mock.patch('notes.middleware.brotli', FakeBrotli):
+            response = self.get(
+                NOTE_LIST_URL, HTTP_ACCEPT_ENCODING='gzip, br'
+            )
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertTrue(response.content.startswith(b'br:'))
+
+    def test_not_compressed(self):
+        cases = (
+            ('без Accept-Encoding', {}, {}),
+            ('gzip с q=0', {'HTTP_ACCEPT_ENCODING': 'gzip;q=0'}, {}),
+            (
+                'меньше порога', {'HTTP_ACCEPT_ENCODING': 'gzip'},
+                {'NOTES_COMPRESS_MIN_SIZE': 10 ** 6},
+            ),
+            (
+                'тип не из списка', {'HTTP_ACCEPT_ENCODING': 'gzip'},
+                {'NOTES_COMPRESS_TYPES': ('application/json',)},
+            ),
+        )
+        for name, headers, overrides in cases:
+            with self.subTest(name), override_settings(**overrides):
+                response = self.get(NOTE_LIST_URL, **headers)
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertIn(b'<html>', response.content)
+
+    @override_settings(NOTES_COMPRESS_MIN_SIZE=0)
+    def test_etag_weak_and_conditional_get(self):
+        response = self.get(NOTE_DETAIL_URL, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        response = self.get(
+            NOTE_DETAIL_URL, HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_accepted_encodings(self):
+        self.assertEqual(
+            accepted_encodings('gzip;q=0.5, BR, identity;q=0, x;q=bad'),
+            {'gzip', 'br'},
+        )
+        self.assertEqual(accepted_encodings(''), set())
@@ -1,4 +1,5 @@
 from http import HTTPStatus
+from unittest import mock
 
 from pytils.translit import slugify
 
@@ -9,7 +10,7 @@ from .base_test import (
     EDIT_NOTE_URL,
     SUCCESS_URL
 )
-from notes.forms import WARNING
+from notes.forms import WARNING, NoteForm
 from notes.models import Note
 
 
@@ -43,6 +44,22 @@ class TestNoteManagement(BaseTestCase):
         notes_after = list(Note.objects.order_by('pk'))
         self.assertEqual(notes_after, notes_before)
 
+    def test_slug_taken_concurrently(self):
+        """
+        Проверка гонки за slug.
+        Если slug заняли уже после проверки формы, база отвергает
+        заметку, а пользователь видит ту же ошибку формы вместо 500.
+        """
+        self.note_data['slug'] = self.note.slug
+        with mock.patch.object(
+            NoteForm, 'clean_slug', lambda form: form.cleaned_data['slug']
+        ):
+            response = self.author_client.post(ADD_NOTE_URL, self.note_data)
+        self.assertFormError(
+            response, 'form', 'slug', f'{self.note.slug}{WARNING}'
+        )
+        self.assertEqual(Note.objects.filter(slug=self.note.slug).count(), 1)
+
     def test_auto_generate_slug_when_absent(self):
         """
         Проверка автоматической генерации слага, если он не указан.
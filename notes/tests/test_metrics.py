@@ -0,0 +1,111 @@
+import os
+import tempfile
+import threading
+from http import HTTPStatus
+
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from notes import metrics
+from .base_test import BaseTestCase, NOTE_LIST_URL, User
+
+METRICS_URL = reverse('notes:metrics')
+
+
+class TestMetrics(BaseTestCase):
+    """Тестирование сбора и выгрузки метрик запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.staff = User.objects.create(username='Staff', is_staff=True)
+        cls.staff_client = Client()
+        cls.staff_client.force_login(cls.staff)
+
+    def setUp(self):
+        metrics.registry.clear()
+
+    def test_request_is_measured(self):
+        response = self.author_client.get(NOTE_LIST_URL)
+        series = metrics.registry.snapshot()['notes:list']
+        self.assertEqual(series.count, 1)
+        self.assertGreater(series.queries, 0)
+        self.assertGreater(series.query_seconds, 0)
+        self.assertGreater(series.render_seconds, 0)
+        self.assertEqual(series.response_bytes, len(response.content))
+
+    async def test_asgi_sync_view_queries(self):
+        """Под ASGI запросы синхронного представления тоже учитываются."""
+        client = AsyncClient()
+        await sync_to_async(client.force_login)(self.author)
+        wsgi_get = sync_to_async(self.author_client.get)
+        # Прогрев: кеши сессии и пользователя.
+        await client.get(NOTE_LIST_URL)
+        await wsgi_get(NOTE_LIST_URL)
+        metrics.registry.clear()
+        await client.get(NOTE_LIST_URL)
+        asgi = metrics.registry.snapshot()['notes:list']
+        metrics.registry.clear()
+        await wsgi_get(NOTE_LIST_URL)
+        wsgi = metrics.registry.snapshot()['notes:list']
+        self.assertGreater(asgi.queries, 0)
+        self.assertEqual(asgi.queries, wsgi.queries)
+
+    def test_prometheus_endpoint(self):
+        self.author_client.get(NOTE_LIST_URL)
+        response = self.staff_client.get(METRICS_URL)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        text = response.content.decode()
+        self.assertIn(
+            'yanote_request_duration_seconds_bucket'
+            '{view="notes:list",le="+Inf"} 1',
+            text,
+        )
+        self.assertIn(
+            'yanote_request_duration_seconds_count{view="notes:list"} 1',
+            text,
+        )
+        self.assertIn('yanote_request_db_queries_total{view="notes:list"}',
+                      text)
+
+    def test_endpoint_is_staff_only(self):
+        self.assertEqual(
+            self.author_client.get(METRICS_URL).status_code,
+            HTTPStatus.FORBIDDEN,
+        )
+        self.assertEqual(
+            Client().get(METRICS_URL).status_code, HTTPStatus.FOUND
+        )
+
+    @override_settings(NOTES_SLOW_REQUEST_MS=0)
+    def test_slow_request_logs_sql(self):
+        with self.assertLogs('notes.metrics', 'WARNING') as logs:
+            self.author_client.get(NOTE_LIST_URL)
+        self.assertIn('notes:list', logs.output[0])
+        self.assertIn('"notes_note"', logs.output[0])
+
+    def test_counters_of_all_threads_are_summed(self):
+        record = metrics.RequestRecord()
+
+        def observe():
+            metrics.registry.observe('view', 0.001, record, 10)
+
+        threads = [threading.Thread(target=observe) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        observe()
+        series = metrics.registry.snapshot()['view']
+        self.assertEqual(series.count, 5)
+        self.assertEqual(series.response_bytes, 50)
+
+    def test_flush_to_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'yanote-{pid}.prom')
+            metrics.registry.next_flush = 0.0
+            with override_settings(NOTES_METRICS_FILE=path):
+                self.author_client.get(NOTE_LIST_URL)
+            with open(path.format(pid=os.getpid()), encoding='utf-8') as file:
+                self.assertIn('view="notes:list"', file.read())
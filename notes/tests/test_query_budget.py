@@ -0,0 +1,133 @@
+import json
+
+from django.test import Client, RequestFactory, override_settings
+from django.urls import reverse
+
+from notes import urls
+from notes.middleware import QueryBudgetMiddleware
+from notes.models import ApiToken, Note
+from notes.query_budget import (
+    ROUTE_BUDGETS, QueryBudget, QueryBudgetExceeded, route_budget
+)
+from .base_test import BaseTestCase, NOTE_SLUG, User
+
+
+class TestRouteBudgets(BaseTestCase):
+    """Маршруты notes.urls укладываются в объявленные бюджеты запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.staff = User.objects.create(username='Staff', is_staff=True)
+        cls.key = ApiToken.objects.issue(cls.author, 'tests')
+
+    def setUp(self):
+        self.api = Client(HTTP_AUTHORIZATION=f'Token {self.key}')
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+        # Бюджеты — для сессии и пользователя, которые уже в кеше.
+        for client in (self.author_client, self.staff_client):
+            client.get(reverse('notes:success'))
+
+    def assert_budget(self, name, method='GET', args=(), data=None,
+                      client=None):
+        url = reverse(f'notes:{name}', args=args)
+        if client is None:
+            client = self.api if name.startswith('api') else self.author_client
+        with self.subTest(route=name, method=method):
+            with route_budget(f'notes:{name}', method):
+                if client is self.api and method != 'GET':
+                    response = getattr(client, method.lower())(
+                        url, json.dumps(data or {}),
+                        content_type='application/json',
+                    )
+                else:
+                    response = getattr(client, method.lower())(url, data)
+            self.assertLess(response.status_code, 400)
+
+    def test_every_route_has_budget(self):
+        names = {
+            f'{urls.app_name}:{pattern.name}'
+            for pattern in urls.urlpatterns
+        }
+        self.assertEqual(names, set(ROUTE_BUDGETS))
+
+    def test_pages(self):
+        self.assert_budget('home')
+        self.assert_budget('add')
+        self.assert_budget('edit', args=[NOTE_SLUG])
+        self.assert_budget('detail', args=[NOTE_SLUG])
+        self.assert_budget('revisions', args=[NOTE_SLUG])
+        self.assert_budget('revision', args=[NOTE_SLUG, 1])
+        self.assert_budget('delete', args=[NOTE_SLUG])
+        self.assert_budget('list')
+        self.assert_budget('search', data={'q': 'тестовая'})
+        self.assert_budget('tags')
+        self.assert_budget('folders')
+        self.assert_budget('folder-add')
+        self.assert_budget('success')
+        self.assert_budget('metrics', client=self.staff_client)
+
+    def test_page_writes(self):
+        self.assert_budget('add', 'POST', data={'title': 'Т', 'text': 'Т'})
+        self.assert_budget(
+            'edit', 'POST', args=[NOTE_SLUG],
+            data={'title': 'Т', 'text': 'Т', 'slug': NOTE_SLUG},
+        )
+        self.assert_budget('revision', 'POST', args=[NOTE_SLUG, 1])
+        self.assert_budget('folder-add', 'POST', data={'name': 'Папка'})
+        self.assert_budget('delete', 'POST', args=[NOTE_SLUG])
+
+    def test_api(self):
+        self.assert_budget('api-list')
+        self.assert_budget('api-detail', args=[NOTE_SLUG])
+        self.assert_budget('api-lookup', 'POST', data={'slugs': [NOTE_SLUG]})
+        self.assert_budget(
+            'api-list', 'POST', data={'title': 'Т', 'text': 'Т'}
+        )
+        self.assert_budget(
+            'api-batch', 'POST',
+            data={'create': [{'title': 'Т', 'text': 'Т'}]},
+        )
+        self.assert_budget(
+            'api-detail', 'PATCH', args=[NOTE_SLUG], data={'title': 'Т'}
+        )
+        self.assert_budget('api-detail', 'DELETE', args=[NOTE_SLUG])
+
+
+class TestQueryBudget(BaseTestCase):
+    """Тестирование самого QueryBudget и предупреждений в DEBUG."""
+
+    def test_too_many_queries(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'бюджете 1'):
+            with QueryBudget(1):
+                Note.objects.count()
+                User.objects.count()
+
+    def test_repeated_query_is_n_plus_one(self):
+        @QueryBudget()
+        def titles():
+            return [
+                Note.objects.get(pk=pk).title
+                for pk in Note.objects.values_list('pk', flat=True)
+            ]
+
+        Note.objects.create(title='Вторая', text='Т', author=self.author)
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'N+1'):
+            titles()
+
+    @override_settings(DEBUG=True)
+    def test_middleware_warns_in_debug(self):
+        request = RequestFactory().get('/')
+
+        def view(request):
+            request.resolver_match = type(
+                'Match', (), {'view_name': 'notes:home'}
+            )
+            for _ in range(5):
+                Note.objects.count()
+
+        with self.assertLogs('notes.query_budget', 'WARNING') as logs:
+            QueryBudgetMiddleware(view)(request)
+        self.assertIn('бюджете 1', logs.output[0])
+        self.assertIn('повторён 5 раз', logs.output[0])
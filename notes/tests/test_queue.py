@@ -0,0 +1,224 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from notes import queue
+from notes.models import Note, NoteRevision, Task, TransferCheckpoint
+from notes.queue import Worker, claim, enqueue
+from notes.revisions import (
+    SNAPSHOTS_TASK, get_revision, record_snapshots_later
+)
+from .base_test import BaseTestCase
+
+COUNT_TASK = 'tests.count'
+
+
+class WorkerCrash(BaseException):
+    """Процесс прервался посреди пачки: исключение не ловит Worker."""
+
+
+@queue.task(COUNT_TASK)
+def count(payload, using):
+    if payload.get('crash'):
+        raise WorkerCrash
+    if payload.get('fail'):
+        raise ValueError('Ошибка задачи.')
+    TransferCheckpoint.objects.using(using).filter(
+        name=payload['name']
+    ).update(position=F('position') + 1)
+
+
+def later(seconds=3600):
+    """Подменяет время очереди: срок видимости взятых задач истёк."""
+    return mock.patch(
+        'notes.queue.timezone.now',
+        return_value=timezone.now() + timedelta(seconds=seconds),
+    )
+
+
+class QueueTestCase(TestCase):
+
+    def enqueue(self, count, **payload):
+        names = [f'task-{index}' for index in range(count)]
+        TransferCheckpoint.objects.bulk_create(
+            TransferCheckpoint(name=name) for name in names
+        )
+        for name in names:
+            enqueue(COUNT_TASK, {'name': name, **payload})
+        return names
+
+    def assert_done_once(self, names):
+        self.assertEqual(
+            dict(
+                TransferCheckpoint.objects.filter(name__in=names)
+                .values_list('name', 'position')
+            ),
+            dict.fromkeys(names, 1),
+        )
+        self.assertFalse(Task.objects.exists())
+
+
+class TestQueue(QueueTestCase):
+    """Очередь задач: ровно одно выполнение, повторы, порядок."""
+
+    def test_crashed_batch_runs_once(self):
+        names = self.enqueue(10)
+        Task.objects.filter(pk=Task.objects.all()[5].pk).update(
+            payload={'crash': True}
+        )
+        with self.assertRaises(WorkerCrash):
+            Worker(batch_size=20).run()
+        # Пачка откатилась целиком, задачи ещё заняты упавшим процессом.
+        self.assertEqual(Task.objects.count(), 10)
+        self.assertEqual(Worker().run(), 0)
+        Task.objects.filter(payload={'crash': True}).update(
+            payload={'name': names[5]}
+        )
+        with later():
+            self.assertEqual(Worker(batch_size=3).run(), 10)
+        self.assert_done_once(names)
+
+    def test_late_worker_does_not_repeat(self):
+        names = self.enqueue(5)
+        slow = claim(10)
+        with later():
+            Worker().run()
+        worker = Worker()
+        for task in slow:
+            worker.run_task(task)
+        self.assert_done_once(names)
+
+    @override_settings(NOTES_TASK_MAX_ATTEMPTS=3, NOTES_TASK_RETRY_DELAY=0)
+    def test_retries_then_failed(self):
+        names = self.enqueue(3)
+        enqueue(COUNT_TASK, {'fail': True})
+        with self.assertLogs('notes.queue', 'ERROR') as logs:
+            self.assertEqual(Worker().run(), 4 + 2)
+        self.assertIn('больше не повторяется', logs.output[-1])
+        task = Task.objects.get()
+        self.assertEqual((task.attempts, task.failed), (3, True))
+        self.assertIn('Ошибка задачи.', task.error)
+        # Ошибка одной задачи не откатывает остальные задачи пачки.
+        self.assertEqual(
+            set(
+                TransferCheckpoint.objects.filter(name__in=names)
+                .values_list('position', flat=True)
+            ),
+            {1},
+        )
+
+    @override_settings(NOTES_TASK_RETRY_DELAY=60)
+    def test_retry_is_delayed(self):
+        enqueue(COUNT_TASK, {'fail': True})
+        with self.assertLogs('notes.queue', 'ERROR'):
+            self.assertEqual(Worker().run(), 1)
+        with later(59):
+            self.assertEqual(claim(10), [])
+        with later(61):
+            self.assertEqual(len(claim(10)), 1)
+
+    @override_settings(NOTES_TASK_MAX_ATTEMPTS=2)
+    def test_task_that_always_crashes_fails(self):
+        self.enqueue(1)
+        for hours in (1, 2):
+            with later(hours * 3600):
+                claim(10)
+        with later(3 * 3600), self.assertLogs('notes.queue', 'ERROR'):
+            Worker().run()
+        self.assertTrue(Task.objects.get().failed)
+        self.assertEqual(TransferCheckpoint.objects.get().position, 0)
+
+    def test_same_key_runs_in_order(self):
+        for index in range(3):
+            enqueue(COUNT_TASK, {'name': f'a-{index}'}, key='a')
+        enqueue(COUNT_TASK, {'name': 'b'}, key='b')
+        enqueue(COUNT_TASK, {'name': 'c'})
+        self.assertEqual(
+            [task.payload['name'] for task in claim(10)], ['a-0', 'b', 'c']
+        )
+        self.assertEqual(claim(10), [])
+
+    def test_unknown_task(self):
+        with self.assertRaises(ValueError):
+            enqueue('tests.unknown', {})
+
+    def test_command(self):
+        names = self.enqueue(3)
+        output = StringIO()
+        call_command('run_workers', until_empty=True, stdout=output)
+        self.assertIn('3', output.getvalue())
+        self.assert_done_once(names)
+
+
+class TestQueueThroughput(QueueTestCase):
+    """Пачки: одна выборка на пачку и постоянное число запросов на задачу."""
+
+    def test_batches(self):
+        names = self.enqueue(200)
+        with mock.patch('notes.queue.claim', wraps=claim) as claims:
+            self.assertEqual(Worker(batch_size=50).run(), 200)
+        # Четыре пачки и одна пустая выборка.
+        self.assertEqual(claims.call_count, 5)
+        self.assert_done_once(names)
+
+    def test_queries_per_task(self):
+        # На пачку: выборка, чтение взятых задач, начало и конец
+        # транзакции; на задачу: начало и конец точки сохранения,
+        # удаление и действие. В конце — пустая выборка.
+        for batch in (10, 50):
+            with self.subTest(batch=batch):
+                self.enqueue(batch)
+                with self.assertNumQueries(4 + 4 * batch + 1):
+                    Worker(batch_size=batch).run()
+                TransferCheckpoint.objects.all().delete()
+
+
+@override_settings(NOTES_TASK_QUEUE=True, NOTES_REVISION_SNAPSHOT_EVERY=3)
+class TestQueuedRevisions(BaseTestCase):
+    """Версии заметок через очередь задач."""
+
+    def test_every_save_is_recorded_in_order(self):
+        texts = [self.note.text, 'Второй текст', 'Третий текст']
+        for text in texts[1:]:
+            self.note.text = text
+            self.note.save()
+        # Первую версию тоже записывает задача.
+        self.assertFalse(self.note.revisions.exists())
+        self.assertEqual(Task.objects.count(), 3)
+        Worker().run()
+        for number, text in enumerate(texts, start=1):
+            with self.subTest(number=number):
+                self.assertEqual(get_revision(self.note, number).text, text)
+
+    def test_deleted_note(self):
+        note = Note.objects.create(title='Т', text='Т', author=self.author)
+        note.delete()
+        Worker().run()
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(NoteRevision.objects.filter(note_id=note.pk).exists())
+
+    def test_bulk_created_notes(self):
+        notes = Note.objects.bulk_create([
+            Note(title='Пачка', text=f'Текст {index}', slug=f'bulk-{index}',
+                 author=self.author)
+            for index in range(3)
+        ])
+        record_snapshots_later(notes)
+        # Одна задача на пачку, версии пишутся только в ней.
+        self.assertEqual(Task.objects.filter(name=SNAPSHOTS_TASK).count(), 1)
+        self.assertFalse(
+            NoteRevision.objects.filter(note__slug__startswith='bulk-')
+            .exists()
+        )
+        Note.objects.filter(slug='bulk-2').delete()
+        Worker().run()
+        self.assertFalse(Task.objects.exists())
+        for index in range(2):
+            with self.subTest(index=index):
+                note = Note.objects.get(slug=f'bulk-{index}')
+                self.assertEqual(get_revision(note, 1).text, f'Текст {index}')
@@ -0,0 +1,119 @@
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from notes.models import Note, NoteRevision
+from notes.revisions import (
+    apply_delta, get_revision, make_delta, record_snapshots
+)
+from .base_test import BaseTestCase, EDIT_NOTE_URL, NOTE_SLUG, SUCCESS_URL
+
+REVISIONS_URL = reverse('notes:revisions', args=[NOTE_SLUG])
+
+
+def revision_url(number):
+    return reverse('notes:revision', args=[NOTE_SLUG, number])
+
+
+class TestDelta(SimpleTestCase):
+    """Правка восстанавливает текст в точности."""
+
+    def test_round_trip(self):
+        cases = (
+            ('', 'Новый текст'),
+            ('Старый текст', ''),
+            ('один два три', 'один четыре три'),
+            ('  отступ\nи строки\n\n', 'отступ\n  и строки  \n'),
+            ('а б в г д', 'г д а б в'),
+        )
+        for old, new in cases:
+            with self.subTest(old=old, new=new):
+                self.assertEqual(apply_delta(old, make_delta(old, new)), new)
+
+
+@override_settings(NOTES_REVISION_SNAPSHOT_EVERY=3)
+class TestRevisions(BaseTestCase):
+    """История версий заметки."""
+
+    def edit(self, text, title='Тестовая заметка'):
+        self.note.title, self.note.text = title, text
+        self.note.save()
+
+    def test_every_change_is_recorded(self):
+        # Текст длинный, чтобы правка была короче полного текста.
+        texts = [' '.join(f'слово{index}' for index in range(100))]
+        self.note = Note.objects.create(
+            title='Длинная', text=texts[0], author=self.author
+        )
+        for index in range(7):
+            texts.append(f'{texts[-1]} ещё {index}')
+            self.edit(texts[-1], title='Длинная')
+        revisions = list(self.note.revisions.all())
+        self.assertEqual([r.number for r in revisions], list(range(1, 9)))
+        # Полный текст не реже чем раз в три версии.
+        self.assertEqual(
+            [r.number for r in revisions if r.is_snapshot], [1, 4, 7]
+        )
+        for number, text in enumerate(texts, start=1):
+            with self.subTest(number=number):
+                with self.assertNumQueries(1):
+                    self.assertEqual(
+                        get_revision(self.note, number).text, text
+                    )
+
+    def test_unchanged_save_is_not_recorded(self):
+        self.note.save()
+        self.assertEqual(self.note.revisions.count(), 1)
+
+    def test_title_change_is_recorded(self):
+        self.edit(self.note.text, title='Новый заголовок')
+        self.assertEqual(get_revision(self.note, 2).title, 'Новый заголовок')
+
+    def test_bulk_created_notes(self):
+        notes = Note.objects.bulk_create([
+            Note(title='Пачка', text='Текст', slug=f'bulk-{index}',
+                 author=self.author)
+            for index in range(3)
+        ])
+        record_snapshots(notes)
+        for note in Note.objects.filter(slug__startswith='bulk-'):
+            self.assertEqual(get_revision(note, 1).text, 'Текст')
+
+
+class TestRevisionViews(BaseTestCase):
+    """Страницы истории и восстановление версии."""
+
+    def test_list(self):
+        self.author_client.post(EDIT_NOTE_URL, {
+            'title': 'Т', 'text': 'Новый текст', 'slug': NOTE_SLUG,
+        })
+        response = self.author_client.get(REVISIONS_URL)
+        self.assertEqual(
+            [revision.number for revision in response.context['object_list']],
+            [1, 2],
+        )
+
+    def test_restore(self):
+        old_text = self.note.text
+        self.author_client.post(EDIT_NOTE_URL, {
+            'title': 'Т', 'text': 'Новый текст', 'slug': NOTE_SLUG,
+        })
+        response = self.author_client.get(revision_url(1))
+        self.assertEqual(response.context['revision'].text, old_text)
+        response = self.author_client.post(revision_url(1))
+        self.assertRedirects(response, SUCCESS_URL)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.text, old_text)
+        # Восстановление — новая версия, история не теряется.
+        self.assertEqual(
+            NoteRevision.objects.filter(note=self.note).count(), 3
+        )
+
+    def test_not_found(self):
+        cases = (
+            (REVISIONS_URL, self.not_author_client),
+            (revision_url(1), self.not_author_client),
+            (revision_url(2), self.author_client),
+        )
+        for url, client in cases:
+            with self.subTest(url=url):
+                self.assertEqual(client.get(url).status_code, 404)
@@ -0,0 +1,137 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import DEFAULT_DB_ALIAS, OperationalError
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import resolve
+
+from notes import routers
+from notes.models import Note, TransferCheckpoint
+from notes.routers import ReplicaMiddleware, ReplicaRouter
+from .base_test import ADD_NOTE_URL, NOTE_LIST_URL, SUCCESS_URL, User
+
+COOKIE = 'yanote_primary'
+
+# Отставание реплик для проверки здоровья: секунды или исключение.
+LAGS = {}
+
+
+def replica_lag(alias):
+    lag = LAGS[alias]
+    if isinstance(lag, Exception):
+        raise lag
+    return lag
+
+
+@override_settings(
+    NOTES_REPLICAS=('replica',),
+    NOTES_REPLICA_LAG='notes.tests.test_routers.replica_lag',
+    NOTES_REPLICA_MAX_LAG=2,
+    NOTES_REPLICA_CHECK_INTERVAL=1,
+    NOTES_REPLICA_STICKY_COOKIE=COOKIE,
+)
+class TestReplicaRouting(TestCase):
+    """Чтение с реплик, запись и чтение своих записей — в основную базу."""
+
+    def setUp(self):
+        routers._health.clear()
+        LAGS.clear()
+        LAGS['replica'] = 0
+        self.factory = RequestFactory()
+
+    def request(self, path, method='get', view=None, **cookies):
+        """Прогоняет запрос через ReplicaMiddleware, возвращает ответ."""
+        request = getattr(self.factory, method)(path)
+        request.COOKIES.update(cookies)
+        request.resolver_match = resolve(path)
+
+        def get_response(request):
+            if view is not None:
+                view()
+            response = HttpResponse()
+            response.read_db = ReplicaRouter().db_for_read(Note)
+            return response
+
+        return ReplicaMiddleware(get_response)(request)
+
+    def test_read_routes(self):
+        cases = (
+            (NOTE_LIST_URL, 'get', 'replica'),
+            (NOTE_LIST_URL, 'head', 'replica'),
+            (NOTE_LIST_URL, 'post', DEFAULT_DB_ALIAS),
+            (ADD_NOTE_URL, 'get', DEFAULT_DB_ALIAS),
+            (SUCCESS_URL, 'get', DEFAULT_DB_ALIAS),
+        )
+        for path, method, alias in cases:
+            with self.subTest(path=path, method=method):
+                self.assertEqual(
+                    self.request(path, method).read_db, alias
+                )
+
+    def test_write_sets_cookie(self):
+        response = self.request(
+            ADD_NOTE_URL, 'post',
+            view=lambda: TransferCheckpoint.objects.create(name='write'),
+        )
+        self.assertEqual(response.cookies[COOKIE]['max-age'], 5)
+        self.assertTrue(response.cookies[COOKIE]['httponly'])
+
+    def test_get_or_create_that_reads_is_not_write(self):
+        def view():
+            TransferCheckpoint.objects.get_or_create(name='read')
+
+        self.assertIn(COOKIE, self.request(NOTE_LIST_URL, view=view).cookies)
+        self.assertNotIn(
+            COOKIE, self.request(NOTE_LIST_URL, view=view).cookies
+        )
+
+    def test_cookie_reads_primary(self):
+        response = self.request(NOTE_LIST_URL, **{COOKIE: '1'})
+        self.assertEqual(response.read_db, DEFAULT_DB_ALIAS)
+
+    def test_unhealthy_replica(self):
+        for lag in (3, float('inf'), OperationalError('Нет соединения.')):
+            with self.subTest(lag=lag):
+                routers._health.clear()
+                LAGS['replica'] = lag
+                with self.assertLogs('notes.routers', 'WARNING'):
+                    response = self.request(NOTE_LIST_URL)
+                self.assertEqual(response.read_db, DEFAULT_DB_ALIAS)
+
+    def test_health_is_cached(self):
+        with mock.patch('notes.routers.time.monotonic', return_value=100):
+            self.request(NOTE_LIST_URL)
+        LAGS['replica'] = 3
+        with mock.patch('notes.routers.time.monotonic', return_value=100.5):
+            self.assertEqual(self.request(NOTE_LIST_URL).read_db, 'replica')
+        with mock.patch('notes.routers.time.monotonic', return_value=101):
+            with self.assertLogs('notes.routers', 'WARNING'):
+                response = self.request(NOTE_LIST_URL)
+        self.assertEqual(response.read_db, DEFAULT_DB_ALIAS)
+
+    def test_async_views_see_route(self):
+        request = self.factory.get(NOTE_LIST_URL)
+        request.resolver_match = resolve(NOTE_LIST_URL)
+
+        async def get_response(request):
+            response = HttpResponse()
+            response.read_db = await sync_to_async(
+                ReplicaRouter().db_for_read
+            )(Note)
+            return response
+
+        response = async_to_sync(ReplicaMiddleware(get_response))(request)
+        self.assertEqual(response.read_db, 'replica')
+
+    def test_outside_request(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Note), DEFAULT_DB_ALIAS)
+        self.assertTrue(router.allow_migrate(DEFAULT_DB_ALIAS, 'notes'))
+        self.assertFalse(router.allow_migrate('replica', 'notes'))
+
+    def test_notes_version_lag(self):
+        self.assertEqual(routers.notes_version_lag(DEFAULT_DB_ALIAS), 0)
+        # Строку AuthorNotesVersion создаёт сигнал.
+        User.objects.create(username='author')
+        self.assertEqual(routers.notes_version_lag(DEFAULT_DB_ALIAS), 0)
@@ -0,0 +1,192 @@
+import sqlite3
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes.models import Note
+from notes.search import get_backend
+from notes.search.base import parse_query
+from notes.search.simple import SimpleSearchBackend
+from notes.search.sqlite import (
+    TABLE, ensure_schema, match_expression, schema_statements
+)
+from .base_test import BaseTestCase, NOTE_LIST_URL
+
+SEARCH_URL = reverse('notes:search')
+
+
+class TestParseQuery(TestCase):
+    """Тестирование разбора поискового запроса."""
+
+    def test_terms_have_stem_and_transliteration(self):
+        self.assertEqual(
+            parse_query('Заметки про Ёлку'),
+            [('заметк', 'zametk'), ('про', 'pro'), ('елк', 'elk')],
+        )
+
+    def test_latin_word_gets_cyrillic_variant(self):
+        self.assertEqual(parse_query('zametka'), [('zametka', 'заметк')])
+
+    def test_punctuation_and_short_words_are_ignored(self):
+        self.assertEqual(parse_query('"* и - OR'), [('or', 'ор')])
+        self.assertEqual(parse_query('   '), [])
+
+    def test_prefixes_match_indexed_lengths(self):
+        self.assertEqual(
+            match_expression(7, parse_query('по заметки')),
+            'author : a7 AND ("по" OR "po") AND ("заметк"* OR "zametk"*)',
+        )
+        self.assertEqual(
+            match_expression(7, parse_query('zametochka'), column='title'),
+            'author : a7 AND title : ("zameto"* OR "замето"*)',
+        )
+
+
+class TestNoteSearch(BaseTestCase):
+    """Тестирование поиска по заметкам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.in_title = Note.objects.create(
+            title='Ёлочные игрушки', text='Купить шары.', author=cls.author
+        )
+        cls.in_text = Note.objects.create(
+            title='Покупки', text='Ёлочные гирлянды и свечи.',
+            author=cls.author,
+        )
+        cls.translit = Note.objects.create(
+            title='Spisok del', text='Zametka latinicey.', author=cls.author
+        )
+        cls.foreign = Note.objects.create(
+            title='Ёлочные игрушки соседа', text='Чужое.',
+            author=cls.not_author,
+        )
+
+    def search(self, query, client=None):
+        response = (client or self.author_client).get(
+            SEARCH_URL, {'q': query}
+        )
+        self.assertEqual(response.status_code, 200)
+        return list(response.context['object_list'])
+
+    def test_ranks_title_matches_first(self):
+        self.assertEqual(
+            self.search('елочная'), [self.in_title, self.in_text]
+        )
+
+    def test_finds_other_word_forms(self):
+        self.assertEqual(self.search('игрушка'), [self.in_title])
+        self.assertEqual(self.search('гирлянд свечами'), [self.in_text])
+
+    def test_finds_transliterated_text(self):
+        self.assertEqual(self.search('список'), [self.translit])
+        self.assertEqual(
+            self.search('zametki'), [self.note, self.translit]
+        )
+
+    def test_other_authors_notes_are_not_found(self):
+        self.assertEqual(
+            self.search('соседа'), [],
+        )
+        self.assertEqual(
+            self.search('игрушки', self.not_author_client), [self.foreign]
+        )
+
+    def test_index_follows_updates_and_deletes(self):
+        self.in_text.text = 'Мандарины.'
+        self.in_text.save()
+        self.assertEqual(self.search('гирлянды'), [])
+        self.assertEqual(self.search('мандарин'), [self.in_text])
+        self.in_title.delete()
+        self.assertEqual(self.search('игрушки'), [])
+
+    def test_bulk_created_notes_are_indexed(self):
+        Note.objects.bulk_create([
+            Note(title='Импорт', text='Пачка заметок', slug='bulk',
+                 author=self.author),
+        ])
+        self.assertEqual(
+            [note.slug for note in self.search('пачка')], ['bulk']
+        )
+
+    def test_results_do_not_load_text(self):
+        note = self.search('игрушки')[0]
+        self.assertIn('text', note.get_deferred_fields())
+
+    def test_empty_query_shows_nothing(self):
+        self.assertEqual(self.search(''), [])
+
+    def test_anonymous_is_redirected_to_login(self):
+        response = self.client.get(SEARCH_URL, {'q': 'игрушки'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_list_page_has_search_form(self):
+        response = self.author_client.get(NOTE_LIST_URL)
+        self.assertContains(response, f'action="{SEARCH_URL}"')
+
+    def test_sqlite_schema_is_restored(self):
+        """Пропавший триггер пересоздаётся, индекс строится заново."""
+        if connection.vendor != 'sqlite':
+            self.skipTest('Триггеры FTS5 есть только в SQLite.')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {TABLE}_ai')
+        Note.objects.create(
+            title='Без триггера', text='Пропущенная', author=self.author
+        )
+        self.assertEqual(self.search('пропущенная'), [])
+        ensure_schema(connection.alias)
+        self.assertEqual(len(self.search('пропущенная')), 1)
+        self.assertEqual(
+            self.search('елочная'), [self.in_title, self.in_text]
+        )
+
+    def test_triggers_need_no_application_functions(self):
+        """В notes_note может писать и клиент без функций Django."""
+        db = sqlite3.connect(':memory:')
+        self.addCleanup(db.close)
+        db.execute(
+            'CREATE TABLE notes_note (id INTEGER PRIMARY KEY, '
+            'author_id INTEGER, title TEXT, text TEXT)'
+        )
+        for statement in schema_statements():
+            db.execute(statement)
+        db.executemany(
+            'INSERT INTO notes_note VALUES (?, 1, ?, ?)',
+            [(1, 'Ёлка', 'Шары'), (2, 'Сжатая', b'\x01data')],
+        )
+        db.execute("UPDATE notes_note SET text = 'Гирлянды' WHERE id = 1")
+        db.execute("UPDATE notes_note SET title = 'Журнал' WHERE id = 2")
+        self.assertEqual(
+            db.execute(
+                f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH 'гирлянды'"
+            ).fetchall(),
+            [(1,)],
+        )
+        db.execute('DELETE FROM notes_note')
+        self.assertEqual(
+            db.execute(
+                f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH 'елка'"
+            ).fetchall(),
+            [],
+        )
+
+    @override_settings(
+        NOTES_SEARCH_BACKEND='notes.search.simple.SimpleSearchBackend'
+    )
+    def test_simple_backend(self):
+        self.assertIsInstance(get_backend(), SimpleSearchBackend)
+        self.assertEqual(self.search('Spisok'), [self.translit])
+        self.assertEqual(self.search('соседа'), [])
+
+    def test_search_is_two_queries(self):
+        """Один запрос к индексу и один за найденными заметками по id."""
+        with CaptureQueriesContext(connection) as queries:
+            self.search('игрушки')
+        notes_queries = [
+            query['sql'] for query in queries if 'notes_note' in query['sql']
+        ]
+        self.assertEqual(len(notes_queries), 2)
+        self.assertIn('"notes_note"."id" IN', notes_queries[1])
@@ -0,0 +1,147 @@
+from django.contrib.auth import HASH_SESSION_KEY
+from django.core.cache import caches
+from django.test import Client, RequestFactory, override_settings
+
+from notes.cache import user_key
+from notes.models import UserSession
+from notes.sessions import get_user
+from notes.sessions.cached_db import SessionStore as CachedSessionStore
+from notes.sessions.db import SessionStore
+from .base_test import BaseTestCase, NOTE_LIST_URL, SUCCESS_URL, User
+
+
+class TestSessionUser(BaseTestCase):
+    """Пользователь загружается вместе с сессией и проверяется как в auth."""
+
+    def make_request(self, store_class=SessionStore, session_key=None):
+        if session_key is None:
+            client = Client()
+            client.force_login(self.author)
+            session_key = client.session.session_key
+        request = RequestFactory().get(NOTE_LIST_URL)
+        request.session = store_class(session_key)
+        return request
+
+    def test_session_stores_user(self):
+        session = UserSession.objects.get(
+            session_key=self.author_client.session.session_key
+        )
+        self.assertEqual(session.user, self.author)
+
+    def test_one_query_for_session_and_user(self):
+        request = self.make_request()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_user(request), self.author)
+
+    def test_password_change_logs_out(self):
+        request = self.make_request()
+        self.author.set_password('new-password')
+        self.author.save()
+        self.assertFalse(get_user(request).is_authenticated)
+
+    def test_inactive_user(self):
+        request = self.make_request()
+        User.objects.filter(pk=self.author.pk).update(is_active=False)
+        self.assertFalse(get_user(request).is_authenticated)
+
+    @override_settings(SESSION_ENGINE='notes.sessions.cached_db')
+    def test_cached_session_and_user(self):
+        # Вход сбрасывает пользователя в кеше: его читает только первый
+        # запрос, сессия же сохраняется в кеш сразу при входе.
+        request = self.make_request(CachedSessionStore)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_user(request), self.author)
+        request = self.make_request(
+            CachedSessionStore, request.session.session_key
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user(request), self.author)
+
+    @override_settings(NOTES_SESSION_CACHE_TTL=0)
+    def test_cache_ttl(self):
+        store = self.make_request(CachedSessionStore).session
+        store.load()
+        self.assertNotIn(store.cache_key, caches['sessions'])
+
+
+@override_settings(SESSION_ENGINE='notes.sessions.cached_db')
+class TestRevokedSessions(BaseTestCase):
+    """Кеш сессий и пользователей не оживляет отозванные сессии."""
+
+    def setUp(self):
+        self.client.force_login(self.author)
+        # Прогрев кешей сессии и пользователя.
+        self.assertEqual(self.get_user(), self.author)
+
+    def get_user(self):
+        return self.client.get(SUCCESS_URL).wsgi_request.user
+
+    def test_user_is_cached(self):
+        with self.assertNumQueries(0):
+            self.assertIn(user_key(self.author.pk), caches['users'])
+            self.assertEqual(self.get_user(), self.author)
+
+    def test_password_change(self):
+        self.author.set_password('new-password')
+        self.author.save()
+        self.assertFalse(self.get_user().is_authenticated)
+
+    def test_password_change_in_other_process(self):
+        """
+        Устаревший пользователь в кеше не сбрасывает новую сессию.
+
+        Пароль сменили в другом процессе, и в кеше этого процесса
+        остался пользователь со старым хешем пароля.
+        """
+        stale = User.objects.get(pk=self.author.pk)
+        self.author.set_password('new-password')
+        self.author.save()
+        # Как update_session_auth_hash в том процессе.
+        session = self.client.session
+        session[HASH_SESSION_KEY] = self.author.get_session_auth_hash()
+        session.save()
+        caches['users'].set(user_key(self.author.pk), stale)
+        self.assertEqual(self.get_user(), self.author)
+
+    def test_logout(self):
+        session_key = self.client.session.session_key
+        self.client.logout()
+        self.assertNotIn(user_key(self.author.pk), caches['users'])
+        self.client.cookies['sessionid'] = session_key
+        self.assertFalse(self.get_user().is_authenticated)
+
+    def test_deleted_session(self):
+        CachedSessionStore().delete(self.client.session.session_key)
+        self.assertFalse(self.get_user().is_authenticated)
+
+    def test_deactivated_user(self):
+        self.author.is_active = False
+        self.author.save()
+        self.assertFalse(self.get_user().is_authenticated)
+
+    def test_deleted_user(self):
+        self.author.delete()
+        self.assertFalse(self.get_user().is_authenticated)
+
+
+class TestSessionModes(BaseTestCase):
+    """Страницы работают во всех режимах YANOTE_SESSION_MODE."""
+
+    def test_modes(self):
+        for engine in (
+            'notes.sessions.db',
+            'notes.sessions.cached_db',
+            'django.contrib.sessions.backends.signed_cookies',
+        ):
+            with self.subTest(engine=engine), override_settings(
+                SESSION_ENGINE=engine
+            ):
+                client = Client()
+                client.force_login(self.author)
+                response = client.get(NOTE_LIST_URL)
+                self.assertEqual(response.context['user'], self.author)
+                client.logout()
+                self.assertFalse(
+                    client.get(NOTE_LIST_URL).wsgi_request.user
+                    .is_authenticated
+                )
@@ -0,0 +1,291 @@
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import (
+    DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+)
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from notes import shards
+from notes.models import (
+    AuthorNotesVersion, AuthorShard, Folder, Note, NoteRevision, Tag, Task
+)
+from notes.shards import AuthorMoved, ShardError, ShardMiddleware
+from .base_test import NOTE_LIST_URL, NOTE_SLUG, User
+
+SHARD = 'shard-a'
+
+
+@override_settings(NOTES_SHARDS=(DEFAULT_DB_ALIAS, SHARD))
+class TestShards(TestCase):
+    """Заметки автора в его шарде и перенос авторов между шардами."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        connections.databases[SHARD] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(cls.tmpdir.name, 'shard.sqlite3'),
+        }
+        call_command('migrate', database=SHARD, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[SHARD].close()
+        del connections[SHARD]
+        del connections.databases[SHARD]
+        cls.tmpdir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        # Шард подключается после setUpClass, и TestCase не оборачивает
+        # его в транзакцию: откатываем изменения теста сами.
+        atomic = transaction.atomic(using=SHARD)
+        atomic.__enter__()
+
+        def rollback():
+            transaction.set_rollback(True, using=SHARD)
+            atomic.__exit__(None, None, None)
+
+        self.addCleanup(rollback)
+
+    def create_author(self, username, alias):
+        author = User.objects.create(username=username)
+        AuthorShard.objects.update_or_create(
+            author=author, defaults={'alias': alias}
+        )
+        return author
+
+    def create(self, model, **fields):
+        # QuerySet.create() без for_author() пишет в основную базу.
+        instance = model(**fields)
+        instance.save()
+        return instance
+
+    def test_new_author_placed(self):
+        author = User.objects.create(username='new')
+        self.assertEqual(
+            AuthorShard.objects.get(author=author).alias,
+            shards.place_author(author.pk),
+        )
+
+    def test_notes_follow_author(self):
+        author = self.create_author('sharded', SHARD)
+        with self.captureOnCommitCallbacks(using=SHARD, execute=True):
+            note = self.create(Note, title='Т', text='Текст', author=author)
+        self.assertEqual(note._state.db, SHARD)
+        self.assertFalse(Note.objects.using(DEFAULT_DB_ALIAS).exists())
+        self.assertEqual(
+            NoteRevision.objects.using(SHARD).filter(note_id=note.pk)
+            .count(),
+            1,
+        )
+        # Счётчик изменений остаётся в основной базе.
+        self.assertEqual(
+            AuthorNotesVersion.objects.get(author=author).version, 1
+        )
+        with shards.for_author(author.pk):
+            self.assertEqual(
+                list(Note.objects.filter(author=author)), [note]
+            )
+            self.assertEqual(list(author.tags.all()), [])
+
+    def test_middleware_routes_request(self):
+        author = self.create_author('sharded', SHARD)
+        self.create(Note, title='Заметка в шарде', text='Т', author=author)
+        self.client.force_login(author)
+        response = self.client.get(NOTE_LIST_URL)
+        self.assertContains(response, 'Заметка в шарде')
+
+    def test_views_write_in_author_shard(self):
+        author = self.create_author('sharded', SHARD)
+        note = self.create(Note, title='Т', text='Было', author=author)
+        note.text = 'Стало'
+        note.save()
+        self.client.force_login(author)
+        atomic = mock.Mock(wraps=transaction.atomic)
+        with mock.patch('notes.views.transaction.atomic', atomic):
+            self.client.post(
+                reverse('notes:revision', args=(note.slug, 1))
+            )
+            self.client.post(
+                reverse('notes:folder-add'), {'name': 'Папка'}
+            )
+        self.assertEqual(
+            [call.kwargs for call in atomic.call_args_list],
+            [{'using': SHARD}, {'using': SHARD}],
+        )
+        note.refresh_from_db()
+        self.assertEqual(note.text, 'Было')
+        self.assertTrue(
+            Folder.objects.using(SHARD).filter(author=author).exists()
+        )
+
+    def test_slug_unique_per_author(self):
+        first = self.create_author('first', SHARD)
+        second = self.create_author('second', SHARD)
+        for author in (first, second):
+            self.create(Note, title='Т', slug=NOTE_SLUG, author=author)
+        self.assertEqual(
+            self.create(Note, title=NOTE_SLUG, author=first).slug,
+            f'{NOTE_SLUG}-2',
+        )
+        with self.assertRaises(IntegrityError):
+            self.create(Note, title='Т', slug=NOTE_SLUG, author=second)
+
+    def test_move_author(self):
+        author = self.create_author('moving', DEFAULT_DB_ALIAS)
+        parent = self.create(Folder, author=author, name='Папка')
+        child = self.create(
+            Folder, author=author, name='Вложенная', parent=parent
+        )
+        tag = self.create(Tag, author=author, name='Метка', slug='metka')
+        note = self.create(
+            Note, title='Т', text='Первая', author=author, folder=child,
+            slug=NOTE_SLUG,
+        )
+        note.tags.add(tag)
+        note.text = 'Вторая'
+        note.save()
+        version = AuthorNotesVersion.objects.get(author=author).version
+        # В шарде уже занят id папки: новые id отличаются от старых.
+        other = self.create_author('other', SHARD)
+        self.create(Folder, author=other, name='Чужая')
+
+        self.assertEqual(shards.move_author(author.pk, SHARD), 1)
+
+        self.assertEqual(shards.shard_for(author.pk), SHARD)
+        self.assertFalse(
+            Note.objects.using(DEFAULT_DB_ALIAS).filter(author=author)
+            .exists()
+        )
+        self.assertFalse(
+            Folder.objects.using(DEFAULT_DB_ALIAS).filter(author=author)
+            .exists()
+        )
+        moved = Note.objects.using(SHARD).get(author=author)
+        self.assertEqual(
+            (moved.slug, str(moved.text), moved.updated_at),
+            (NOTE_SLUG, 'Вторая', note.updated_at),
+        )
+        self.assertEqual(moved.folder.name, 'Вложенная')
+        self.assertEqual(moved.folder.parent.name, 'Папка')
+        self.assertEqual(
+            moved.folder.path,
+            f'{moved.folder.parent_id}/{moved.folder_id}/',
+        )
+        self.assertEqual(
+            list(moved.tags.values_list('slug', 'note_count')),
+            [('metka', 1)],
+        )
+        self.assertEqual(
+            list(
+                moved.revisions.order_by('number')
+                .values_list('number', flat=True)
+            ),
+            [1, 2],
+        )
+        self.assertGreater(
+            AuthorNotesVersion.objects.get(author=author).version, version
+        )
+        self.assertEqual(shards.move_author(author.pk, SHARD), 0)
+
+    def test_move_refused(self):
+        author = self.create_author('busy', DEFAULT_DB_ALIAS)
+        Task.objects.create(name='task', payload={'author': author.pk})
+        with self.assertRaises(ShardError):
+            shards.move_author(author.pk, SHARD)
+        with self.assertRaises(ShardError):
+            shards.move_author(author.pk, 'unknown')
+
+    def test_stale_write_rolls_back(self):
+        author = self.create_author('moved', SHARD)
+        with self.assertRaises(AuthorMoved):
+            Note.objects.using(DEFAULT_DB_ALIAS).create(
+                title='Т', text='Т', author=author
+            )
+        self.assertFalse(Note.objects.using(DEFAULT_DB_ALIAS).exists())
+        response = ShardMiddleware(lambda request: None).process_exception(
+            RequestFactory().get(NOTE_LIST_URL), AuthorMoved()
+        )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_delete_author_clears_shard(self):
+        author = self.create_author('deleted', SHARD)
+        self.create(Note, title='Т', text='Т', author=author)
+        author.delete()
+        self.assertFalse(Note.objects.using(SHARD).exists())
+        self.assertFalse(NoteRevision.objects.using(SHARD).exists())
+
+    def test_transfer_reads_and_writes_shards(self):
+        authors = (('first', DEFAULT_DB_ALIAS), ('second', SHARD))
+        for username, alias in authors:
+            author = self.create_author(username, alias)
+            self.create(Note, title=username, text='Т', author=author)
+        path = os.path.join(self.tmpdir.name, 'notes.jsonl')
+        self.addCleanup(os.remove, path)
+        call_command('export_notes', path, stdout=io.StringIO())
+        with open(path, encoding='utf-8') as file:
+            authors = [json.loads(line)['author'] for line in file]
+        self.assertEqual(authors, ['first', 'second'])
+        call_command(
+            'import_notes', path, author='second', stdout=io.StringIO()
+        )
+        self.assertEqual(
+            list(
+                Note.objects.using(SHARD).order_by('id')
+                .values_list('title', 'slug')
+            ),
+            [('second', 'second'), ('first', 'first'), ('second', 'second-2')],
+        )
+        self.assertFalse(
+            NoteRevision.objects.using(SHARD).filter(number__gt=1).exists()
+        )
+        self.assertEqual(NoteRevision.objects.using(SHARD).count(), 3)
+
+    def test_plan_rebalance(self):
+        counts = {
+            DEFAULT_DB_ALIAS: {1: 10, 2: 4, 3: 3},
+            SHARD: {4: 1},
+        }
+        self.assertEqual(
+            shards.plan_rebalance(counts),
+            [(1, DEFAULT_DB_ALIAS, SHARD), (4, SHARD, DEFAULT_DB_ALIAS)],
+        )
+        self.assertEqual(
+            shards.plan_rebalance(counts, max_moves=1),
+            [(1, DEFAULT_DB_ALIAS, SHARD)],
+        )
+        # Автор больше разницы только поменял бы шарды местами.
+        self.assertEqual(
+            shards.plan_rebalance({DEFAULT_DB_ALIAS: {1: 5}, SHARD: {}}), []
+        )
+
+    def test_rebalance_command(self):
+        for index in range(3):
+            author = self.create_author(f'author{index}', DEFAULT_DB_ALIAS)
+            self.create(Note, title='Т', text='Т', author=author)
+        stdout = io.StringIO()
+        call_command('rebalance_shards', dry_run=True, stdout=stdout)
+        self.assertIn(
+            f'author0: default -> {SHARD}, заметок: 1', stdout.getvalue()
+        )
+        self.assertEqual(Note.objects.using(SHARD).count(), 0)
+        call_command('rebalance_shards', stdout=io.StringIO())
+        self.assertEqual(Note.objects.using(SHARD).count(), 1)
+        call_command(
+            'rebalance_shards', author='author1', to=SHARD,
+            stdout=io.StringIO(),
+        )
+        self.assertEqual(Note.objects.using(SHARD).count(), 2)
+        with override_settings(NOTES_SHARDS=()):
+            with self.assertRaises(CommandError):
+                call_command('rebalance_shards', stdout=io.StringIO())
@@ -0,0 +1,178 @@
+import os
+import tempfile
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, TransactionTestCase
+from pytils.translit import slugify as translit_slugify
+
+from notes.models import Note
+from notes.slugs import allocate_slug, slugify, slugify_cache_info
+from .base_test import ADD_NOTE_URL, BaseTestCase, SUCCESS_URL
+
+User = get_user_model()
+
+TITLE = 'Одинаковый заголовок'
+STRESS_DB = 'stress'
+
+
+class TestCachedSlugify(TestCase):
+    """Тестирование кеширующей обёртки над pytils."""
+
+    def test_matches_pytils_and_truncates(self):
+        titles = (
+            'Очень длинный заголовок заметки',
+            'Щука & Ёж — «друзья» №1…',
+            'ЩЕДРЫЙ   Вечер\tи  ночь',
+            'Mixed Латиница и Кириллица: 2024!',
+            'Съешь ещё этих мягких французских булок',
+            'Emoji 🙂 и ʼапострофыʼ, «кавычки» и &amp; амперсанд',
+            '',
+        )
+        for title in titles:
+            with self.subTest(title=title):
+                self.assertEqual(slugify(title), translit_slugify(title))
+                self.assertEqual(
+                    slugify(title, 10), translit_slugify(title)[:10]
+                )
+
+    def test_repeated_title_is_cache_hit(self):
+        title = 'Заголовок для проверки кеша'
+        slugify(title)
+        before = slugify_cache_info()
+        slugify(title, 5)
+        after = slugify_cache_info()
+        self.assertEqual(after.hits, before.hits + 1)
+        self.assertEqual(after.misses, before.misses)
+        self.assertLessEqual(after.currsize, after.maxsize)
+
+
+class TestSlugAllocation(TestCase):
+    """Тестирование подбора свободного slug."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='SlugAuthor')
+        cls.max_length = Note._meta.get_field('slug').max_length
+
+    def create(self, slug):
+        return Note.objects.create(
+            title=TITLE, text='Текст', slug=slug, author=self.author
+        )
+
+    def test_free_base_is_used_as_is(self):
+        self.assertEqual(
+            allocate_slug(Note.objects.all(), 'free', self.max_length), 'free'
+        )
+
+    def test_next_suffix_in_one_query(self):
+        """Следующий номер суффикса находится одним запросом."""
+        for slug in ('taken', 'taken-2', 'taken-3', 'takenx'):
+            self.create(slug)
+        with self.assertNumQueries(1):
+            slug = allocate_slug(Note.objects.all(), 'taken', self.max_length)
+        self.assertEqual(slug, 'taken-4')
+
+    def test_spread_skips_all_taken_values(self):
+        """После коллизии выбирается только действительно свободный slug."""
+        taken = ('taken', 'taken-2', 'taken-3', 'taken-5', 'taken-x')
+        for slug in taken:
+            self.create(slug)
+        for spread in (2, 4, 8):
+            with self.subTest(spread=spread):
+                slug = allocate_slug(
+                    Note.objects.all(), 'taken', self.max_length, spread
+                )
+                self.assertNotIn(slug, taken)
+                self.assertRegex(slug, r'^taken-\d+$')
+
+    def test_long_base_keeps_max_length(self):
+        """Суффикс не выводит slug за пределы max_length."""
+        base = 'a' * self.max_length
+        self.create(base)
+        slug = allocate_slug(Note.objects.all(), base, self.max_length)
+        self.assertLessEqual(len(slug), self.max_length)
+        self.assertTrue(slug.endswith('-2'))
+
+    def test_empty_title_gets_default_slug(self):
+        note = Note.objects.create(
+            title='!!!', text='Текст', author=self.author
+        )
+        self.assertEqual(note.slug, 'note')
+
+
+class TestSlugSuffixOnCreate(BaseTestCase):
+    """Создание заметок с одинаковыми заголовками через форму."""
+
+    def test_same_title_without_slug_gets_suffix(self):
+        """Одинаковые заголовки без slug получают суффиксы -2, -3."""
+        del self.note_data['slug']
+        base = translit_slugify(self.note_data['title'])
+        for expected in (base, f'{base}-2', f'{base}-3'):
+            response = self.author_client.post(ADD_NOTE_URL, self.note_data)
+            self.assertRedirects(response, SUCCESS_URL)
+            self.assertTrue(Note.objects.filter(slug=expected).exists())
+
+
+class TestConcurrentSlugAllocation(TransactionTestCase):
+    """
+    Стресс-тест параллельного создания заметок с одним заголовком.
+
+    Тестовая база в памяти не поддерживает параллельную запись из разных
+    потоков, поэтому тест работает с отдельной файловой базой SQLite.
+    """
+
+    THREADS = 8
+    NOTES_PER_THREAD = 250
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        connections.databases[STRESS_DB] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(cls.tmpdir.name, 'stress.sqlite3'),
+            'OPTIONS': {'timeout': 30},
+        }
+        call_command('migrate', database=STRESS_DB, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[STRESS_DB].close()
+        del connections[STRESS_DB]
+        del connections.databases[STRESS_DB]
+        cls.tmpdir.cleanup()
+        super().tearDownClass()
+
+    def test_concurrent_creates_get_unique_slugs(self):
+        notes = Note.objects.using(STRESS_DB)
+        author = User.objects.db_manager(STRESS_DB).create(
+            username='Concurrent'
+        )
+        errors = []
+        barrier = threading.Barrier(self.THREADS)
+
+        def create_notes():
+            barrier.wait()
+            try:
+                for _ in range(self.NOTES_PER_THREAD):
+                    notes.create(title=TITLE, text='Текст', author=author)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections[STRESS_DB].close()
+
+        threads = [
+            threading.Thread(target=create_notes)
+            for _ in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        slugs = list(notes.values_list('slug', flat=True))
+        self.assertEqual(len(slugs), self.THREADS * self.NOTES_PER_THREAD)
+        self.assertEqual(len(set(slugs)), len(slugs))
@@ -0,0 +1,137 @@
+import io
+import os
+import tempfile
+from unittest import mock
+
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.http import Http404
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from notes import staticfiles
+from notes.staticfiles import VendorAsset
+
+CSS = b'body { color: black; }\n'
+ASSET = VendorAsset(
+    path='vendor/test/test.css',
+    url='https://cdn.example.com/test.css',
+    integrity=staticfiles.integrity(CSS),
+)
+
+
+class TestStaticFiles(SimpleTestCase):
+    """Тестирование статики с хешами в именах и сторонних файлов."""
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.source = os.path.join(tmpdir.name, 'static')
+        self.root = os.path.join(tmpdir.name, 'collected')
+        os.makedirs(self.source)
+        settings = override_settings(
+            STATICFILES_DIRS=[self.source], STATIC_ROOT=self.root
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        for cache in (staticfiles.is_vendored, staticfiles.hashed_names):
+            cache.cache_clear()
+            self.addCleanup(cache.cache_clear)
+        patcher = mock.patch.dict(
+            staticfiles.VENDOR_ASSETS, {'test': ASSET}, clear=True
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def vendor(self, content=CSS):
+        path = os.path.join(self.source, ASSET.path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(content)
+
+    def render(self):
+        return Template(
+            "{% load notes_static %}{% vendor_stylesheet 'test' %}"
+        ).render(Context())
+
+    def test_cdn_until_vendored(self):
+        self.assertEqual(
+            self.render(),
+            f'<link rel="stylesheet" href="{ASSET.url}" '
+            f'integrity="{ASSET.integrity}" crossorigin="anonymous">',
+        )
+
+    def test_vendored_hashed_name(self):
+        self.vendor()
+        with override_settings(DEBUG=True):
+            self.assertEqual(
+                self.render(),
+                f'<link rel="stylesheet" href="/static/{ASSET.path}">',
+            )
+        with self.assertRaisesMessage(ValueError, ASSET.path):
+            self.render()
+        call_command('collectstatic', interactive=False, verbosity=0)
+        link = self.render()
+        self.assertRegex(
+            link, r'href="/static/vendor/test/test\.[0-9a-f]{12}\.css"'
+        )
+
+    def test_collectstatic_requires_vendored_assets(self):
+        with self.assertRaisesMessage(CommandError, ASSET.path):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        self.assertFalse(os.path.exists(self.root))
+
+    def test_missing_after_collectstatic(self):
+        self.vendor()
+        call_command('collectstatic', interactive=False, verbosity=0)
+        os.remove(os.path.join(self.source, ASSET.path))
+        staticfiles.is_vendored.cache_clear()
+        with self.assertRaisesMessage(ImproperlyConfigured, ASSET.path):
+            self.render()
+
+    def test_deploy_check(self):
+        errors = checks.run_checks(
+            tags=[checks.Tags.staticfiles], include_deployment_checks=True
+        )
+        self.assertEqual([error.id for error in errors], ['notes.E001'])
+        self.vendor()
+        self.assertEqual(
+            checks.run_checks(
+                tags=[checks.Tags.staticfiles],
+                include_deployment_checks=True,
+            ),
+            [],
+        )
+
+    def test_serve_cache_headers(self):
+        self.vendor()
+        call_command('collectstatic', interactive=False, verbosity=0)
+        hashed = staticfiles.staticfiles_storage.stored_name(ASSET.path)
+        self.assertIn(hashed, staticfiles.hashed_names())
+        request = RequestFactory().get('/static/')
+        cases = (
+            (hashed, staticfiles.IMMUTABLE_CACHE_CONTROL),
+            (ASSET.path, staticfiles.REVALIDATE_CACHE_CONTROL),
+        )
+        for path, cache_control in cases:
+            with self.subTest(path=path):
+                response = staticfiles.serve(request, path)
+                self.assertEqual(response['Cache-Control'], cache_control)
+                self.assertEqual(b''.join(response.streaming_content), CSS)
+        with self.assertRaises(Http404):
+            staticfiles.serve(request, 'missing.css')
+
+    def test_vendor_assets_command(self):
+        response = mock.MagicMock()
+        response.__enter__.return_value.read.return_value = CSS
+        with mock.patch(
+            'notes.management.commands.vendor_assets.urlopen',
+            return_value=response,
+        ):
+            call_command('vendor_assets', stdout=io.StringIO())
+        call_command('vendor_assets', check=True, stdout=io.StringIO())
+        self.vendor(b'changed')
+        with self.assertRaisesMessage(CommandError, 'test'):
+            call_command('vendor_assets', check=True, stdout=io.StringIO())
@@ -0,0 +1,180 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from notes.models import AuthorNotesVersion, Note, TransferCheckpoint
+from notes.transfer import RecordWriter
+from .base_test import BaseTestCase, NOTE_LIST_URL, NOTE_SLUG
+
+
+class TestNotesTransfer(BaseTestCase):
+    """Тестирование команд import_notes и export_notes."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        Note.objects.create(
+            title='Вторая заметка',
+            text='Строка 1\nСтрока 2, с запятой',
+            author=self.author,
+        )
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def call(self, name, *args, **options):
+        call_command(name, *args, stdout=io.StringIO(), **options)
+
+    def test_round_trip(self):
+        """
+        Выгруженные заметки загружаются обратно.
+
+        slug уникален в пределах автора: у другого автора заметки
+        сохраняют свои slug, а повторный импорт получает новые.
+        """
+        for name in ('notes.jsonl', 'notes.csv'):
+            with self.subTest(name=name):
+                path = self.path(name)
+                self.call('export_notes', path, author=self.author.username)
+                self.call(
+                    'import_notes', path, author=self.not_author.username
+                )
+                exported = Note.objects.filter(author=self.author)
+                imported = Note.objects.filter(author=self.not_author)
+                self.assertEqual(
+                    list(imported.values_list('title', 'text', 'slug')),
+                    list(exported.values_list('title', 'text', 'slug')),
+                )
+                self.call(
+                    'import_notes', path, author=self.not_author.username
+                )
+                self.assertTrue(
+                    imported.filter(slug=f'{NOTE_SLUG}-2').exists()
+                )
+                imported.delete()
+
+    def test_import_bumps_author_version(self):
+        """bulk_create не шлёт сигналы, версию заметок меняет сама команда."""
+        path = self.path('notes.jsonl')
+        self.call('export_notes', path, author=self.author.username)
+        version = AuthorNotesVersion.objects.get(author=self.not_author)
+        self.call('import_notes', path, author=self.not_author.username)
+        version.refresh_from_db()
+        self.assertEqual(version.version, 1)
+
+    def test_resume_skips_committed_batches(self):
+        """При возобновлении уже сохранённые пачки не импортируются."""
+        path = self.path('notes.jsonl')
+        with open(path, 'w', encoding='utf-8') as file:
+            for index in range(5):
+                file.write(json.dumps({
+                    'author': self.not_author.username,
+                    'title': f'Импорт {index}',
+                    'text': 'Текст',
+                }) + '\n')
+        TransferCheckpoint.objects.create(
+            name=f'import:{os.path.abspath(path)}', position=3
+        )
+        self.call('import_notes', path, resume=True, batch_size=1)
+        self.assertEqual(
+            list(
+                Note.objects.filter(author=self.not_author)
+                .values_list('title', flat=True)
+            ),
+            ['Импорт 3', 'Импорт 4'],
+        )
+        self.assertEqual(
+            TransferCheckpoint.objects.get(
+                name=f'import:{os.path.abspath(path)}'
+            ).position,
+            5,
+        )
+
+    def test_resume_reads_from_offset(self):
+        """Возобновлённый импорт не читает уже импортированные записи."""
+        for fmt in ('jsonl', 'csv'):
+            with self.subTest(fmt=fmt):
+                path = self.path(f'notes.{fmt}')
+                self.call('export_notes', path, author=self.author.username)
+                self.call('import_notes', path)
+                checkpoint = TransferCheckpoint.objects.get(
+                    name=f'import:{os.path.abspath(path)}'
+                )
+                self.assertEqual(checkpoint.offset, os.path.getsize(path))
+                with open(path, 'r+b') as file:
+                    if fmt == 'csv':
+                        file.readline()
+                    # Прочитать испорченные записи не получится.
+                    file.write(b'\xff' * (checkpoint.offset - file.tell()))
+                with open(path, 'a', encoding='utf-8', newline='') as file:
+                    RecordWriter(file, fmt, write_header=False).write({
+                        'author': self.not_author.username,
+                        'title': f'Дописанная {fmt}',
+                        'text': 'Текст',
+                        'slug': '',
+                    })
+                self.call('import_notes', path, resume=True)
+                self.assertTrue(Note.objects.filter(
+                    author=self.not_author, title=f'Дописанная {fmt}'
+                ).exists())
+                position = checkpoint.position
+                checkpoint.refresh_from_db()
+                self.assertEqual(checkpoint.position, position + 1)
+                self.assertEqual(checkpoint.offset, os.path.getsize(path))
+
+    def test_export_resume_appends_new_notes(self):
+        """Возобновлённая выгрузка дописывает только новые заметки."""
+        path = self.path('notes.jsonl')
+        self.call('export_notes', path)
+        Note.objects.create(title='Новая', text='Текст', author=self.author)
+        self.call('export_notes', path, resume=True)
+        with open(path, encoding='utf-8') as file:
+            titles = [json.loads(line)['title'] for line in file]
+        self.assertEqual(
+            titles, list(Note.objects.values_list('title', flat=True))
+        )
+
+    def test_unknown_author_is_reported(self):
+        path = self.path('notes.jsonl')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(json.dumps({'author': 'nobody', 'title': 'X'}) + '\n')
+        with self.assertRaises(CommandError):
+            self.call('import_notes', path)
+
+    def test_export_unknown_author_is_reported(self):
+        path = self.path('notes.jsonl')
+        with self.assertRaisesMessage(CommandError, 'nobody'):
+            self.call('export_notes', path, author='nobody')
+        self.assertFalse(os.path.exists(path))
+
+    def test_invalid_records_are_skipped(self):
+        path = self.path('notes.jsonl')
+        records = (
+            {'title': 'Пробел в slug', 'slug': 'hello world'},
+            {'title': 'Длинный slug', 'slug': 'x' * 101},
+            {'title': 'З' * 101},
+            {'title': ''},
+            {'title': 'Годная', 'slug': 'good'},
+        )
+        with open(path, 'w', encoding='utf-8') as file:
+            for record in records:
+                file.write(json.dumps(
+                    {'author': self.not_author.username, **record}
+                ) + '\n')
+        stderr = io.StringIO()
+        call_command(
+            'import_notes', path, stdout=io.StringIO(), stderr=stderr
+        )
+        self.assertEqual(
+            list(Note.objects.filter(author=self.not_author)
+                 .values_list('slug', flat=True)),
+            ['good'],
+        )
+        self.assertEqual(stderr.getvalue().count('Пропущена запись'), 4)
+        self.assertIn('Пробел в slug', stderr.getvalue())
+        self.client.force_login(self.not_author)
+        self.assertEqual(self.client.get(NOTE_LIST_URL).status_code, 200)
@@ -0,0 +1,110 @@
+"""Потоковое чтение и запись заметок в JSON Lines и CSV."""
+import csv
+import json
+import time
+from itertools import islice
+
+FORMATS = ('jsonl', 'csv')
+FIELDS = ('author', 'title', 'text', 'slug')
+
+
+def guess_format(path):
+    """Формат по расширению файла, по умолчанию JSON Lines."""
+    return 'csv' if str(path).lower().endswith('.csv') else 'jsonl'
+
+
+class LineReader:
+    """
+    Строки двоичного файла в UTF-8 и смещение в байтах после последней.
+
+    У текстового файла tell() во время итерации недоступен, а смещение
+    нужно, чтобы продолжить чтение с записи, не разбирая предыдущие.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.offset = file.tell()
+
+    def seek(self, offset):
+        self.offset = self.file.seek(offset)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.file.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        return line.decode('utf-8')
+
+
+def read_records(file, fmt, offset=0):
+    """
+    Построчно читает записи из двоичного файла, не загружая его целиком.
+
+    Отдаёт пары (запись, смещение после неё). С сохранённого смещения
+    чтение продолжается без разбора предыдущих записей; заголовок CSV
+    при этом всё равно читается из начала файла.
+    """
+    lines = LineReader(file)
+    if fmt == 'csv':
+        fieldnames = next(csv.reader(lines), None)
+        if fieldnames is None:
+            return
+        if offset:
+            lines.seek(offset)
+        # csv читает строки по одной, пока не соберёт запись, поэтому
+        # смещение после записи точное и для многострочных полей.
+        for record in csv.DictReader(lines, fieldnames):
+            yield record, lines.offset
+        return
+    if offset:
+        lines.seek(offset)
+    for line in lines:
+        if line.strip():
+            yield json.loads(line), lines.offset
+
+
+class RecordWriter:
+    """Записывает заметки по одной в выбранном формате."""
+
+    def __init__(self, file, fmt, write_header=True):
+        self.file = file
+        self.fmt = fmt
+        if fmt == 'csv':
+            self.csv = csv.DictWriter(file, fieldnames=FIELDS)
+            if write_header:
+                self.csv.writeheader()
+
+    def write(self, record):
+        if self.fmt == 'csv':
+            self.csv.writerow(record)
+        else:
+            self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def batched(iterable, size):
+    """Разбивает поток на списки длиной не больше size."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Throughput:
+    """Считает обработанные заметки и скорость в заметках в секунду."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+
+    def add(self, count):
+        self.count += count
+
+    @property
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.count / elapsed if elapsed else 0.0
+
+    def __str__(self):
+        return f'{self.count} заметок, {self.rate:.0f} заметок/с'
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from notes import views
+from notes import api, views
 
 app_name = 'notes'
 
@@ -9,7 +9,28 @@ urlpatterns = [
     path('add/', views.NoteCreate.as_view(), name='add'),
     path('edit/<slug:slug>/', views.NoteUpdate.as_view(), name='edit'),
     path('note/<slug:slug>/', views.NoteDetail.as_view(), name='detail'),
+    path(
+        'note/<slug:slug>/revisions/', views.NoteRevisions.as_view(),
+        name='revisions',
+    ),
+    path(
+        'note/<slug:slug>/revisions/<int:number>/',
+        views.NoteRevisionRestore.as_view(), name='revision',
+    ),
     path('delete/<slug:slug>/', views.NoteDelete.as_view(), name='delete'),
     path('notes/', views.NotesList.as_view(), name='list'),
+    path('search/', views.NoteSearch.as_view(), name='search'),
+    path('tags/', views.TagList.as_view(), name='tags'),
+    path('folders/', views.FolderList.as_view(), name='folders'),
+    path(
+        'folders/add/', views.FolderCreate.as_view(), name='folder-add'
+    ),
     path('done/', views.NoteSuccess.as_view(), name='success'),
+    path('metrics/', views.Metrics.as_view(), name='metrics'),
+    path('api/notes/', api.NoteListApi.as_view(), name='api-list'),
+    path(
+        'api/notes/lookup/', api.NoteLookupApi.as_view(), name='api-lookup'
+    ),
+    path('api/notes/batch/', api.NoteBatchApi.as_view(), name='api-batch'),
+    path('api/note/<slug:slug>/', api.NoteApi.as_view(), name='api-detail'),
 ]
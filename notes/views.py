@@ -1,15 +1,39 @@
-from django.contrib.auth.mixins import LoginRequiredMixin
+import functools
+
+from django.conf import settings
+from django.contrib.auth.mixins import (
+    LoginRequiredMixin, UserPassesTestMixin
+)
+from django.db import router, transaction
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy
 from django.views import generic
 
-from .forms import NoteForm
-from .models import Note
+from .cache import get_recent_notes
+from .catalog import filter_notes
+from .metrics import render_prometheus
+from .conditional import (
+    AuthorNotesConditionalMixin, NoteConditionalMixin
+)
+from .forms import FolderForm, NoteWithTagsForm
+from .models import SUMMARY_FIELDS, Folder, Note, NoteRevision, Tag
+from .pagination import KeysetPaginationMixin
+from .revisions import get_revision
+from .search import search
 
 
 class Home(generic.TemplateView):
     """Домашняя страница."""
     template_name = 'notes/home.html'
 
+    def get_context_data(self, **kwargs):
+        """Авторизованному пользователю показываем последние заметки."""
+        context = super().get_context_data(**kwargs)
+        if self.request.user.is_authenticated:
+            context['recent_notes'] = get_recent_notes(self.request.user)
+        return context
+
 
 class NoteSuccess(LoginRequiredMixin, generic.TemplateView):
     """Страница успешного выполнения операции."""
@@ -20,28 +44,42 @@ class NoteBase(LoginRequiredMixin):
     """Базовый класс для остальных CBV."""
     model = Note
     success_url = reverse_lazy('notes:success')
+    # Поля, которые выводит шаблон. None — загружать заметку целиком.
+    summary_fields = None
 
     def get_queryset(self):
         """Пользователь может работать только со своими заметками."""
-        return self.model.objects.filter(author=self.request.user)
+        queryset = self.model.objects.filter(author=self.request.user)
+        if self.summary_fields:
+            queryset = queryset.summary(self.summary_fields)
+        return queryset
 
 
-class NoteCreate(NoteBase, generic.CreateView):
-    """Добавление заметки."""
+class NoteFormMixin:
+    """Сохранение формы заметки без ошибки 500 при гонке за slug."""
     template_name = 'notes/form.html'
-    form_class = NoteForm
+    form_class = NoteWithTagsForm
+
+    def get_form_kwargs(self):
+        return {**super().get_form_kwargs(), 'author': self.request.user}
 
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
+        response = form.save_unless_slug_taken(
+            functools.partial(super().form_valid, form)
+        )
+        return response or self.form_invalid(form)
+
+
+class NoteCreate(NoteBase, NoteFormMixin, generic.CreateView):
+    """Добавление заметки."""
+
+    def form_valid(self, form):
+        form.instance.author = self.request.user
         return super().form_valid(form)
 
 
-class NoteUpdate(NoteBase, generic.UpdateView):
+class NoteUpdate(NoteBase, NoteFormMixin, generic.UpdateView):
     """Редактирование заметки."""
-    template_name = 'notes/form.html'
-    form_class = NoteForm
 
 
 class NoteDelete(NoteBase, generic.DeleteView):
@@ -49,11 +87,149 @@ class NoteDelete(NoteBase, generic.DeleteView):
     template_name = 'notes/delete.html'
 
 
-class NotesList(NoteBase, generic.ListView):
+class NotesList(
+    NoteBase, AuthorNotesConditionalMixin, KeysetPaginationMixin,
+    generic.ListView,
+):
     """Список всех заметок пользователя."""
     template_name = 'notes/list.html'
+    summary_fields = SUMMARY_FIELDS
+
+    def get_queryset(self):
+        """Заметки с меткой или в папке, если они выбраны."""
+        queryset, self.cursor_key, self.filters = filter_notes(
+            super().get_queryset(), self.request.user, self.request.GET
+        )
+        return queryset
+
+    def get_paginate_by(self, queryset):
+        return settings.NOTES_PER_PAGE
+
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(**self.filters, **kwargs)
 
 
-class NoteDetail(NoteBase, generic.DetailView):
+class NoteSearch(NoteBase, generic.ListView):
+    """Поиск по заметкам пользователя."""
+    template_name = 'notes/search.html'
+    summary_fields = SUMMARY_FIELDS
+    query_kwarg = 'q'
+
+    def get_query(self):
+        return self.request.GET.get(self.query_kwarg, '').strip()
+
+    def get_queryset(self):
+        """Найденные заметки в порядке убывания релевантности."""
+        ids = search(
+            self.request.user.pk, self.get_query(), settings.NOTES_SEARCH_LIMIT
+        )
+        notes = super().get_queryset().in_bulk(ids)
+        return [notes[note_id] for note_id in ids if note_id in notes]
+
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(query=self.get_query(), **kwargs)
+
+
+class NoteDetail(NoteBase, NoteConditionalMixin, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('folder')
+
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(
+            tags=list(self.object.tags.all()), **kwargs
+        )
+
+
+class NoteRevisions(NoteBase, KeysetPaginationMixin, generic.ListView):
+    """История изменений заметки, от старых версий к новым."""
+    template_name = 'notes/revisions.html'
+    cursor_key = 'number'
+
+    def get_queryset(self):
+        self.note = get_object_or_404(
+            super().get_queryset().summary(), slug=self.kwargs['slug']
+        )
+        return self.note.revisions.defer('data')
+
+    def get_paginate_by(self, queryset):
+        return settings.NOTES_PER_PAGE
+
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(note=self.note, **kwargs)
+
+
+class NoteRevisionRestore(NoteBase, generic.DetailView):
+    """Версия заметки; POST восстанавливает её как новую версию."""
+    template_name = 'notes/revision.html'
+
+    def get_object(self, queryset=None):
+        note = super().get_object(queryset)
+        try:
+            self.revision = get_revision(note, self.kwargs['number'])
+        except NoteRevision.DoesNotExist:
+            raise Http404('Нет такой версии заметки.')
+        return note
+
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(revision=self.revision, **kwargs)
+
+    def post(self, request, *args, **kwargs):
+        note = self.get_object()
+        note.title, note.text = self.revision.title, self.revision.text
+        using = router.db_for_write(Note, instance=note)
+        with transaction.atomic(using=using):
+            note.save(update_fields=('title', 'text', 'updated_at'))
+        return redirect(self.success_url)
+
+
+class TagList(LoginRequiredMixin, generic.ListView):
+    """Облако меток: метки автора с числом заметок."""
+    template_name = 'notes/tags.html'
+
+    def get_queryset(self):
+        # Один запрос по индексу (author_id, slug), счётчики уже готовы.
+        return Tag.objects.filter(author=self.request.user, note_count__gt=0)
+
+
+class FolderBase(LoginRequiredMixin):
+    model = Folder
+
+    def get_queryset(self):
+        return Folder.objects.filter(author=self.request.user)
+
+
+class FolderList(FolderBase, generic.ListView):
+    """Дерево папок автора: порядок по пути выводит вложенные под родителем."""
+    template_name = 'notes/folders.html'
+
+
+class FolderCreate(FolderBase, generic.CreateView):
+    """Добавление папки."""
+    template_name = 'notes/folder_form.html'
+    form_class = FolderForm
+    success_url = reverse_lazy('notes:folders')
+
+    def get_form_kwargs(self):
+        return {**super().get_form_kwargs(), 'author': self.request.user}
+
+    def form_valid(self, form):
+        form.instance.author = self.request.user
+        using = router.db_for_write(Folder, instance=form.instance)
+        with transaction.atomic(using=using):
+            return super().form_valid(form)
+
+
+class Metrics(UserPassesTestMixin, generic.View):
+    """Метрики запросов в формате Prometheus, только для персонала."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        return HttpResponse(
+            render_prometheus(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
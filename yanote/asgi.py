@@ -5,6 +5,18 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
+
+Под ASGI страницы заметок обслуживают асинхронные представления
+из notes/async_views.py (YANOTE_ASYNC_VIEWS=1), а запросы к базе
+выполняются в пуле из YANOTE_DB_THREADS потоков. Пример запуска::
+
+    YANOTE_DB_THREADS=16 uvicorn yanote.asgi:application \
+        --workers 4 --backlog 2048
+
+Соединение с базой живёт в потоке пула, поэтому имеет смысл включить
+CONN_MAX_AGE (профиль YANOTE_DB_PROFILE=production), иначе каждое
+задание будет заново открывать соединение.
+Сравнение с WSGI под нагрузкой — benchmarks/asgi_load.py.
 """
 
 import os
@@ -12,5 +24,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanote.settings')
+os.environ.setdefault('YANOTE_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
@@ -1,5 +1,7 @@
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 from django.urls import reverse_lazy
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -17,33 +19,50 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    # Раньше staticfiles: notes переопределяет collectstatic.
+    'notes.apps.NotesConfig',
     'django.contrib.staticfiles',
-    'notes.apps.NotesConfig'
 ]
 
 MIDDLEWARE = [
+    'notes.middleware.MetricsMiddleware',
+    'notes.middleware.CompressionMiddleware',
+    'notes.middleware.QueryBudgetMiddleware',
+    'notes.routers.ReplicaMiddleware',
+    'notes.shards.ShardMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'notes.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'yanote.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'notes.context_processors.navigation',
+            ],
+            # Скомпилированные шаблоны кешируются в памяти процесса;
+            # в режиме DEBUG шаблоны читаются с диска при каждом запросе,
+            # чтобы правки были видны сразу.
+            'loaders': TEMPLATE_LOADERS if DEBUG else [
+                ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
             ],
         },
     },
@@ -59,6 +78,135 @@ DATABASES = {
     }
 }
 
+# PRAGMA, которые notes/signals.py выполняет для каждого нового
+# соединения SQLite.
+SQLITE_PRAGMAS = {}
+
+# Профиль базы (YANOTE_DB_PROFILE): default — настройки SQLite
+# по умолчанию, production — WAL, настроенные PRAGMA, транзакции
+# BEGIN IMMEDIATE и постоянные соединения. Сравнение профилей под
+# параллельной нагрузкой — benchmarks/sqlite_profile.py.
+DB_PROFILE = os.environ.get('YANOTE_DB_PROFILE', 'default')
+
+if DB_PROFILE == 'production':
+    DATABASES['default'].update({
+        'ENGINE': 'yanote.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+    })
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'wal',
+        # В режиме WAL NORMAL не портит базу при сбое, а теряет
+        # в худшем случае последние транзакции до контрольной точки.
+        'synchronous': 'normal',
+        'mmap_size': 256 * 1024 * 1024,
+        # Отрицательное значение — размер в КиБ, а не в страницах.
+        'cache_size': -64 * 1024,
+        'busy_timeout': 10000,
+        'temp_store': 'memory',
+    }
+elif DB_PROFILE != 'default':
+    raise ImproperlyConfigured(f'Неизвестный YANOTE_DB_PROFILE: {DB_PROFILE}')
+
+# Шарды заметок (notes/shards.py): YANOTE_SHARDS — файлы SQLite через
+# запятую для шардов shard1, shard2, …; первый шард — основная база.
+# Схема шарда создаётся командой manage.py migrate --database shardN,
+# авторов между шардами переносит manage.py rebalance_shards.
+NOTES_SHARDS = ()
+
+for index, name in enumerate(
+    filter(None, os.environ.get('YANOTE_SHARDS', '').split(',')), start=1
+):
+    DATABASES[f'shard{index}'] = {**DATABASES['default'], 'NAME': name}
+    NOTES_SHARDS += (f'shard{index}',)
+
+if NOTES_SHARDS:
+    NOTES_SHARDS = ('default', *NOTES_SHARDS)
+
+# Реплики для чтения страниц заметок (notes/routers.py): YANOTE_REPLICAS —
+# файлы SQLite через запятую с копиями основной базы, их обновляет
+# manage.py sync_replicas. В тестах реплики — зеркала основной базы.
+NOTES_REPLICAS = ()
+
+for index, name in enumerate(
+    filter(None, os.environ.get('YANOTE_REPLICAS', '').split(',')), start=1
+):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'], 'NAME': name, 'TEST': {'MIRROR': 'default'},
+    }
+    NOTES_REPLICAS += (f'replica{index}',)
+
+# Заметки идут в шард автора, остальное читается с реплик.
+DATABASE_ROUTERS = ['notes.shards.ShardRouter', 'notes.routers.ReplicaRouter']
+
+# Проверка реплики: функция, которая возвращает её отставание в секундах.
+NOTES_REPLICA_LAG = 'notes.routers.notes_version_lag'
+
+NOTES_REPLICA_MAX_LAG = 2
+
+NOTES_REPLICA_CHECK_INTERVAL = 1
+
+# Cookie, с которой клиент после своей записи читает из основной базы,
+# и сколько секунд она живёт: дольше, чем NOTES_REPLICA_MAX_LAG
+# и NOTES_REPLICA_CHECK_INTERVAL вместе.
+NOTES_REPLICA_STICKY_COOKIE = 'yanote_primary'
+
+NOTES_REPLICA_STICKY_SECONDS = 5
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Кеш сессий режима cached_db. Локальный для процесса; при нескольких
+    # процессах сюда подставляется общий кеш (см. notes/sessions/cached_db).
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sessions',
+        'OPTIONS': {'MAX_ENTRIES': 100_000},
+    },
+    # Пользователи для notes.backends.CachedModelBackend. Только локальный
+    # для процесса кеш: записи сбрасываются сигналами notes.signals.
+    'users': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'users',
+        'OPTIONS': {'MAX_ENTRIES': 100_000},
+    },
+}
+
+AUTHENTICATION_BACKENDS = ['notes.backends.CachedModelBackend']
+
+# Сколько секунд пользователь хранится в кеше CachedModelBackend: через
+# это время смена пароля или блокировка в другом процессе видны и здесь.
+NOTES_USER_CACHE_TTL = 60
+
+# Хранилище сессий (YANOTE_SESSION_MODE, по умолчанию cached_db),
+# подробнее — notes/sessions:
+# db — сессия и пользователь читаются из базы одним запросом,
+# cached_db — сессия ищется в кеше CACHES['sessions'], пользователь —
+# в кеше CachedModelBackend: при попадании запросов к базе нет,
+# signed_cookies — сессия в подписанной cookie, без обращения к базе.
+# Число запросов в каждом режиме — benchmarks/sessions.py.
+SESSION_ENGINES = {
+    'db': 'notes.sessions.db',
+    'cached_db': 'notes.sessions.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+SESSION_MODE = os.environ.get('YANOTE_SESSION_MODE', 'cached_db')
+
+if SESSION_MODE not in SESSION_ENGINES:
+    raise ImproperlyConfigured(
+        f'Неизвестный YANOTE_SESSION_MODE: {SESSION_MODE}'
+    )
+
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
+
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Сколько секунд сессия режима cached_db может храниться в кеше.
+NOTES_SESSION_CACHE_TTL = 60
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -83,9 +231,100 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+# Статика проекта и сторонние файлы (manage.py vendor_assets).
+# collectstatic собирает их в STATIC_ROOT, добавляя к именам хеш
+# содержимого (notes/staticfiles.py).
+STATICFILES_DIRS = [BASE_DIR / 'static']
+
+STATIC_ROOT = os.environ.get('YANOTE_STATIC_ROOT', BASE_DIR / 'staticfiles')
+
+STATICFILES_STORAGE = 'notes.staticfiles.ManifestStaticFilesStorage'
+
+# Отдавать статику из STATIC_ROOT самим приложением, с заголовками
+# кеширования, когда перед ним нет веб-сервера (YANOTE_SERVE_STATIC=1).
+NOTES_SERVE_STATIC = os.environ.get('YANOTE_SERVE_STATIC') == '1'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
 
 NOTES_COUNT_ON_HOME_PAGE = 10
+
+NOTES_PER_PAGE = 50
+
+# Текст заметки не короче порога (в байтах UTF-8) хранится в SQLite
+# сжатым: zlib, lzma или None — не сжимать (см. notes/fields.py).
+NOTES_TEXT_COMPRESSION = 'zlib'
+
+NOTES_TEXT_COMPRESS_THRESHOLD = 16 * 1024
+
+NOTES_CACHE_TIMEOUT = 60 * 15
+
+NOTES_SEARCH_LIMIT = 50
+
+NOTES_API_MAX_LIMIT = 500
+
+NOTES_API_MAX_BATCH = 500
+
+NOTES_API_IDEMPOTENCY_TTL = 60 * 60 * 24
+
+# Как часто в истории заметки хранится полный текст, а не правка:
+# восстановление версии применяет не больше стольких правок.
+NOTES_REVISION_SNAPSHOT_EVERY = 20
+
+# Очередь фоновых задач (notes/queue.py). По умолчанию медленные
+# действия после сохранения заметки (запись версии в историю)
+# выполняются прямо в запросе; с YANOTE_TASK_QUEUE=1 они попадают
+# в очередь в базе и выполняются процессами manage.py run_workers.
+NOTES_TASK_QUEUE = os.environ.get('YANOTE_TASK_QUEUE') == '1'
+
+NOTES_TASK_BATCH_SIZE = 50
+
+# Секунды, за которые процесс должен выполнить взятую пачку задач,
+# иначе её возьмёт другой процесс.
+NOTES_TASK_VISIBILITY_TIMEOUT = 60
+
+NOTES_TASK_MAX_ATTEMPTS = 5
+
+# Задержка перед повтором после ошибки, удваивается с каждой попыткой.
+NOTES_TASK_RETRY_DELAY = 10
+
+# Как часто свободный процесс run_workers проверяет очередь, секунды.
+NOTES_TASK_POLL_INTERVAL = 1
+
+# Асинхронные представления заметок (notes/async_views.py). Включаются
+# в yanote/asgi.py, под WSGI остаются обычные классы.
+NOTES_ASYNC_VIEWS = os.environ.get('YANOTE_ASYNC_VIEWS') == '1'
+
+# Потоки для запросов к базе из асинхронных представлений. 0 — общий
+# поток sync_to_async, как для синхронных представлений под ASGI.
+NOTES_DB_THREADS = int(os.environ.get('YANOTE_DB_THREADS', 8))
+
+# Запросы дольше порога попадают в журнал notes.metrics вместе
+# с NOTES_SLOW_REQUEST_QUERIES самыми долгими SQL-запросами.
+NOTES_SLOW_REQUEST_MS = 500
+
+NOTES_SLOW_REQUEST_QUERIES = 5
+
+# Файл, куда периодически сбрасываются метрики в формате Prometheus,
+# например /var/lib/node_exporter/yanote-{pid}.prom.
+NOTES_METRICS_FILE = os.environ.get('YANOTE_METRICS_FILE')
+
+NOTES_METRICS_FLUSH_SECONDS = 15
+
+# Сжатие ответов (notes.middleware.CompressionMiddleware): ответы этих
+# типов не короче порога в байтах сжимаются brotli, если установлен
+# модуль brotli и клиент его принимает, иначе gzip. Число байтов
+# и время до первого байта с ним и без — benchmarks/compression.py.
+NOTES_COMPRESS_TYPES = ('text/html', 'application/json')
+
+NOTES_COMPRESS_MIN_SIZE = 1024
+
+# Уровень brotli от 0 до 11: старшие уровни для статики, а не для
+# ответов, которые сжимаются на каждый запрос.
+NOTES_BROTLI_QUALITY = 5
+
+# Сколько секунд хранится отрендеренная шапка страницы
+# (templates/includes/header.html) для каждого пользователя.
+NOTES_HEADER_CACHE_TIMEOUT = 60 * 15
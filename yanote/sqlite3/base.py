@@ -0,0 +1,43 @@
+"""
+SQLite с выбором режима, в котором начинаются транзакции.
+
+Встроенный бэкенд Django 3.2 открывает транзакцию командой BEGIN
+(DEFERRED): блокировка на запись берётся только при первом изменении.
+Если до него транзакция успела что-то прочитать, а другое соединение
+уже пишет, SQLite сразу возвращает «database is locked», не дожидаясь
+busy_timeout. С BEGIN IMMEDIATE блокировка берётся в начале транзакции,
+и конкурирующие записи просто ждут своей очереди.
+
+Режим задаётся так же, как во встроенном бэкенде Django 5.1::
+
+    'OPTIONS': {'transaction_mode': 'IMMEDIATE'}
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    @property
+    def transaction_mode(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        if mode is not None and mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f'Неизвестный transaction_mode: {mode}. '
+                f'Допустимы: {", ".join(TRANSACTION_MODES)}.'
+            )
+        return mode
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('transaction_mode', None)
+        return params
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.transaction_mode
+        if mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f'BEGIN {mode.upper()}')
@@ -1,11 +1,18 @@
+import re
+
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth import views as auth_views
 from django.contrib.auth.forms import UserCreationForm
-from django.urls import include, path
+from django.urls import include, path, re_path
 from django.views.generic import CreateView
 
+from notes import staticfiles
+
 urlpatterns = [
-    path('', include('notes.urls')),
+    path('', include(
+        'notes.async_urls' if settings.NOTES_ASYNC_VIEWS else 'notes.urls'
+    )),
     path('admin/', admin.site.urls),
 ]
 
@@ -34,3 +41,11 @@ auth_urls = ([
 ], 'users')
 
 urlpatterns += [path('auth/', include(auth_urls))]
+
+if settings.NOTES_SERVE_STATIC:
+    urlpatterns += [
+        re_path(
+            rf'^{re.escape(settings.STATIC_URL[1:])}(?P<path>.*)$',
+            staticfiles.serve,
+        ),
+    ]